@@ -3,16 +3,15 @@ import traceback
 import threading
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
 from typing import Optional, List
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 
 from models.schemas import (
-    BulkDeleteRequest, DeleteResponse, DeleteRowsByFilterRequest, DeleteRowsRequest, 
+    BulkDeleteRequest, CrossPipelineRequest, DeleteResponse, DeleteRowsByFilterRequest, DeleteRowsRequest, 
     ExportRequest, ExportResponse, FileCrossRequest, FileUploadResponse, DataRequest, 
     TransformRequest, AIRequest
 )
 from controllers import file_controller
 from controllers.ai_controller import ai_controller
-from services.cross_service import CrossService
 from services.export_service import ExportService
 from controllers.cross_controller import cross_controller
 
@@ -125,6 +124,44 @@ def transform_data(request: TransformRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/transform/{file_id}/materialize")
+def materialize_transformations(file_id: str):
+    """Escribe las transformaciones pendientes en un nuevo Parquet base"""
+    try:
+        return execute_with_timeout(
+            file_controller.materialize_transformations,
+            timeout_seconds=EndpointConfig.OPERATION_TIMEOUT * 2,
+            file_id=file_id
+        )
+    except TimeoutError:
+        raise HTTPException(status_code=408, detail="Timeout materializando transformaciones")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/versions/{file_id}")
+def list_versions(file_id: str):
+    """Lista las versiones (ediciones) de un archivo"""
+    try:
+        return file_controller.list_versions(file_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/versions/{file_id}/undo")
+def undo_change(file_id: str):
+    """Deshace el último cambio (borrado o transformación) del archivo"""
+    try:
+        return file_controller.undo_change(file_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/versions/{file_id}/redo")
+def redo_change(file_id: str):
+    """Rehace el último cambio deshecho"""
+    try:
+        return file_controller.redo_change(file_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/file/{file_id}")
 def get_file_info(file_id: str):
     """Obtiene información básica del archivo"""
@@ -196,22 +233,39 @@ def cross_files(request: FileCrossRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-cross_handler_instance = CrossService()
+@router.post("/cross/pipeline")
+def cross_files_pipeline(request: CrossPipelineRequest):
+    """Enriquece un archivo base con varios cruces encadenados (claves compuestas) en una sola consulta"""
+    try:
+        return execute_with_timeout(
+            cross_controller.perform_cross_pipeline,
+            timeout_seconds=EndpointConfig.OPERATION_TIMEOUT * 5,
+            request=request
+        )
+    except TimeoutError:
+        raise HTTPException(status_code=408, detail="Timeout en pipeline de cruce")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/cross-download")
-def cross_files_download(request: FileCrossRequest):
-    """Realiza cruce y descarga resultado como CSV"""
+def cross_files_download(
+    request: FileCrossRequest,
+    output_format: str = Query("csv", alias="format", pattern="^(csv|parquet)$", description="Formato de descarga: csv o parquet")
+):
+    """Realiza cruce y descarga el resultado en streaming (CSV o Parquet)"""
     try:        
         result = execute_with_timeout(
-            cross_handler_instance.perform_cross_for_streaming,
+            cross_controller.perform_cross_download,
             timeout_seconds=600,
-            request=request
+            request=request,
+            output_format=output_format
         )
         
-        if not result["success"]:
-            raise HTTPException(status_code=400, detail=result.get("error", "Error en cruce"))
-        
-        return result["streaming_response"]
+        return StreamingResponse(
+            result["stream"],
+            media_type=result["media_type"],
+            headers={"Content-Disposition": f'attachment; filename="{result["filename"]}"'}
+        )
         
     except TimeoutError:
         raise HTTPException(status_code=408, detail="Timeout en cruce con descarga")
@@ -360,6 +414,44 @@ def get_columns_for_cross(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+@router.get("/cross/suggestions")
+def suggest_cross_columns(
+    file1_key: str = Query(..., description="Archivo base"),
+    file2_key: str = Query(..., description="Archivo de búsqueda"),
+    limit: int = Query(10, ge=1, le=100),
+    min_score: float = Query(0.15, ge=0, le=1)
+):
+    """Sugiere columnas clave para el cruce según el solapamiento de valores (MinHash/HLL)"""
+    try:
+        return execute_with_timeout(
+            cross_controller.suggest_compatible_columns,
+            timeout_seconds=EndpointConfig.OPERATION_TIMEOUT * 3,
+            file1_key=file1_key,
+            file2_key=file2_key,
+            limit=limit,
+            min_score=min_score
+        )
+    except TimeoutError:
+        raise HTTPException(status_code=408, detail="Timeout calculando sugerencias de cruce")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/cross/lookup-indexes")
+def get_cross_lookup_indexes():
+    """Estadísticas de los índices de búsqueda reutilizados entre cruces"""
+    try:
+        return cross_controller.get_lookup_index_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/cross/lookup-indexes")
+def clear_cross_lookup_indexes():
+    """Elimina los índices de búsqueda cacheados"""
+    try:
+        return cross_controller.clear_lookup_indexes()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 # ========== ENDPOINTS DE EXPORTACIÓN ==========
 
@@ -486,6 +578,26 @@ def bulk_delete(request: BulkDeleteRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/duplicates/{file_id}")
+def preview_duplicates(
+    file_id: str,
+    columns: Optional[List[str]] = Query(None),
+    sample_size: int = Query(10, ge=0, le=100)
+):
+    """Resumen de duplicados: grupos, filas a eliminar por modo keep y grupos de muestra"""
+    try:
+        return execute_with_timeout(
+            file_controller.preview_duplicates,
+            timeout_seconds=120,
+            file_id=file_id,
+            columns=columns,
+            sample_size=sample_size
+        )
+    except TimeoutError:
+        raise HTTPException(status_code=408, detail="Timeout analizando duplicados")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.delete("/duplicates/{file_id}")
 def remove_duplicates(
     file_id: str,
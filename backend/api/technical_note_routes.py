@@ -1,6 +1,8 @@
 # api/technical_note_routes.py - REFACTORIZADO CON LIMPIEZA DE CACHE
+import asyncio
 from datetime import datetime
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from io import BytesIO
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
 from typing import Any, Dict, List, Optional
 import json
 import os
@@ -8,13 +10,18 @@ import shutil
 import pandas as pd
 
 
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, validator
 
 
 from controllers.technical_note_controller.technical_note import technical_note_controller
 from services.technical_note_services.report_service_aux.report_exporter import ReportExporter
 from services.duckdb_service.duckdb_service import duckdb_service
+from services.technical_note_services.column_classification_service import column_classification_service
+from services.technical_note_services.age_distribution_index import age_distribution_cache
+from services.technical_note_services.report_service_aux.analysis_vaccination import AnalysisVaccination
+from services.technical_note_services.report_service_aux.analysis_trend import AnalysisMultiCutoffTrend
+from services.aux_duckdb_services.query_profile import query_profile_scope
 
 
 report_exporter = ReportExporter()
@@ -23,6 +30,7 @@ router = APIRouter()
 
 # ========== MODELOS PYDANTIC ==========
 mandatory_date = "Fecha de corte OBLIGATORIA (YYYY-MM-DD)"
+query_profile_description = "Perfil de consultas: production (sin diagnósticos) o debug"
 
 class GeographicFiltersModel(BaseModel):
     """Filtros geográficos para el reporte"""
@@ -107,6 +115,22 @@ async def cleanup_all_cache() -> Dict[str, Any]:
             technical_note_controller.loaded_technical_files.clear()
             print(f"✓ {tech_files_count} archivos técnicos eliminados de memoria")
         
+        # Limpiar índices geográficos en memoria
+        geo_indexes_count = technical_note_controller.geographic_service.clear_cache()
+        print(f"✓ {geo_indexes_count} índices geográficos eliminados de memoria")
+        
+        # Limpiar índices de clasificación de columnas
+        classification_count = column_classification_service.invalidate()
+        print(f"✓ {classification_count} índices de clasificación eliminados de memoria")
+        
+        # Limpiar histogramas de edad en memoria
+        age_indexes_count = age_distribution_cache.invalidate()
+        print(f"✓ {age_indexes_count} histogramas de edad eliminados de memoria")
+        
+        # Limpiar estados de vacunación en cache
+        vaccination_states_count = AnalysisVaccination.clear_cache()
+        print(f"✓ {vaccination_states_count} resultados de vacunación eliminados de memoria")
+        
         # Reiniciar conexión DuckDB para liberar recursos
         try:
             if hasattr(duckdb_service, 'restart_connection'):
@@ -126,6 +150,10 @@ async def cleanup_all_cache() -> Dict[str, Any]:
             "cleaned_directories": cleaned_dirs,
             "tables_cleared": tables_count,
             "technical_files_cleared": tech_files_count,
+            "geographic_indexes_cleared": geo_indexes_count,
+            "column_classifications_cleared": classification_count,
+            "age_distributions_cleared": age_indexes_count,
+            "vaccination_states_cleared": vaccination_states_count,
             "errors": errors if errors else None,
             "timestamp": str(pd.Timestamp.now())
         }
@@ -179,6 +207,8 @@ async def get_cache_status() -> Dict[str, Any]:
             "memory_state": {
                 "loaded_tables_count": loaded_tables_count,
                 "loaded_technical_files_count": loaded_technical_count,
+                "geographic_indexes_count": len(technical_note_controller.geographic_service.hierarchy_cache),
+                "age_distributions_count": len(age_distribution_cache),
                 "duckdb_available": duckdb_service.is_available()
             },
             "timestamp": str(pd.Timestamp.now())
@@ -277,6 +307,17 @@ def get_file_columns(filename: str):
 # ========== ENDPOINTS GEOGRÁFICOS ==========
 
 
+@router.get("/geographic/{filename}/tree")
+def get_geographic_tree(filename: str):
+    """Obtiene el árbol Departamento → Municipio → IPS completo con conteos de filas"""
+    try:
+        return technical_note_controller.get_geographic_tree(filename)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
 @router.get("/geographic/{filename}/departamentos")
 def get_departamentos(filename: str):
     """Obtiene departamentos únicos"""
@@ -344,7 +385,8 @@ def get_keyword_age_report(
     departamento: Optional[str] = Query(None),
     municipio: Optional[str] = Query(None),
     ips: Optional[str] = Query(None),
-    corte_fecha: str = Query(..., description=mandatory_date)
+    corte_fecha: str = Query(..., description=mandatory_date),
+    profile: Optional[str] = Query(None, regex="^(production|debug)$", description=query_profile_description)
 ):
     """Genera reporte con numerador/denominador y fecha de corte dinámica"""
     try:
@@ -365,16 +407,18 @@ def get_keyword_age_report(
         if keywords and keywords.strip():
             kw_list = [k.strip().lower() for k in keywords.split(",") if k.strip()]
         
-        result = technical_note_controller.get_keyword_age_report(
-            filename=filename,
-            keywords=kw_list,
-            min_count=min_count,
-            include_temporal=include_temporal,
-            departamento=departamento,
-            municipio=municipio,
-            ips=ips,
-            corte_fecha=corte_fecha
-        )
+        with query_profile_scope(profile) as query_profile:
+            result = technical_note_controller.get_keyword_age_report(
+                filename=filename,
+                keywords=kw_list,
+                min_count=min_count,
+                include_temporal=include_temporal,
+                departamento=departamento,
+                municipio=municipio,
+                ips=ips,
+                corte_fecha=corte_fecha
+            )
+        result["query_profile"] = query_profile.summary()
         
         items_count = len(result.get('items', []))
         global_stats = result.get('global_statistics', {})
@@ -391,6 +435,140 @@ def get_keyword_age_report(
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+@router.get("/report/{filename}/grouped")
+def get_grouped_geographic_report(
+    filename: str,
+    group_by: str = Query(..., regex="^(departamento|municipio|ips)$"),
+    keywords: Optional[str] = Query(None),
+    min_count: int = Query(0, ge=0),
+    departamento: Optional[str] = Query(None),
+    municipio: Optional[str] = Query(None),
+    ips: Optional[str] = Query(None),
+    corte_fecha: str = Query(..., description=mandatory_date),
+    profile: Optional[str] = Query(None, regex="^(production|debug)$", description=query_profile_description)
+):
+    """Cobertura y semaforización de cada departamento, municipio o IPS en una sola consulta"""
+    try:
+        print(f"\n========== GET /report/{filename}/grouped ({group_by}) ==========")
+        
+        try:
+            datetime.strptime(corte_fecha, '%Y-%m-%d')
+        except ValueError:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Formato de fecha inválido: {corte_fecha}. Use YYYY-MM-DD"
+            )
+        
+        kw_list = None
+        if keywords and keywords.strip():
+            kw_list = [k.strip().lower() for k in keywords.split(",") if k.strip()]
+        
+        with query_profile_scope(profile) as query_profile:
+            result = technical_note_controller.get_grouped_geographic_report(
+                filename=filename,
+                group_by=group_by,
+                keywords=kw_list,
+                min_count=min_count,
+                departamento=departamento,
+                municipio=municipio,
+                ips=ips,
+                corte_fecha=corte_fecha
+            )
+        result["query_profile"] = query_profile.summary()
+        
+        print(f"Reporte agrupado completado: {result.get('total_groups', 0)} grupos")
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error en /report/{filename}/grouped: {e}")
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@router.get("/trend/{filename}")
+def get_trend_report(
+    filename: str,
+    cortes: str = Query(..., description="Fechas de corte separadas por coma (YYYY-MM-DD)"),
+    keywords: Optional[str] = Query(None),
+    departamento: Optional[str] = Query(None),
+    municipio: Optional[str] = Query(None),
+    ips: Optional[str] = Query(None),
+    format: str = Query("json", regex="^(json|csv)$"),
+    profile: Optional[str] = Query(None, regex="^(production|debug)$", description=query_profile_description)
+):
+    """Tendencia de cobertura por indicador para varias fechas de corte en un solo escaneo"""
+    try:
+        print(f"\n========== GET /trend/{filename} ==========")
+        
+        cortes_list = [c.strip() for c in cortes.split(",") if c.strip()]
+        if not cortes_list:
+            raise HTTPException(status_code=400, detail="Debe enviar al menos una fecha de corte")
+        if len(set(cortes_list)) > AnalysisMultiCutoffTrend.MAX_CORTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Máximo {AnalysisMultiCutoffTrend.MAX_CORTES} fechas de corte por solicitud"
+            )
+        for corte in cortes_list:
+            try:
+                datetime.strptime(corte, '%Y-%m-%d')
+            except ValueError:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Formato de fecha inválido: {corte}. Use YYYY-MM-DD"
+                )
+        
+        kw_list = None
+        if keywords and keywords.strip():
+            kw_list = [k.strip().lower() for k in keywords.split(",") if k.strip()]
+        
+        with query_profile_scope(profile) as query_profile:
+            result = technical_note_controller.get_trend_report(
+                filename=filename,
+                cortes=cortes_list,
+                keywords=kw_list,
+                departamento=departamento,
+                municipio=municipio,
+                ips=ips
+            )
+        result["query_profile"] = query_profile.summary()
+        
+        print(f"Tendencia completada: {result.get('total_series', 0)} series")
+        
+        if format == "csv":
+            rows = [
+                {
+                    "Actividad": serie["column"],
+                    "Palabra Clave": serie["keyword"],
+                    "Rango Edad": serie["age_range"],
+                    "Fecha Corte": point["corte_fecha"],
+                    "Numerador": point["numerador"],
+                    "Denominador": point["denominador"],
+                    "Cobertura %": point["cobertura_porcentaje"],
+                    "Semaforización": point["semaforizacion"]
+                }
+                for serie in result.get("series", [])
+                for point in serie["points"]
+            ]
+            buffer = BytesIO()
+            pd.DataFrame(rows).to_csv(buffer, index=False, sep=';', encoding='utf-8-sig')
+            buffer.seek(0)
+            base_name = os.path.splitext(filename)[0]
+            return StreamingResponse(
+                buffer,
+                media_type="text/csv",
+                headers={"Content-Disposition": f'attachment; filename="tendencia_{base_name}.csv"'}
+            )
+        
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error en /trend/{filename}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
 # ========== ENDPOINTS DE VALORES ÚNICOS ==========
 
 
@@ -482,6 +660,21 @@ def get_inasistentes_report(
                 detail="Debe seleccionar al menos una edad"
             )
         
+        # Paginación opcional del detalle (sin page se retorna completo)
+        page = request.get("page")
+        page_size = request.get("pageSize", 1000)
+        if page is not None:
+            try:
+                page = int(page)
+                page_size = int(page_size)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="page y pageSize deben ser enteros")
+            if page < 1 or not 10 <= page_size <= 5000:
+                raise HTTPException(
+                    status_code=400,
+                    detail="page debe ser >= 1 y pageSize entre 10 y 5000"
+                )
+        
         result = technical_note_controller.get_inasistentes_report(
             filename=filename,
             selected_months=selected_months,
@@ -490,7 +683,10 @@ def get_inasistentes_report(
             corte_fecha=corte_fecha,
             departamento=request.get("departamento"),
             municipio=request.get("municipio"),
-            ips=request.get("ips")
+            ips=request.get("ips"),
+            page=page,
+            page_size=page_size if page is not None else None,
+            count_only=bool(request.get("countOnly", False))
         )
         
         if not result.get("success"):
@@ -532,7 +728,8 @@ def export_inasistentes_csv(
             corte_fecha=corte_fecha,
             departamento=request.get("departamento"),
             municipio=request.get("municipio"),
-            ips=request.get("ips")
+            ips=request.get("ips"),
+            encoding=request.get("encoding", "cp1252")
         )
         
         return csv_response
@@ -543,31 +740,158 @@ def export_inasistentes_csv(
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+@router.post("/inasistentes-report/{filename}/por-persona")
+def get_inasistentes_por_persona(
+    filename: str,
+    request: Dict[str, Any],
+    corte_fecha: str = Query(..., description=mandatory_date)
+):
+    """Inasistentes deduplicados: una fila por persona con actividades faltantes y prioridad"""
+    try:
+        print(f"POST /inasistentes-report/{filename}/por-persona")
+        
+        selected_months = request.get("selectedMonths", [])
+        selected_years = request.get("selectedYears", [])
+        
+        try:
+            datetime.strptime(corte_fecha, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Fecha debe tener formato YYYY-MM-DD")
+        
+        if not selected_months and not selected_years:
+            raise HTTPException(status_code=400, detail="Debe seleccionar al menos una edad")
+        
+        try:
+            page = int(request.get("page", 1))
+            page_size = int(request.get("pageSize", 1000))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="page y pageSize deben ser enteros")
+        if page < 1 or not 10 <= page_size <= 5000:
+            raise HTTPException(status_code=400, detail="page debe ser >= 1 y pageSize entre 10 y 5000")
+        
+        result = technical_note_controller.get_inasistentes_por_persona(
+            filename=filename,
+            selected_months=selected_months,
+            selected_years=selected_years,
+            selected_keywords=request.get("selectedKeywords", []),
+            corte_fecha=corte_fecha,
+            departamento=request.get("departamento"),
+            municipio=request.get("municipio"),
+            ips=request.get("ips"),
+            page=page,
+            page_size=page_size
+        )
+        
+        if not result.get("success"):
+            raise HTTPException(status_code=500, detail=result.get("error"))
+        
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@router.post("/inasistentes-report/{filename}/por-persona/export-csv")
+def export_inasistentes_por_persona_csv(
+    filename: str,
+    request: Dict[str, Any],
+    corte_fecha: str = Query(..., description=mandatory_date)
+):
+    """Exporta inasistentes por persona a CSV en flujo"""
+    try:
+        print(f"POST /inasistentes-report/{filename}/por-persona/export-csv")
+        
+        selected_months = request.get("selectedMonths", [])
+        selected_years = request.get("selectedYears", [])
+        
+        if not selected_months and not selected_years:
+            raise HTTPException(status_code=400, detail="Debe seleccionar al menos una edad")
+        
+        return technical_note_controller.export_inasistentes_por_persona_csv(
+            filename=filename,
+            selected_months=selected_months,
+            selected_years=selected_years,
+            selected_keywords=request.get("selectedKeywords", []),
+            corte_fecha=corte_fecha,
+            departamento=request.get("departamento"),
+            municipio=request.get("municipio"),
+            ips=request.get("ips")
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
 # ========== ENDPOINTS DE EXPORTACIÓN ==========
 
 
+def _parse_byte_range(range_header: str, size: int) -> Optional[tuple]:
+    """Interpreta 'bytes=inicio-fin' (un solo rango); None si no es satisfacible"""
+    try:
+        unit, _, spec = range_header.partition("=")
+        if unit.strip().lower() != "bytes" or "," in spec:
+            return None
+        start_text, _, end_text = spec.strip().partition("-")
+        if start_text == "":
+            length = int(end_text)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = min(int(end_text), size - 1) if end_text else size - 1
+        return (start, end) if start <= end else None
+    except ValueError:
+        return None
+
+
 @router.get("/reports/download/{file_id}")
-async def download_report_file(file_id: str):
-    """Descargar archivo desde memoria"""
+async def download_report_file(file_id: str, request: Request):
+    """Descargar archivo exportado (memoria o disco) con soporte de Range"""
     try:
         file_info = report_exporter.get_temp_file(file_id)
         
         if not file_info:
             raise HTTPException(status_code=404, detail="Archivo no encontrado")
         
-        content = file_info['content']
         filename = file_info['filename']
         content_type = file_info['content_type']
         
-        content.seek(0)
+        # En disco: FileResponse usa sendfile y atiende Range por sí mismo
+        if file_info['path']:
+            return FileResponse(
+                file_info['path'],
+                media_type=content_type,
+                filename=filename
+            )
         
-        return StreamingResponse(
-            content,
-            media_type=content_type,
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}"'
-            }
-        )
+        data = file_info['data']
+        headers = {
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Accept-Ranges': 'bytes'
+        }
+        
+        range_header = request.headers.get('range')
+        if range_header:
+            byte_range = _parse_byte_range(range_header, len(data))
+            if byte_range is None:
+                return Response(
+                    status_code=416,
+                    headers={'Content-Range': f'bytes */{len(data)}'}
+                )
+            start, end = byte_range
+            headers['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+            return Response(
+                content=data[start:end + 1],
+                status_code=206,
+                media_type=content_type,
+                headers=headers
+            )
+        
+        return Response(content=data, media_type=content_type, headers=headers)
         
     except HTTPException:
         raise
@@ -576,6 +900,35 @@ async def download_report_file(file_id: str):
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+@router.get("/reports/storage-stats")
+async def get_report_storage_stats():
+    """Tamaño del almacén de archivos exportados y conteo de desalojos"""
+    return {"success": True, "stats": report_exporter.get_storage_stats()}
+
+
+@router.get("/reports/pdf-jobs/{job_id}")
+async def get_pdf_job_status(job_id: str):
+    """Estado de un PDF encolado en el pool de render"""
+    job = report_exporter.get_pdf_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo de PDF no encontrado")
+    
+    return {
+        "success": True,
+        "job": {
+            **job,
+            "submitted_at": job['submitted_at'].isoformat(),
+            "finished_at": job['finished_at'].isoformat() if job['finished_at'] else None
+        }
+    }
+
+
+@router.get("/reports/pdf-metrics")
+async def get_pdf_metrics():
+    """Métricas del pool de render de PDF (páginas, tiempos, trabajos)"""
+    return {"success": True, "metrics": report_exporter.get_pdf_metrics()}
+
+
 @router.post("/reports/export-current")
 async def export_current_report(
     request_data: dict,
@@ -608,14 +961,43 @@ async def export_current_report(
         print(f"Exportando: {len(report_data.get('items', []))} items")
         print(f"Fecha corte: {corte_fecha}")
         
+        export_pdf = export_options.get('export_pdf', False)
+        include_temporal = export_options.get('include_temporal', True)
+        
+        # CSV en la petición; el PDF se renderiza en el pool de procesos
         export_result = report_exporter.export_report(
             report_data=report_data,
             base_filename=filename,
             export_csv=export_options.get('export_csv', True),
-            export_pdf=export_options.get('export_pdf', False),
-            include_temporal=export_options.get('include_temporal', True)
+            export_pdf=False,
+            include_temporal=include_temporal
         )
         
+        if export_pdf and export_result.get('success'):
+            pdf_job = report_exporter.submit_pdf_job(report_data, filename, include_temporal)
+            job_id = pdf_job['job_id']
+            
+            if export_options.get('async_pdf', False):
+                # El cliente consulta status_link y descarga cuando termine
+                export_result['pdf_job'] = pdf_job
+            else:
+                # Se espera sin bloquear el event loop
+                try:
+                    await asyncio.wrap_future(report_exporter.pdf_pool.get_future(job_id))
+                except Exception as e:
+                    print(f"PDF no generado: {e}")
+                
+                job = report_exporter.get_pdf_job(job_id)
+                if job and job['status'] == 'done':
+                    export_result['files']['pdf'] = job_id
+                    export_result['download_links']['pdf'] = pdf_job['download_link']
+                    export_result['pdf_metrics'] = {
+                        'job_id': job_id,
+                        'pages': job['pages'],
+                        'render_seconds': job['render_seconds']
+                    }
+                    export_result['message'] = f"Exportación completada: {len(export_result['files'])} archivo(s)"
+        
         background_tasks.add_task(report_exporter.cleanup_old_temp_files, 30)
         
         print(f"Exportación completada: {len(export_result.get('files', {}))} archivos")
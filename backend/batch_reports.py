@@ -0,0 +1,79 @@
+# batch_reports.py - Generación de reportes de nota técnica por lotes (sin frontend)
+"""
+Ejemplo:
+    python batch_reports.py --input-dir ./notas_tecnicas --output-dir ./reportes_2025_07 \
+        --cortes 2025-06-30,2025-07-31 --departamentos "*" --formatos csv,pdf --procesos 8
+"""
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _split_list(value: str):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Reportes de nota técnica por lotes")
+    parser.add_argument("--input-dir", required=True, help="Directorio con archivos CSV/Excel de nota técnica")
+    parser.add_argument("--output-dir", required=True, help="Directorio donde se escriben los reportes")
+    parser.add_argument("--cortes", required=True, help="Fechas de corte YYYY-MM-DD separadas por coma")
+    parser.add_argument("--departamentos", default="",
+                        help="Departamentos separados por coma; '*' para todos los del archivo")
+    parser.add_argument("--sin-total", action="store_true", help="No generar el reporte del archivo completo")
+    parser.add_argument("--keywords", default="", help="Palabras clave separadas por coma (por defecto las de nota técnica)")
+    parser.add_argument("--min-count", type=int, default=0)
+    parser.add_argument("--formatos", default="csv,pdf", help="csv, pdf y/o json separados por coma")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, núcleos)")
+    parser.add_argument("--fases-paralelas", type=int, default=1,
+                        help="Fases del reporte en paralelo dentro de cada proceso")
+    parser.add_argument("--memory-limit", default=None, help="Límite de memoria DuckDB por proceso, ej. 2GB")
+    parser.add_argument("--reiniciar", action="store_true", help="Ignorar progreso previo y regenerar todo")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    # Rutas relativas del backend (assets, logs) igual que el servidor
+    input_dir = os.path.abspath(args.input_dir)
+    output_dir = os.path.abspath(args.output_dir)
+    os.chdir(BACKEND_DIR)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    from services.technical_note_services.batch_report_service import BatchReportRunner
+
+    formats = [fmt.lower() for fmt in _split_list(args.formatos)]
+    invalid = [fmt for fmt in formats if fmt not in ("csv", "pdf", "json")]
+    if invalid or not formats:
+        print(f"Formatos inválidos: {invalid or args.formatos}")
+        return 2
+
+    try:
+        runner = BatchReportRunner(
+            input_dir=input_dir,
+            output_dir=output_dir,
+            cortes=_split_list(args.cortes),
+            departamentos=_split_list(args.departamentos),
+            include_total=not args.sin_total,
+            keywords=[k.lower() for k in _split_list(args.keywords)] or None,
+            min_count=args.min_count,
+            formats=formats,
+            workers=args.procesos,
+            phase_workers=args.fases_paralelas,
+            memory_limit=args.memory_limit,
+            resume=not args.reiniciar
+        )
+        summary = runner.run()
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+
+    return 0 if summary["success"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
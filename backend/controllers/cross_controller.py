@@ -1,8 +1,10 @@
 # controllers/cross_controller.py - CORREGIR DEFINICIÓN DEL MÉTODO
 
+from datetime import datetime
 from typing import Dict, Any
-from models.schemas import FileCrossRequest
+from models.schemas import CrossPipelineRequest, FileCrossRequest
 from services.duckdb_service.duckdb_service import duckdb_service
+from services.aux_duckdb_services.registry import registry
 
 class CrossController:
     """Controlador para operaciones de cruce de archivos"""
@@ -43,7 +45,8 @@ class CrossController:
             key_column_file1=request.key_column_file1,
             key_column_file2=request.key_column_file2,
             join_type=request.cross_type.upper(),
-            columns_to_include=request.columns_to_include
+            columns_to_include=request.columns_to_include,
+            key_normalization=request.key_normalization
         )
         
         if not result.get("success"):
@@ -53,14 +56,44 @@ class CrossController:
         return result
 
 
-    def _build_success_response(self, result: dict) -> dict:
-        """Construye respuesta exitosa del cruce"""
+    def _register_result_file(self, result: dict, cross_source: dict):
+        """Registra el resultado en el almacenamiento de archivos para usar /data, /columns y /file"""
+        file_controller_instance = registry.get('file_controller')
+        if not file_controller_instance:
+            print("file_controller no disponible, resultado solo registrado en DuckDB")
+            return
+        
+        result_id = result["result_id"]
+        file_controller_instance.storage_manager.store_file_info(result_id, {
+            "ext": "parquet",
+            "original_name": result_id,
+            "path": result["parquet_path"],
+            "columns": result["columns"],
+            "row_count": result["total_rows"],
+            "sheets": [],
+            "default_sheet": None,
+            "upload_type": "cross_result",
+            "user_uploaded": False,
+            "cross_source": cross_source
+        })
+
+
+    def _build_success_response(self, result: dict, preview_rows: int) -> dict:
+        """Construye respuesta exitosa del cruce con una primera página del resultado"""
+        preview_df = self.duckdb_service.cross_files.read_result_page(
+            result["result_id"], preview_rows
+        )
+        
         return {
             "success": True,
-            "data": result["data"],
+            "result_id": result["result_id"],
+            "data": preview_df.to_dict(orient="records"),
             "columns": result["columns"],
             "total_rows": result["total_rows"],
+            "preview_rows": len(preview_df),
+            "has_more": result["total_rows"] > len(preview_df),
             "statistics": result.get("statistics", {}),
+            "lookup_index": result.get("metadata", {}).get("lookup_index"),
             "ultra_fast": True,
             "method": "robust_cross_join_validated"
         }
@@ -120,7 +153,14 @@ class CrossController:
             # PASO 2: Ejecutar cruce
             try:
                 result = self._execute_cross_join(request)
-                return self._build_success_response(result)
+                self._register_result_file(result, {
+                    "file1_key": request.file1_key,
+                    "file2_key": request.file2_key,
+                    "key_column_file1": request.key_column_file1,
+                    "key_column_file2": request.key_column_file2,
+                    "key_normalization": request.key_normalization
+                })
+                return self._build_success_response(result, request.preview_rows)
                 
             except Exception as join_error:
                 print(f"Error específico en cruce: {join_error}")
@@ -139,6 +179,94 @@ class CrossController:
             raise ValueError(enhanced_msg)
 
 
+    def perform_cross_pipeline(self, request: CrossPipelineRequest) -> Dict[str, Any]:
+        """Ejecuta varios BUSCARX encadenados con claves compuestas en una sola consulta"""
+        try:
+            steps = [step.model_dump() for step in request.steps]
+            for number, step in enumerate(steps, start=1):
+                print(f"      Paso {number}: {step['file_key']} por {step['base_key_columns']}")
+            
+            result = self.duckdb_service.cross_pipeline_ultra_fast(
+                base_file_id=request.base_file_key,
+                steps=steps,
+                base_columns=request.base_columns
+            )
+            if not result.get("success"):
+                raise ValueError(result.get("error") or "El pipeline de cruce no fue exitoso")
+            
+            self._register_result_file(result, {
+                "base_file_key": request.base_file_key,
+                "steps": steps
+            })
+            return self._build_success_response(result, request.preview_rows)
+            
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise ValueError(self._enhance_error_message(e))
+
+
+    DOWNLOAD_MEDIA_TYPES = {
+        "csv": "text/csv; charset=utf-8",
+        "parquet": "application/octet-stream"
+    }
+
+    def perform_cross_download(self, request: FileCrossRequest, output_format: str = "csv") -> Dict[str, Any]:
+        """Prepara el cruce para descarga en streaming (CSV o Parquet) con las mismas columnas que /cross"""
+        try:
+            self._validate_key_columns(request)
+            self._validate_and_log_columns_to_include(request)
+            
+            result = self.duckdb_service.stream_cross_files(
+                file1_id=request.file1_key,
+                file2_id=request.file2_key,
+                key_column_file1=request.key_column_file1,
+                key_column_file2=request.key_column_file2,
+                columns_to_include=request.columns_to_include,
+                key_normalization=request.key_normalization,
+                output_format=output_format
+            )
+            if not result.get("success"):
+                raise ValueError(result.get("error") or "El cruce no fue exitoso")
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            return {
+                "success": True,
+                "stream": result["stream"],
+                "columns": result["columns"],
+                "filename": f"cruce_{timestamp}.{output_format}",
+                "media_type": self.DOWNLOAD_MEDIA_TYPES[output_format]
+            }
+            
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise ValueError(self._enhance_error_message(e))
+
+
+    def suggest_compatible_columns(self, file1_key: str, file2_key: str, limit: int = 10,
+                                   min_score: float = 0.15) -> Dict[str, Any]:
+        """Pares de columnas recomendados para cruzar, ordenados por solapamiento real de valores"""
+        result = self.duckdb_service.suggest_cross_columns(file1_key, file2_key, limit, min_score)
+        if not result.get("success"):
+            raise ValueError(result.get("error") or "No se pudieron calcular sugerencias de cruce")
+        return result
+
+
+    def get_lookup_index_stats(self) -> Dict[str, Any]:
+        """Estadísticas de los índices de búsqueda reutilizables"""
+        return {
+            "success": True,
+            **self.duckdb_service.cross_files.lookup_indexes.get_stats()
+        }
+
+
+    def clear_lookup_indexes(self) -> Dict[str, Any]:
+        """Elimina todos los índices de búsqueda cacheados"""
+        cleared = self.duckdb_service.cross_files.lookup_indexes.invalidate()
+        return {"success": True, "lookup_indexes_cleared": cleared}
+
+
     def _validate_file_loaded(self, file_id: str) -> dict:
         """Valida que el archivo existe y retorna su información"""
         if file_id not in self.duckdb_service.loaded_tables:
@@ -110,6 +110,20 @@ class CacheController:
             except Exception as e:
                 print(f"Error actualizando estadísticas de acceso: {e}")
 
+    def update_cache_metadata(self, file_id: str, updates: Dict[str, Any]):
+        """Agrega campos a la metadata de un archivo ya cacheado"""
+        if file_id not in self.file_cache:
+            return
+
+        self.file_cache[file_id].update(updates)
+
+        metadata_path = self.get_cache_metadata_path(file_id)
+        try:
+            with open(metadata_path, 'w', encoding='utf-8') as f:
+                json.dump(self.file_cache[file_id], f, indent=2)
+        except Exception as e:
+            print(f"Error actualizando metadata: {e}")
+
     def is_file_cached(self, file_path: str) -> tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
         """Verifica si el archivo ya está en cache con validación"""
         
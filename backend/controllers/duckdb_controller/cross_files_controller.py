@@ -1,14 +1,65 @@
+import io
+import os
 import time
-from typing import Dict, Any, List, Optional
+import uuid
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from utils.sql_utils import SQLUtils
+from services.aux_duckdb_services.column_sketch_cache import ColumnSketchCache
+from services.aux_duckdb_services.lookup_index_cache import LookupIndex, LookupIndexCache
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de escritura en memoria que entrega lo escrito por partes (streaming)"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
 
 class CrossFilesController:
     """Controlador para cruces de archivos (BUSCARX)"""
     
-    def __init__(self, conn, loaded_tables: Dict):
+    RESULT_PREFIX = "cruce_"
+    STREAM_FORMATS = ("csv", "parquet")
+    STREAM_BATCH_ROWS = int(os.getenv("CROSS_STREAM_BATCH_ROWS", "50000"))
+    
+    def __init__(self, conn, loaded_tables: Dict, results_dir: Optional[str] = None, dataset_layers=None):
         self.conn = conn
         self.loaded_tables = loaded_tables
+        # Versiones de archivos editados: cada cruce fija las que lee
+        self.dataset_layers = dataset_layers
         self.sql_utils = SQLUtils()
+        
+        # Directorio de resultados de cruce (Parquet), registrados como archivos lazy
+        self.results_dir = results_dir or os.path.abspath(os.path.join("parquet_cache", "cross_results"))
+        os.makedirs(self.results_dir, exist_ok=True)
+        
+        # Índices de búsqueda deduplicados reutilizables entre cruces
+        self.lookup_indexes = LookupIndexCache(os.path.join(self.results_dir, "lookup_indexes"))
+        
+        # Firmas de contenido por columna (MinHash + HLL) para sugerir claves de cruce
+        self.column_sketches = ColumnSketchCache()
 
     def _get_table_reference(self, table_info: dict) -> str:
         """Obtiene la referencia correcta de la tabla"""
@@ -17,6 +68,14 @@ class CrossFilesController:
         return table_info["table_name"]
 
 
+    def _pin_reference(self, file_id: str, pins: Optional[ExitStack]) -> str:
+        """Referencia de la versión actual del archivo, fijada hasta cerrar `pins`"""
+        table_ref = self._get_table_reference(self.loaded_tables[file_id])
+        if not self.dataset_layers or pins is None:
+            return table_ref
+        return pins.enter_context(self.dataset_layers.pinned_source(file_id, table_ref))
+
+
     def _validate_and_map_keys(self, key_column_file1: str, key_column_file2: str, 
                             real_cols_file1: list, real_cols_file2: list) -> tuple:
         """Valida y mapea las columnas clave"""
@@ -29,143 +88,275 @@ class CrossFilesController:
         return (mapped_key1, mapped_key2)
 
 
+    @staticmethod
+    def _unique_name(name: str, used: set) -> str:
+        """Nombre sin conflicto (sin distinguir mayúsculas), con sufijo _1, _2... como COPY de DuckDB"""
+        candidate, suffix = name, 0
+        while candidate.lower() in used:
+            suffix += 1
+            candidate = f"{name}_{suffix}"
+        used.add(candidate.lower())
+        return candidate
+
+
     def _build_select_clause(self, columns_to_include: Optional[Dict], 
                             real_cols_file1: list, real_cols_file2: list,
-                            mapped_key2: str, mapped_file1_cols: list = None) -> str:
-        """Construye la cláusula SELECT del query"""
-        if not columns_to_include:
-            return "base.*, lookup.*"
-        
-        select_parts = []
+                            mapped_key2: str, mapped_file1_cols: list = None) -> tuple:
+        """
+        Construye la cláusula SELECT del query. Los nombres de salida son únicos
+        para que /cross (COPY) y /cross-download (streaming) generen las mismas columnas.
+        Retorna (select_clause, nombres de salida de las columnas de búsqueda).
+        """
+        columns_to_include = columns_to_include or {}
         file1_cols = columns_to_include.get("file1_columns", [])
         file2_cols = columns_to_include.get("file2_columns", [])
         
         # Columnas del archivo base
         if file1_cols:
             mapped_file1_cols = self._map_user_columns_to_real(file1_cols, real_cols_file1)
-            for real_col in mapped_file1_cols:
-                escaped_col = self.sql_utils.escape_identifier(real_col)
-                select_parts.append(f"base.{escaped_col}")
+            base_cols = mapped_file1_cols
         else:
-            select_parts.append("base.*")
+            base_cols = real_cols_file1
+        select_parts = [f"base.{self.sql_utils.escape_identifier(col)}" for col in base_cols]
+        used_names = {col.lower() for col in base_cols}
         
         # Columnas de búsqueda
         if file2_cols:
-            mapped_file2_cols = self._map_user_columns_to_real(file2_cols, real_cols_file2)
-            for real_col in mapped_file2_cols:
-                escaped_col = self.sql_utils.escape_identifier(real_col)
-                # Evitar conflictos de nombres
-                if mapped_file1_cols and real_col == mapped_key2 and real_col in mapped_file1_cols:
-                    alias = self.sql_utils.escape_identifier(f"lookup_{real_col}")
-                    select_parts.append(f"lookup.{escaped_col} AS {alias}")
-                else:
-                    select_parts.append(f"lookup.{escaped_col}")
-        
-        return ", ".join(select_parts) if select_parts else "base.*"
-
-
-    def _build_vlookup_query(self, table1_ref: str, table2_ref: str, 
-                            select_clause: str, mapped_key1: str, mapped_key2: str) -> str:
-        """Construye el query VLOOKUP con QUALIFY"""
+            lookup_cols = self._map_user_columns_to_real(file2_cols, real_cols_file2)
+        else:
+            lookup_cols = real_cols_file2
+        lookup_aliases = []
+        for real_col in lookup_cols:
+            escaped_col = self.sql_utils.escape_identifier(real_col)
+            # Evitar conflictos de nombres
+            if mapped_file1_cols and real_col == mapped_key2 and real_col in mapped_file1_cols:
+                name = f"lookup_{real_col}"
+            else:
+                name = real_col
+            alias = self._unique_name(name, used_names)
+            lookup_aliases.append(alias)
+            if alias == real_col:
+                select_parts.append(f"lookup.{escaped_col}")
+            else:
+                select_parts.append(f"lookup.{escaped_col} AS {self.sql_utils.escape_identifier(alias)}")
+        
+        return (", ".join(select_parts) if select_parts else "base.*"), lookup_aliases
+
+
+    def _build_vlookup_query(self, table1_ref: str, lookup_index: LookupIndex,
+                            select_clause: str, mapped_key1: str) -> str:
+        """Construye el VLOOKUP contra el índice de búsqueda (ya deduplicado y normalizado)"""
         esc_key1 = self.sql_utils.escape_identifier(mapped_key1)
-        esc_key2 = self.sql_utils.escape_identifier(mapped_key2)
+        base_key = LookupIndexCache.key_expression(f"base.{esc_key1}", lookup_index.normalization)
         
         return f"""
         SELECT {select_clause}
         FROM {table1_ref} base
-        LEFT JOIN (
-            SELECT *
-            FROM {table2_ref}
-            QUALIFY ROW_NUMBER() OVER (PARTITION BY {esc_key2} ORDER BY {esc_key2}) = 1
-        ) lookup ON CAST(base.{esc_key1} AS VARCHAR) = CAST(lookup.{esc_key2} AS VARCHAR)
+        LEFT JOIN {lookup_index.table_ref} lookup
+            ON {base_key} = lookup.{LookupIndex.KEY_COLUMN}
         """
 
 
-    def _execute_and_validate_vlookup(self, vlookup_sql: str, expected_rows: int) -> tuple:
-        """Ejecuta el VLOOKUP y valida el resultado"""
-        # Validar con EXPLAIN
-        try:
-            self.conn.execute(f"EXPLAIN {vlookup_sql}").fetchall()
-        except Exception as explain_error:
-            raise ValueError(f"Error en EXPLAIN del VLOOKUP: {str(explain_error)}")
-        
-        # Ejecutar query
-        result_df = self.conn.execute(vlookup_sql).fetchdf()
-        total_rows = len(result_df)
-        
-        # Validar resultado
-        if total_rows != expected_rows:
-            print(f"ADVERTENCIA VLOOKUP: {total_rows} ≠ {expected_rows} esperados")
+    def _write_vlookup_result(self, vlookup_sql: str, result_path: str) -> int:
+        """Escribe el VLOOKUP directamente a Parquet; retorna filas escritas"""
+        escaped_path = result_path.replace("'", "''")
+        written = self.conn.execute(
+            f"COPY ({vlookup_sql}) TO '{escaped_path}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+        ).fetchone()
+        return int(written[0]) if written else 0
+
+
+    def _count_base_rows(self, table_info: Dict, table_ref: str) -> int:
+        """Filas del archivo base; para Parquet se leen de los metadatos sin escanear"""
+        if table_info.get("type") == "lazy":
+            escaped_path = table_info['parquet_path'].replace("'", "''")
+            row = self.conn.execute(
+                f"SELECT SUM(num_rows) FROM parquet_file_metadata('{escaped_path}')"
+            ).fetchone()
         else:
-            print(f"VLOOKUP PERFECTO: {total_rows} registros = {expected_rows} base")
+            row = self.conn.execute(f"SELECT COUNT(*) FROM {table_ref}").fetchone()
+        return int(row[0] or 0) if row else 0
+
+
+    def _match_condition(self, lookup_cols: List[str]) -> str:
+        """Fila con al menos un valor de búsqueda no vacío (mismo criterio que BUSCARX)"""
+        conditions = []
+        for col in lookup_cols:
+            escaped_col = self.sql_utils.escape_identifier(col)
+            conditions.append(
+                f"({escaped_col} IS NOT NULL AND CAST({escaped_col} AS VARCHAR) NOT IN ('', 'nan', 'None'))"
+            )
+        return " OR ".join(conditions)
+
+
+    def _count_matches_sql(self, result_ref: str, lookup_cols: List[str]) -> int:
+        """Cuenta filas con coincidencia en el resultado"""
+        if not lookup_cols:
+            return 0
         
-        return (result_df, total_rows)
+        row = self.conn.execute(
+            f"SELECT COUNT(*) FROM {result_ref} WHERE {self._match_condition(lookup_cols)}"
+        ).fetchone()
+        return int(row[0]) if row else 0
 
 
-    def cross_files_ultra_fast(
+    def _count_step_matches_sql(self, result_ref: str, cols_by_step: List[List[str]]) -> List[int]:
+        """Coincidencias de cada paso del pipeline en una sola agregación"""
+        aggregates = [
+            f"COUNT(*) FILTER (WHERE {self._match_condition(cols)})" if cols else "0"
+            for cols in cols_by_step
+        ]
+        row = self.conn.execute(f"SELECT {', '.join(aggregates)} FROM {result_ref}").fetchone()
+        return [int(value or 0) for value in row] if row else [0] * len(cols_by_step)
+
+
+    def _register_result(self, result_id: str, result_path: str, total_rows: int,
+                         columns: List[str], source: Dict[str, Any]):
+        """Registra el resultado como archivo lazy para paginarlo con /data"""
+        self.loaded_tables[result_id] = {
+            "table_name": self.sql_utils.sanitize_table_name(f"table_{result_id}"),
+            "parquet_path": result_path,
+            "loaded_at": datetime.now().isoformat(),
+            "load_time": 0.001,
+            "type": "lazy",
+            "total_rows": total_rows,
+            "columns": columns,
+            "cross_source": source
+        }
+
+
+    def read_result_page(self, result_id: str, limit: int, offset: int = 0):
+        """Lee una página del resultado de cruce como DataFrame"""
+        table_info = self.loaded_tables.get(result_id)
+        if not table_info:
+            raise ValueError(f"Resultado de cruce no encontrado: {result_id}")
+        
+        table_ref = self._get_table_reference(table_info)
+        return self.conn.execute(
+            f"SELECT * FROM {table_ref} LIMIT {int(limit)} OFFSET {int(offset)}"
+        ).fetchdf()
+
+
+    def _prepare_vlookup(
         self,
         file1_id: str,
         file2_id: str,
         key_column_file1: str,
         key_column_file2: str,
-        join_type: str = "LEFT",
-        columns_to_include: Optional[Dict[str, List[str]]] = None
+        columns_to_include: Optional[Dict[str, List[str]]] = None,
+        key_normalization: Optional[List[str]] = None,
+        pins: Optional[ExitStack] = None
     ) -> Dict[str, Any]:
-        """VLOOKUP/BUSCARX PERFECTO: Replica exactamente el comportamiento de Excel"""
-        
-        # Validaciones iniciales
+        """
+        Compila el VLOOKUP (mismas columnas para /cross y /cross-download).
+        Las versiones de ambos archivos quedan fijadas en `pins` hasta que el llamador lo cierre.
+        """
         if file1_id not in self.loaded_tables or file2_id not in self.loaded_tables:
             raise ValueError("Uno o ambos archivos no están cargados en DuckDB")
         
+        # PASO 1: Preparación de referencias y columnas
+        table1_info = self.loaded_tables[file1_id]
+        table2_info = self.loaded_tables[file2_id]
+        
+        table1_ref = self._pin_reference(file1_id, pins)
+        table2_ref = self._pin_reference(file2_id, pins)
+        
+        real_cols_file1 = self._get_source_columns(table1_ref)
+        real_cols_file2 = self._get_source_columns(table2_ref)
+        
+        # PASO 2: Mapear claves
+        mapped_key1, mapped_key2 = self._validate_and_map_keys(
+            key_column_file1, key_column_file2, real_cols_file1, real_cols_file2
+        )
+        
+        # PASO 3: Construir SELECT
+        select_clause, lookup_columns = self._build_select_clause(
+            columns_to_include, real_cols_file1, real_cols_file2, mapped_key2
+        )
+        
+        # PASO 4: Índice de búsqueda (primera coincidencia por clave), reutilizado si ya existe
+        lookup_index, lookup_from_cache = self.lookup_indexes.get(
+            self.conn, table2_ref, mapped_key2, LookupIndexCache.normalization_name(key_normalization)
+        )
+        
+        # PASO 5: Construir VLOOKUP
+        return {
+            "sql": self._build_vlookup_query(table1_ref, lookup_index, select_clause, mapped_key1),
+            "table1_info": table1_info,
+            "table1_ref": table1_ref,
+            "lookup_columns": lookup_columns,
+            "mapped_key1": mapped_key1,
+            "mapped_key2": mapped_key2,
+            "lookup_index": lookup_index,
+            "lookup_from_cache": lookup_from_cache
+        }
+
+
+    def cross_files_ultra_fast(
+        self,
+        file1_id: str,
+        file2_id: str,
+        key_column_file1: str,
+        key_column_file2: str,
+        join_type: str = "LEFT",
+        columns_to_include: Optional[Dict[str, List[str]]] = None,
+        key_normalization: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        VLOOKUP/BUSCARX PERFECTO: Replica exactamente el comportamiento de Excel.
+        key_normalization (trim, upper, digits, strip_zeros) normaliza ambas claves antes de cruzar.
+        """
         start_time = time.time()
+        pins = ExitStack()
         
         try:
-            # PASO 1: Preparación de referencias y columnas
-            table1_info = self.loaded_tables[file1_id]
-            table2_info = self.loaded_tables[file2_id]
-            
-            table1_ref = self._get_table_reference(table1_info)
-            table2_ref = self._get_table_reference(table2_info)
-            
-            real_cols_file1 = self._get_table_columns(table1_info)
-            real_cols_file2 = self._get_table_columns(table2_info)
-            
-            # PASO 2: Contar registros base
-            expected_rows = self.conn.execute(f"SELECT COUNT(*) FROM {table1_ref}").fetchone()[0]
-            
-            # PASO 3: Mapear claves
-            mapped_key1, mapped_key2 = self._validate_and_map_keys(
-                key_column_file1, key_column_file2, real_cols_file1, real_cols_file2
+            # PASO 1-5: Claves, SELECT, índice de búsqueda y VLOOKUP
+            plan = self._prepare_vlookup(
+                file1_id, file2_id, key_column_file1, key_column_file2,
+                columns_to_include, key_normalization, pins
             )
+            vlookup_sql = plan["sql"]
+            table1_info = plan["table1_info"]
+            table1_ref = plan["table1_ref"]
+            mapped_key1, mapped_key2 = plan["mapped_key1"], plan["mapped_key2"]
+            lookup_index, lookup_from_cache = plan["lookup_index"], plan["lookup_from_cache"]
             
-            # PASO 4: Construir SELECT
-            select_clause = self._build_select_clause(
-                columns_to_include, real_cols_file1, real_cols_file2, mapped_key2
-            )
+            # Escribir el VLOOKUP a Parquet (sin materializar en Python)
+            result_id = f"{self.RESULT_PREFIX}{uuid.uuid4().hex[:12]}"
+            result_path = os.path.join(self.results_dir, f"{result_id}.parquet")
+            total_rows = self._write_vlookup_result(vlookup_sql, result_path)
             
-            # PASO 5: Construir y ejecutar VLOOKUP
-            vlookup_sql = self._build_vlookup_query(
-                table1_ref, table2_ref, select_clause, mapped_key1, mapped_key2
-            )
+            expected_rows = self._count_base_rows(table1_info, table1_ref)
+            if total_rows != expected_rows:
+                print(f"ADVERTENCIA VLOOKUP: {total_rows} ≠ {expected_rows} esperados")
+            else:
+                print(f"VLOOKUP PERFECTO: {total_rows} registros = {expected_rows} base")
+            
+            # PASO 6: Contar matches en SQL sobre las columnas de búsqueda emitidas
+            result_info = {"type": "lazy", "parquet_path": result_path}
+            result_columns = self._get_table_columns(result_info)
             
-            result_df, total_rows = self._execute_and_validate_vlookup(vlookup_sql, expected_rows)
+            matches = self._count_matches_sql(self._get_table_reference(result_info), plan["lookup_columns"])
             cross_time = time.time() - start_time
             
-            # PASO 6: Contar matches
-            file2_cols = columns_to_include.get("file2_columns", []) if columns_to_include else []
-            mapped_file2_cols = self._map_user_columns_to_real(file2_cols, real_cols_file2) if file2_cols else []
-            matches, no_matches = self._count_matches(result_df, mapped_file2_cols)
+            self._register_result(result_id, result_path, total_rows, result_columns, {
+                "file1_id": file1_id,
+                "file2_id": file2_id,
+                "key_column_file1": mapped_key1,
+                "key_column_file2": mapped_key2
+            })
             
             return {
                 "success": True,
+                "result_id": result_id,
+                "parquet_path": result_path,
                 "total_rows": total_rows,
-                "columns": list(result_df.columns),
-                "data": result_df.to_dict(orient="records"),
+                "columns": result_columns,
                 "statistics": {
                     "total_rows": total_rows,
                     "expected_base_rows": expected_rows,
                     "matched_rows": matches,
-                    "no_match_rows": no_matches,
+                    "no_match_rows": total_rows - matches,
                     "processing_time": cross_time,
                     "method": "vlookup_excel_perfect_replica",
                     "vlookup_perfect": total_rows == expected_rows
@@ -174,28 +365,381 @@ class CrossFilesController:
                     "engine": "DuckDB",
                     "join_type": "VLOOKUP/BUSCARX",
                     "excel_equivalent": True,
-                    "processing_strategy": "qualify_row_number_first_match",
+                    "processing_strategy": "cached_first_match_lookup_index",
                     "base_records_preserved": True,
                     "lookup_behavior": "first_match_only",
-                    "no_row_multiplication": True
+                    "no_row_multiplication": True,
+                    "storage": "parquet_result_dataset",
+                    "lookup_index": {
+                        "from_cache": lookup_from_cache,
+                        "keys": lookup_index.rows,
+                        "normalization": lookup_index.normalization
+                    }
                 }
             }
         
         except Exception as e:
             print(f"   Error: {str(e)}")
+            if 'result_path' in locals() and os.path.exists(result_path):
+                os.remove(result_path)
             if 'vlookup_sql' in locals():
                 print(f"VLOOKUP SQL generado:\n{'='*60}\n{vlookup_sql}\n{'='*60}")
             raise e
+        finally:
+            pins.close()
+
+
+    def stream_cross(
+        self,
+        file1_id: str,
+        file2_id: str,
+        key_column_file1: str,
+        key_column_file2: str,
+        columns_to_include: Optional[Dict[str, List[str]]] = None,
+        key_normalization: Optional[List[str]] = None,
+        output_format: str = "csv",
+        batch_rows: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Mismo VLOOKUP que /cross, pero el resultado se emite por lotes de registros
+        (CSV o Parquet) sin materializarse en memoria ni en disco.
+        La consulta se prepara aquí para que los errores salgan antes de la descarga.
+        """
+        if output_format not in self.STREAM_FORMATS:
+            raise ValueError(f"Formato de descarga no soportado: {output_format}. Use csv o parquet")
+        
+        # Versiones fijadas y cursor se liberan cuando termina (o se corta) la descarga
+        resources = ExitStack()
+        try:
+            plan = self._prepare_vlookup(
+                file1_id, file2_id, key_column_file1, key_column_file2,
+                columns_to_include, key_normalization, resources
+            )
+        except Exception:
+            resources.close()
+            raise
+        
+        # Cursor propio: la descarga no bloquea ni comparte resultado con la conexión principal
+        cursor = self.conn.cursor()
+        resources.callback(cursor.close)
+        try:
+            reader = cursor.execute(plan["sql"]).fetch_record_batch(batch_rows or self.STREAM_BATCH_ROWS)
+        except Exception:
+            resources.close()
+            print(f"VLOOKUP SQL generado:\n{'='*60}\n{plan['sql']}\n{'='*60}")
+            raise
+        
+        writer = self._stream_csv if output_format == "csv" else self._stream_parquet
+        print(f"📤 Cruce en streaming ({output_format}): {file1_id} ← {file2_id}")
+        return {
+            "success": True,
+            "columns": list(reader.schema.names),
+            "stream": writer(reader, resources),
+            "lookup_index": {
+                "from_cache": plan["lookup_from_cache"],
+                "keys": plan["lookup_index"].rows,
+                "normalization": plan["lookup_index"].normalization
+            }
+        }
+
+
+    @staticmethod
+    def _stream_csv(reader, resources: ExitStack) -> Iterator[bytes]:
+        """CSV con todos los valores entre comillas; el encabezado sale aunque no haya filas"""
+        try:
+            buffer = io.BytesIO()
+            pa_csv.write_csv(
+                reader.schema.empty_table(), buffer,
+                pa_csv.WriteOptions(include_header=True, quoting_style="all_valid")
+            )
+            yield buffer.getvalue()
+            
+            options = pa_csv.WriteOptions(include_header=False, quoting_style="all_valid")
+            for batch in reader:
+                buffer = io.BytesIO()
+                pa_csv.write_csv(batch, buffer, options)
+                yield buffer.getvalue()
+        finally:
+            resources.close()
+
+
+    @staticmethod
+    def _stream_parquet(reader, resources: ExitStack) -> Iterator[bytes]:
+        """Parquet (ZSTD) escrito lote a lote; cada lote es un row group"""
+        sink = _ChunkSink()
+        try:
+            with pq.ParquetWriter(sink, reader.schema, compression="zstd") as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            yield sink.drain()
+        finally:
+            resources.close()
+
+
+    def _resolve_pipeline_step(self, number: int, step: Dict[str, Any],
+                               available: Dict[str, str], pins: ExitStack) -> Dict[str, Any]:
+        """Valida un paso del pipeline y mapea sus claves y columnas a las reales"""
+        file_id = step["file_key"]
+        if file_id not in self.loaded_tables:
+            raise ValueError(f"Paso {number}: el archivo {file_id} no está cargado en DuckDB")
+        
+        base_keys = step.get("base_key_columns") or []
+        lookup_keys = step.get("lookup_key_columns") or []
+        if not base_keys or len(base_keys) != len(lookup_keys):
+            raise ValueError(
+                f"Paso {number}: las claves del archivo base y del archivo de búsqueda deben tener el mismo número de columnas"
+            )
+        
+        # Las claves pueden ser columnas del archivo base o de pasos anteriores
+        key_exprs = []
+        for key in base_keys:
+            mapped = self._map_column_to_real(key, list(available.keys()))
+            if not mapped:
+                raise ValueError(
+                    f"Paso {number}: la columna clave '{key}' no existe en el archivo base ni en pasos anteriores"
+                )
+            key_exprs.append(available[mapped])
+        
+        lookup_ref = self._pin_reference(file_id, pins)
+        lookup_cols = self._get_source_columns(lookup_ref)
+        mapped_lookup_keys = self._map_user_columns_to_real(lookup_keys, lookup_cols)
+        
+        include_cols = step.get("columns_to_include") or []
+        if include_cols:
+            include_cols = self._map_user_columns_to_real(include_cols, lookup_cols)
+        else:
+            include_cols = [col for col in lookup_cols if col not in mapped_lookup_keys]
+        
+        return {
+            "file_id": file_id,
+            "lookup_ref": lookup_ref,
+            "key_exprs": key_exprs,
+            "lookup_keys": mapped_lookup_keys,
+            "include_cols": include_cols,
+            "normalization": LookupIndexCache.normalization_name(step.get("key_normalization")),
+            "prefix": step.get("prefix") or ""
+        }
+
+
+    def cross_pipeline(
+        self,
+        base_file_id: str,
+        steps: List[Dict[str, Any]],
+        base_columns: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Pipeline de BUSCARX encadenados con claves compuestas: todos los pasos se
+        compilan en una sola consulta, el archivo base se lee una vez y el resultado
+        se escribe directamente a Parquet.
+        """
+        if base_file_id not in self.loaded_tables:
+            raise ValueError(f"El archivo base {base_file_id} no está cargado en DuckDB")
+        if not steps:
+            raise ValueError("El pipeline debe tener al menos un paso")
+        
+        start_time = time.time()
+        pins = ExitStack()
+        
+        try:
+            # PASO 1: Columnas del archivo base (versiones fijadas hasta terminar el pipeline)
+            base_ref = self._pin_reference(base_file_id, pins)
+            base_real_cols = self._get_source_columns(base_ref)
+            selected_base = (
+                self._map_user_columns_to_real(base_columns, base_real_cols)
+                if base_columns else base_real_cols
+            )
+            
+            available = {
+                col: f"base.{self.sql_utils.escape_identifier(col)}" for col in base_real_cols
+            }
+            select_parts = [f"base.{self.sql_utils.escape_identifier(col)}" for col in selected_base]
+            output_names = list(selected_base)
+            used_names = {col.lower() for col in selected_base}
+            joins = []
+            step_summaries = []
+            cols_by_step = []
+            
+            # PASO 2: Un LEFT JOIN por paso contra su índice de búsqueda
+            for number, step in enumerate(steps, start=1):
+                resolved = self._resolve_pipeline_step(number, step, available, pins)
+                lookup_index, from_cache = self.lookup_indexes.get(
+                    self.conn, resolved["lookup_ref"], resolved["lookup_keys"], resolved["normalization"]
+                )
+                
+                alias = f"l{number}"
+                base_key = LookupIndexCache.composite_key_expression(
+                    resolved["key_exprs"], lookup_index.normalization
+                )
+                joins.append(
+                    f"LEFT JOIN {lookup_index.table_ref} {alias} ON {base_key} = {alias}.{LookupIndex.KEY_COLUMN}"
+                )
+                
+                step_outputs = []
+                for col in resolved["include_cols"]:
+                    name = self._unique_name(f"{resolved['prefix']}{col}", used_names)
+                    column_expr = f"{alias}.{self.sql_utils.escape_identifier(col)}"
+                    select_parts.append(f"{column_expr} AS {self.sql_utils.escape_identifier(name)}")
+                    output_names.append(name)
+                    step_outputs.append(name)
+                    available[name] = column_expr
+                
+                cols_by_step.append(step_outputs)
+                step_summaries.append({
+                    "step": number,
+                    "file_id": resolved["file_id"],
+                    "lookup_key_columns": resolved["lookup_keys"],
+                    "key_normalization": lookup_index.normalization,
+                    "columns_added": step_outputs,
+                    "lookup_index_from_cache": from_cache
+                })
+            
+            pipeline_sql = "\n".join([
+                f"SELECT {', '.join(select_parts)}",
+                f"FROM {base_ref} base",
+                *joins
+            ])
+            
+            # PASO 3: Escribir a Parquet y calcular coincidencias por paso en SQL
+            result_id = f"{self.RESULT_PREFIX}{uuid.uuid4().hex[:12]}"
+            result_path = os.path.join(self.results_dir, f"{result_id}.parquet")
+            total_rows = self._write_vlookup_result(pipeline_sql, result_path)
+            
+            result_ref = self._get_table_reference({"type": "lazy", "parquet_path": result_path})
+            step_matches = self._count_step_matches_sql(result_ref, cols_by_step)
+            for summary, matches in zip(step_summaries, step_matches):
+                summary["matched_rows"] = matches
+                summary["no_match_rows"] = total_rows - matches
+            
+            cross_time = time.time() - start_time
+            print(f"Pipeline de cruce: {len(steps)} pasos, {total_rows:,} registros en {cross_time:.2f}s")
+            
+            self._register_result(result_id, result_path, total_rows, output_names, {
+                "base_file_id": base_file_id,
+                "steps": [summary["file_id"] for summary in step_summaries]
+            })
+            
+            return {
+                "success": True,
+                "result_id": result_id,
+                "parquet_path": result_path,
+                "total_rows": total_rows,
+                "columns": output_names,
+                "statistics": {
+                    "total_rows": total_rows,
+                    "steps": step_summaries,
+                    "processing_time": cross_time,
+                    "method": "vlookup_pipeline_single_query"
+                }
+            }
+        
+        except Exception as e:
+            print(f"   Error en pipeline de cruce: {str(e)}")
+            if 'result_path' in locals() and os.path.exists(result_path):
+                os.remove(result_path)
+            if 'pipeline_sql' in locals():
+                print(f"SQL del pipeline generado:\n{'='*60}\n{pipeline_sql}\n{'='*60}")
+            raise e
+        finally:
+            pins.close()
 
 
-    def _get_table_columns(self, table_info: Dict) -> List[str]:
+    def get_column_sketches(self, file_id: str, conn=None) -> tuple:
+        """Firmas de columnas del archivo (se construyen una vez por versión del Parquet)"""
+        if file_id not in self.loaded_tables:
+            raise ValueError(f"Archivo {file_id} no está cargado en DuckDB")
+        # Con el cursor del hilo en segundo plano: no se comparte la conexión principal
+        conn = conn or self.conn
+        with ExitStack() as pins:
+            table_ref = self._pin_reference(file_id, pins)
+            return self.column_sketches.get(conn, table_ref, self._get_source_columns(table_ref, conn))
+
+
+    @staticmethod
+    def _suggestion_recommendation(containment: float, low_cardinality: bool) -> str:
+        if low_cardinality:
+            return "Pocos valores distintos (categoría o bandera). No recomendado como clave"
+        if containment >= 0.7:
+            return "Altamente recomendado para cruce"
+        if containment >= 0.3:
+            return "Coincidencia parcial de valores. Verificar manualmente"
+        return "Pocos valores coincidentes"
+
+
+    def suggest_key_columns(self, file1_id: str, file2_id: str, limit: int = 10,
+                            min_score: float = 0.15) -> Dict[str, Any]:
+        """
+        Sugiere pares de columnas para cruzar según el solapamiento real de valores,
+        estimado con las firmas de ambos archivos (sin muestrear ni releer datos).
+        """
+        start_time = time.time()
+        sketches1, cached1 = self.get_column_sketches(file1_id)
+        sketches2, cached2 = self.get_column_sketches(file2_id)
+        
+        suggestions = []
+        for col1, sketch1 in sketches1.items():
+            if not sketch1.distinct:
+                continue
+            for col2, sketch2 in sketches2.items():
+                if not sketch2.distinct:
+                    continue
+                overlap = sketch1.overlap(sketch2)
+                containment = max(overlap["containment_left"], overlap["containment_right"])
+                low_cardinality = sketch1.low_cardinality or sketch2.low_cardinality
+                # Cada contención pesa según qué tan único es el lado contenido: los pocos
+                # valores de una categoría caben en cualquier columna, pero se repiten en casi todas las filas
+                score = max(
+                    overlap["containment_left"] * sketch1.uniqueness ** 0.5,
+                    overlap["containment_right"] * sketch2.uniqueness ** 0.5
+                )
+                if score < min_score:
+                    continue
+                
+                suggestions.append({
+                    "left_column": col1,
+                    "right_column": col2,
+                    "combined_score": round(score, 3),
+                    "jaccard": round(overlap["jaccard"], 3),
+                    "containment_left": round(overlap["containment_left"], 3),
+                    "containment_right": round(overlap["containment_right"], 3),
+                    "estimated_common_values": overlap["estimated_common_values"],
+                    "left_distinct": sketch1.distinct,
+                    "right_distinct": sketch2.distinct,
+                    "left_uniqueness": round(sketch1.uniqueness, 3),
+                    "right_uniqueness": round(sketch2.uniqueness, 3),
+                    "same_name": col1.strip().lower() == col2.strip().lower(),
+                    "recommendation": self._suggestion_recommendation(containment, low_cardinality)
+                })
+        
+        suggestions.sort(
+            key=lambda s: (s["combined_score"], s["jaccard"], s["same_name"]), reverse=True
+        )
+        return {
+            "success": True,
+            "file1_key": file1_id,
+            "file2_key": file2_id,
+            "suggestions": suggestions[:limit],
+            "total_candidates": len(suggestions),
+            "sketches_from_cache": cached1 and cached2,
+            "processing_time": round(time.time() - start_time, 3),
+            "method": "minhash_hll_overlap"
+        }
+
+
+    def _get_source_columns(self, table_ref: str, conn=None) -> List[str]:
+        """Columnas de una referencia SQL (vista fijada o read_parquet)"""
+        return [row[0] for row in (conn or self.conn).execute(f"DESCRIBE SELECT * FROM {table_ref}").fetchall()]
+
+    def _get_table_columns(self, table_info: Dict, conn=None) -> List[str]:
         """Obtiene columnas de una tabla o archivo Parquet"""
         if table_info.get("type") == "lazy":
             cols_sql = f"DESCRIBE SELECT * FROM read_parquet('{table_info['parquet_path']}')"
         else:
             cols_sql = f"DESCRIBE {table_info['table_name']}"
         
-        return [row[0] for row in self.conn.execute(cols_sql).fetchall()]
+        return [row[0] for row in (conn or self.conn).execute(cols_sql).fetchall()]
 
     def _map_column_to_real(self, user_column: str, real_columns: List[str]) -> str:
         """Mapea una columna de usuario a una columna real"""
@@ -222,22 +766,3 @@ class CrossFilesController:
             else:
                 raise ValueError(f"Columna '{user_col}' no existe en el archivo")
         return mapped_cols
-
-    def _count_matches(self, result_df, lookup_cols: List[str]) -> tuple:
-        """Cuenta matches y no-matches en el resultado"""
-        matches = 0
-        no_matches = 0
-        
-        for record in result_df.to_dict('records'):
-            has_match = False
-            for col in lookup_cols:
-                if col in record and record[col] is not None and str(record[col]) not in ['', 'nan', 'None']:
-                    has_match = True
-                    break
-            
-            if has_match:
-                matches += 1
-            else:
-                no_matches += 1
-        
-        return matches, no_matches
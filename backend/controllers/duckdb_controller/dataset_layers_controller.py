@@ -0,0 +1,792 @@
+# controllers/duckdb_controller/dataset_layers_controller.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+import numpy as np
+from utils.sql_utils import SQLUtils
+from services.aux_duckdb_services.sql_codition_filter import SqlConditionFilter
+from services.transformation_service import TransformationService
+
+
+class DatasetVersion:
+    """
+    Versión de un archivo: Parquet base, vectores de borrado (file_row_number)
+    y pila de transformaciones. Su contenido no cambia; la compactación solo
+    reemplaza su representación física por una base equivalente.
+    """
+
+    def __init__(self, version_id: int, base_path: str, base_rows: int, operation: str,
+                 deletion_vectors: Optional[List[str]] = None, deleted_rows: int = 0,
+                 transforms: Optional[List[Dict[str, Any]]] = None):
+        self.version_id = version_id
+        self.base_path = base_path
+        self.base_rows = base_rows
+        self.operation = operation
+        self.deletion_vectors: List[str] = list(deletion_vectors or [])
+        self.deleted_rows = deleted_rows
+        self.transforms: List[Dict[str, Any]] = list(transforms or [])
+        self.view_name: Optional[str] = None
+        self.mask_table: Optional[str] = None
+        self.created_at = time.time()
+
+    @property
+    def live_rows(self) -> int:
+        return self.base_rows - self.deleted_rows
+
+    @property
+    def has_layers(self) -> bool:
+        return bool(self.deletion_vectors or self.transforms)
+
+    def derive(self, version_id: int, operation: str, **changes) -> 'DatasetVersion':
+        """Nueva versión a partir de esta con los cambios indicados"""
+        values = {
+            "base_path": self.base_path,
+            "base_rows": self.base_rows,
+            "deletion_vectors": self.deletion_vectors,
+            "deleted_rows": self.deleted_rows,
+            "transforms": self.transforms
+        }
+        values.update(changes)
+        return DatasetVersion(version_id, operation=operation, **values)
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version_id,
+            "operation": self.operation,
+            "live_rows": self.live_rows,
+            "deleted_rows": self.deleted_rows,
+            "deletion_vectors": len(self.deletion_vectors),
+            "transforms": [
+                {"operation": layer["operation"], "params": layer["params"]} for layer in self.transforms
+            ],
+            "created_at": self.created_at
+        }
+
+
+class DatasetState:
+    """Historial de versiones de un archivo con puntero a la actual (deshacer/rehacer)"""
+
+    def __init__(self, file_id: str, table_name: str, initial: DatasetVersion):
+        self.file_id = file_id
+        self.table_name = table_name
+        self.history: List[DatasetVersion] = [initial]
+        self.current_index = 0
+        self.next_version_id = initial.version_id + 1
+        self.retired: List[DatasetVersion] = []
+        self.owned_files = set()
+        self.pins: Dict[int, int] = {}
+        self.compacting = False
+        self.lock = threading.RLock()
+
+    @property
+    def current(self) -> DatasetVersion:
+        return self.history[self.current_index]
+
+    def find(self, version_id: int) -> Optional[DatasetVersion]:
+        for version in self.history + self.retired:
+            if version.version_id == version_id:
+                return version
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        current = self.current
+        return {
+            "file_id": self.file_id,
+            "version": current.version_id,
+            "base_path": current.base_path,
+            "base_rows": current.base_rows,
+            "deleted_rows": current.deleted_rows,
+            "live_rows": current.live_rows,
+            "deletion_vectors": len(current.deletion_vectors),
+            "transforms": current.get_info()["transforms"],
+            "view_name": current.view_name,
+            "can_undo": self.current_index > 0,
+            "can_redo": self.current_index < len(self.history) - 1,
+            "versions": len(self.history),
+            "pinned_versions": sorted(self.pins),
+            "compacting": self.compacting
+        }
+
+
+class DatasetLayersController:
+    """
+    Cambios copy-on-write sobre el Parquet de cada archivo: las filas eliminadas
+    se registran como vectores de borrado (Parquet de file_row_number) y las
+    consultas los aplican a través de una vista por versión que filtra con una
+    máscara de bits. A diferencia de un ANTI JOIN, el filtro conserva el orden
+    de las filas con varios hilos (los índices de /data siguen siendo válidos).
+    Las transformaciones se apilan como proyecciones SQL sobre esas filas y se
+    evalúan al consultar. Cada edición crea una versión; deshacer/rehacer mueve
+    el puntero y los lectores fijan la versión que están usando.
+    """
+
+    ROW_ID = "file_row_number"
+    VECTOR_COLUMN = "__row_id"
+    COMPACTION_RATIO = float(os.getenv("DELETION_COMPACTION_RATIO", "0.3"))
+    MAX_VECTORS = int(os.getenv("DELETION_MAX_VECTORS", "16"))
+    MAX_TRANSFORMS = int(os.getenv("TRANSFORM_MAX_LAYERS", "8"))
+    MAX_VERSIONS = int(os.getenv("DATASET_MAX_VERSIONS", "20"))
+    HISTORY_BUDGET_BYTES = int(float(os.getenv("DATASET_HISTORY_BUDGET_MB", "2048")) * 1024 * 1024)
+    NUMERIC_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+    def __init__(self, conn, loaded_tables: Dict, layers_dir: Optional[str] = None):
+        self.conn = conn
+        self.loaded_tables = loaded_tables
+        self.sql_utils = SQLUtils()
+        self.layers_dir = layers_dir or os.path.abspath(os.path.join("parquet_cache", "dataset_layers"))
+        os.makedirs(self.layers_dir, exist_ok=True)
+        self._datasets: Dict[str, DatasetState] = {}
+        # Ids ya usados por archivo: un re-upload no reutiliza nombres de vista
+        # (los índices de reportes se cachean por fuente SQL)
+        self._next_version_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ========== ESTADO ==========
+
+    @staticmethod
+    def _quote_path(path: str) -> str:
+        return "'" + path.replace("'", "''") + "'"
+
+    def _count_parquet_rows(self, parquet_path: str) -> int:
+        result = self.conn.execute(
+            f"SELECT SUM(num_rows) FROM parquet_file_metadata({self._quote_path(parquet_path)})"
+        ).fetchone()
+        return int(result[0]) if result and result[0] is not None else 0
+
+    def _get_state(self, file_id: str) -> DatasetState:
+        """Estado del archivo; se crea desde la entrada Parquet de loaded_tables"""
+        with self._lock:
+            table_info = self.loaded_tables.get(file_id)
+            state = self._datasets.get(file_id)
+            if state is not None:
+                # Recargado como lazy desde otra ruta (re-upload): el historial anterior ya no aplica
+                current = state.current
+                if table_info and table_info.get("type") == "lazy" and (
+                    table_info.get("parquet_path") != current.base_path or current.has_layers
+                ):
+                    self._next_version_ids[file_id] = self._datasets.pop(file_id).next_version_id
+                else:
+                    return state
+
+            if not table_info:
+                raise ValueError(f"Archivo {file_id} no está cargado en DuckDB")
+            parquet_path = table_info.get("parquet_path")
+            if not parquet_path or not os.path.exists(parquet_path):
+                raise ValueError(f"El archivo {file_id} no tiene un Parquet base disponible")
+
+            state = DatasetState(
+                file_id,
+                table_info.get("table_name") or self.sql_utils.sanitize_table_name(f"table_{file_id}"),
+                DatasetVersion(
+                    self._next_version_ids.get(file_id, 1), parquet_path,
+                    self._count_parquet_rows(parquet_path), "upload"
+                )
+            )
+            self._datasets[file_id] = state
+            return state
+
+    def _rows_source(self, version: DatasetVersion, transforms: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Filas vivas con su file_row_number (base filtrada por la máscara y transformada)"""
+        transforms = version.transforms if transforms is None else transforms
+        base = f"read_parquet({self._quote_path(version.base_path)}, file_row_number=true)"
+        if not version.mask_table:
+            source = f"(SELECT * FROM {base})"
+        else:
+            source = f"""(
+            SELECT * FROM {base}
+            WHERE get_bit((SELECT bits FROM {version.mask_table}), CAST({self.ROW_ID} AS INTEGER)) = 0
+        )"""
+        for layer in transforms:
+            source = f"(SELECT {self.ROW_ID}, {', '.join(layer['projection'])} FROM {source})"
+        return source
+
+    def _live_select(self, version: DatasetVersion, transforms: Optional[List[Dict[str, Any]]] = None) -> str:
+        return f"SELECT * EXCLUDE ({self.ROW_ID}) FROM {self._rows_source(version, transforms)}"
+
+    def _describe(self, select_sql: str) -> List[tuple]:
+        """[(columna, tipo)] de una consulta sin ejecutarla sobre los datos"""
+        return [(row[0], row[1]) for row in self.conn.execute(f"DESCRIBE {select_sql}").fetchall()]
+
+    def _source(self, version: DatasetVersion) -> str:
+        """Referencia SQL estable de una versión (vista propia o Parquet base)"""
+        return version.view_name or f"read_parquet({self._quote_path(version.base_path)})"
+
+    # ========== VERSIONES ==========
+
+    def _publish(self, state: DatasetState, version: DatasetVersion, conn=None):
+        """Crea la máscara y la vista de la versión ({tabla}_v{id})"""
+        conn = conn or self.conn
+        if not version.has_layers:
+            return
+        version.view_name = version.view_name or f"{state.table_name}_v{version.version_id}"
+
+        if version.deletion_vectors:
+            # Une los vectores de borrado en un bitstring de base_rows bits (1 = fila eliminada)
+            version.mask_table = f"{version.view_name}_mask"
+            vector_list = ", ".join(self._quote_path(path) for path in version.deletion_vectors)
+            conn.execute(f"""
+            CREATE OR REPLACE TABLE {version.mask_table} AS
+            SELECT bitstring_agg({self.VECTOR_COLUMN}, 0, {max(version.base_rows - 1, 1)}) AS bits
+            FROM read_parquet([{vector_list}])
+            """)
+        conn.execute(f"CREATE OR REPLACE VIEW {version.view_name} AS {self._live_select(version)}")
+
+    def _activate(self, state: DatasetState):
+        """Apunta loaded_tables a la versión actual"""
+        current = state.current
+        table_info = self.loaded_tables.get(state.file_id, {})
+        if current.has_layers:
+            table_info.update({
+                "type": "view",
+                "table_name": current.view_name,
+                "parquet_path": current.base_path,
+                "version": current.version_id,
+                "deleted_rows": current.deleted_rows,
+                "transforms": len(current.transforms)
+            })
+        else:
+            table_info.update({
+                "type": "lazy",
+                "table_name": state.table_name,
+                "parquet_path": current.base_path,
+                "version": current.version_id
+            })
+            table_info.pop("deleted_rows", None)
+            table_info.pop("transforms", None)
+        self.loaded_tables[state.file_id] = table_info
+
+    def _commit(self, state: DatasetState, version: DatasetVersion):
+        """Publica una nueva versión como actual; descarta la rama de rehacer"""
+        self._publish(state, version)
+        state.retired.extend(state.history[state.current_index + 1:])
+        state.history = state.history[:state.current_index + 1] + [version]
+        state.current_index = len(state.history) - 1
+        state.next_version_id = max(state.next_version_id, version.version_id + 1)
+        self._activate(state)
+        self._collect_garbage(state)
+        self._schedule_compaction(state)
+
+    def _move(self, file_id: str, step: int) -> Dict[str, Any]:
+        state = self._get_state(file_id)
+        with state.lock:
+            target = state.current_index + step
+            if not 0 <= target < len(state.history):
+                raise ValueError("No hay cambios para deshacer" if step < 0 else "No hay cambios para rehacer")
+            state.current_index = target
+            self._activate(state)
+            current = state.current
+            print(f"↩️ {file_id}: versión actual {current.version_id} ({current.operation})")
+            return {
+                **current.get_info(),
+                "columns": [name for name, _ in self._describe(f"SELECT * FROM {self._source(current)}")],
+                "can_undo": target > 0,
+                "can_redo": target < len(state.history) - 1
+            }
+
+    def undo(self, file_id: str) -> Dict[str, Any]:
+        """Vuelve a la versión anterior (solo mueve el puntero)"""
+        return self._move(file_id, -1)
+
+    def redo(self, file_id: str) -> Dict[str, Any]:
+        """Avanza a la versión siguiente si no hubo ediciones después de deshacer"""
+        return self._move(file_id, 1)
+
+    def list_versions(self, file_id: str) -> Dict[str, Any]:
+        state = self._get_state(file_id)
+        with state.lock:
+            return {
+                "success": True,
+                "file_id": file_id,
+                "current_version": state.current.version_id,
+                "versions": [
+                    {**version.get_info(), "current": index == state.current_index,
+                     "pinned": version.version_id in state.pins}
+                    for index, version in enumerate(state.history)
+                ],
+                "history_bytes": self._history_bytes(state),
+                "budget_bytes": self.HISTORY_BUDGET_BYTES
+            }
+
+    # ========== LECTURAS AISLADAS ==========
+
+    def pin(self, file_id: str, source: Optional[str] = None) -> Optional[DatasetVersion]:
+        """
+        Fija la versión cuya fuente es `source` (o la actual) para que el GC no la
+        borre mientras se lee. None si el archivo no tiene historial de ediciones.
+        """
+        with self._lock:
+            state = self._datasets.get(file_id)
+        if state is None:
+            return None
+        with state.lock:
+            version = next(
+                (v for v in state.history if source and source in (v.view_name, self._source(v))),
+                state.current
+            )
+            state.pins[version.version_id] = state.pins.get(version.version_id, 0) + 1
+            return version
+
+    def unpin(self, file_id: str, version_id: int):
+        with self._lock:
+            state = self._datasets.get(file_id)
+        if state is None:
+            return
+        with state.lock:
+            remaining = state.pins.get(version_id, 0) - 1
+            if remaining > 0:
+                state.pins[version_id] = remaining
+            else:
+                state.pins.pop(version_id, None)
+            self._collect_garbage(state)
+
+    @contextmanager
+    def pinned_source(self, file_id: str, source: Optional[str] = None):
+        """Fuente SQL de una versión fijada durante el bloque (reportes de varias consultas)"""
+        version = self.pin(file_id, source)
+        try:
+            yield self._source(version) if version else source
+        finally:
+            if version:
+                self.unpin(file_id, version.version_id)
+
+    # ========== RECOLECCIÓN ==========
+
+    def _owned(self, path: str) -> bool:
+        # La base original es la del upload (caché de conversión): solo se gestionan las intermedias
+        return path.startswith(self.layers_dir)
+
+    def _version_files(self, version: DatasetVersion) -> set:
+        return {path for path in version.deletion_vectors + [version.base_path] if self._owned(path)}
+
+    def _history_bytes(self, state: DatasetState) -> int:
+        files = set().union(*(self._version_files(version) for version in state.history))
+        return sum(os.path.getsize(path) for path in files if os.path.exists(path))
+
+    def _drop_version(self, version: DatasetVersion, conn=None):
+        conn = conn or self.conn
+        if version.view_name:
+            conn.execute(f"DROP VIEW IF EXISTS {version.view_name}")
+        if version.mask_table:
+            conn.execute(f"DROP TABLE IF EXISTS {version.mask_table}")
+
+    def _collect_garbage(self, state: DatasetState, conn=None):
+        """
+        Descarta versiones lejanas a la actual mientras se supere el presupuesto de
+        disco o de versiones. Nunca descarta la actual ni las fijadas por un lector.
+        """
+        with state.lock:
+            while len(state.history) > 1:
+                over_budget = (
+                    len(state.history) > self.MAX_VERSIONS
+                    or self._history_bytes(state) > self.HISTORY_BUDGET_BYTES
+                )
+                candidates = [
+                    index for index, version in enumerate(state.history)
+                    if index != state.current_index and version.version_id not in state.pins
+                ]
+                if not over_budget or not candidates:
+                    break
+                victim_index = max(candidates, key=lambda index: abs(index - state.current_index))
+                state.retired.append(state.history.pop(victim_index))
+                if victim_index < state.current_index:
+                    state.current_index -= 1
+
+            for version in [v for v in state.retired if v.version_id not in state.pins]:
+                state.retired.remove(version)
+                self._drop_version(version, conn)
+
+            # Archivos sin versión que los use; con lectores activos se espera al último unpin
+            if not state.pins:
+                referenced = set().union(*(self._version_files(v) for v in state.history + state.retired))
+                for path in state.owned_files - referenced:
+                    if os.path.exists(path):
+                        os.remove(path)
+                state.owned_files &= referenced
+
+    # ========== VECTORES DE BORRADO ==========
+
+    def _append_vector(self, state: DatasetState, row_ids_sql: str, operation: str) -> int:
+        """Escribe los file_row_number seleccionados como vector de una nueva versión"""
+        current = state.current
+        vector_path = os.path.join(
+            self.layers_dir, f"{state.table_name}_dv{state.next_version_id}_{int(time.time() * 1000)}.parquet"
+        )
+        written = self.conn.execute(f"""
+        COPY (
+            SELECT DISTINCT {self.ROW_ID} AS {self.VECTOR_COLUMN}
+            FROM ({row_ids_sql})
+            ORDER BY 1
+        ) TO {self._quote_path(vector_path)} (FORMAT PARQUET, COMPRESSION ZSTD)
+        """).fetchone()
+        deleted = int(written[0]) if written else 0
+
+        if deleted == 0:
+            if os.path.exists(vector_path):
+                os.remove(vector_path)
+            return 0
+
+        state.owned_files.add(vector_path)
+        version = current.derive(
+            state.next_version_id, operation,
+            deletion_vectors=current.deletion_vectors + [vector_path],
+            deleted_rows=current.deleted_rows + deleted
+        )
+        self._commit(state, version)
+        print(f"🗑️ Vector de borrado: {deleted:,} filas de {state.file_id} ({version.live_rows:,} vivas, versión {version.version_id})")
+        return deleted
+
+    def _filter_condition(self, filters: List[Any]) -> str:
+        """WHERE con los mismos filtros de /data; un filtro inválido aborta (nunca borra de más)"""
+        conditions = []
+        for filter_item in filters or []:
+            item = filter_item if isinstance(filter_item, dict) else filter_item.model_dump()
+            operator = getattr(item.get("operator"), "value", item.get("operator"))
+            values = item.get("values") if item.get("values") is not None else item.get("value")
+            if values is None and operator in ("is_null", "is_not_null"):
+                values = []
+
+            condition = self._numeric_condition(item.get("column"), operator, values)
+            if condition is None:
+                condition = SqlConditionFilter().build_filter_condition({
+                    "column": item.get("column"), "operator": operator, "values": values
+                })
+            if not condition:
+                raise ValueError(f"Filtro inválido para eliminación: {item.get('column')} {operator}")
+            conditions.append(f"({condition})")
+
+        if not conditions:
+            raise ValueError("Debe especificar al menos un filtro para eliminar filas")
+        return " AND ".join(conditions)
+
+    def _numeric_condition(self, column: str, operator: str, values: Any) -> Optional[str]:
+        """
+        gt/lt/gte/lte con valor numérico comparan como número (igual que
+        pd.to_numeric(errors='coerce')): los valores no numéricos no coinciden
+        """
+        symbol = self.NUMERIC_OPERATORS.get(operator)
+        value = values[0] if isinstance(values, list) and values else values
+        if symbol is None or value is None or isinstance(value, bool):
+            return None
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        if not np.isfinite(number):
+            return None
+        return f"TRY_CAST({self.sql_utils.escape_identifier(column)} AS DOUBLE) {symbol} {number!r}"
+
+    def _positions_to_row_ids(self, version: DatasetVersion, positions: List[int]) -> List[int]:
+        """
+        Traduce posiciones de la vista a file_row_number. Con los ids borrados
+        ordenados d_i, d_i - i son las filas vivas antes de d_i, así que la posición
+        p corresponde a p + #{i : d_i - i <= p} (sin recorrer la base).
+        """
+        if not version.deletion_vectors:
+            return positions
+        vector_list = ", ".join(self._quote_path(path) for path in version.deletion_vectors)
+        deleted_ids = self.conn.execute(
+            f"SELECT {self.VECTOR_COLUMN} FROM read_parquet([{vector_list}]) ORDER BY 1"
+        ).fetchnumpy()[self.VECTOR_COLUMN]
+        live_before = deleted_ids - np.arange(len(deleted_ids))
+        targets = np.asarray(positions, dtype=np.int64)
+        return (targets + np.searchsorted(live_before, targets, side="right")).tolist()
+
+    def delete_rows_by_indices(self, file_id: str, row_indices: List[int]) -> Dict[str, Any]:
+        """Elimina por posición (0-based) en la versión actual del archivo"""
+        state = self._get_state(file_id)
+        with state.lock:
+            live_rows = state.current.live_rows
+            valid_indices = sorted({idx for idx in row_indices if 0 <= idx < live_rows})
+            invalid_indices = [idx for idx in row_indices if not 0 <= idx < live_rows]
+            if invalid_indices:
+                print(f"Advertencia: Índices inválidos ignorados: {invalid_indices}")
+
+            deleted = 0
+            if valid_indices:
+                row_ids = ", ".join(str(row_id) for row_id in self._positions_to_row_ids(state.current, valid_indices))
+                deleted = self._append_vector(
+                    state, f"SELECT UNNEST([{row_ids}]) AS {self.ROW_ID}", "delete_rows"
+                )
+
+            return {
+                "deleted_count": deleted,
+                "remaining_count": state.current.live_rows,
+                "invalid_indices": invalid_indices,
+                "version": state.current.version_id
+            }
+
+    def preview_delete_by_filters(self, file_id: str, filters: List[Any], limit: int = 10) -> Dict[str, Any]:
+        """Cuántas filas eliminaría el filtro y una muestra, sin modificar nada"""
+        state = self._get_state(file_id)
+        condition = self._filter_condition(filters)
+        current = state.current
+        live = f"({self._live_select(current)})"
+
+        to_delete = self.conn.execute(f"SELECT COUNT(*) FROM {live} WHERE {condition}").fetchone()[0]
+        preview_df = self.conn.execute(
+            f"SELECT * FROM {live} WHERE {condition} LIMIT {int(limit)}"
+        ).fetchdf()
+        return {
+            "rows_to_delete_count": int(to_delete),
+            "total_rows": current.live_rows,
+            "preview_data": preview_df.astype(object).where(preview_df.notna(), "").to_dict(orient="records"),
+            "would_remain": current.live_rows - int(to_delete)
+        }
+
+    def delete_rows_by_filters(self, file_id: str, filters: List[Any]) -> Dict[str, Any]:
+        """Elimina las filas vivas que cumplen todos los filtros"""
+        state = self._get_state(file_id)
+        condition = self._filter_condition(filters)
+        with state.lock:
+            deleted = self._append_vector(
+                state, f"SELECT {self.ROW_ID} FROM {self._rows_source(state.current)} WHERE {condition}",
+                "delete_by_filter"
+            )
+            return {
+                "deleted_count": deleted,
+                "remaining_count": state.current.live_rows,
+                "version": state.current.version_id
+            }
+
+    # ========== DUPLICADOS ==========
+
+    def _duplicate_columns(self, version: DatasetVersion, columns: Optional[List[str]]) -> List[str]:
+        """Columnas clave validadas (todas si no se indican)"""
+        available = [name for name, _ in self._describe(self._live_select(version))]
+        if not columns:
+            return available
+        missing = [col for col in columns if col not in available]
+        if missing:
+            raise ValueError(f"Columnas no encontradas: {', '.join(missing)}")
+        return list(columns)
+
+    def _duplicate_groups_sql(self, version: DatasetVersion, columns: List[str], keep: str = "first") -> str:
+        """
+        Una fila por clave repetida: cantidad de filas y el file_row_number a conservar.
+        Agregación hash (DuckDB la lleva a disco si no cabe): la memoria depende de
+        las claves distintas, no del tamaño del archivo.
+        """
+        keys = ", ".join(self.sql_utils.escape_identifier(col) for col in columns)
+        keep_rule = "MAX" if keep == "last" else "MIN"
+        return f"""
+            SELECT {keys}, COUNT(*) AS __filas, {keep_rule}({self.ROW_ID}) AS __conservar
+            FROM {self._rows_source(version)}
+            GROUP BY {keys}
+            HAVING COUNT(*) > 1
+        """
+
+    def duplicate_summary(self, file_id: str, columns: Optional[List[str]] = None,
+                          sample_size: int = 10) -> Dict[str, Any]:
+        """Resumen de grupos duplicados en una sola agregación, sin modificar nada"""
+        state = self._get_state(file_id)
+        version = state.current
+        columns = self._duplicate_columns(version, columns)
+        start_time = time.time()
+
+        rows = self.conn.execute(f"""
+        WITH grupos AS MATERIALIZED ({self._duplicate_groups_sql(version, columns)}),
+        resumen AS (
+            SELECT COUNT(*) AS total_grupos, COALESCE(SUM(__filas), 0) AS filas_duplicadas,
+                   COALESCE(MAX(__filas), 0) AS grupo_mayor
+            FROM grupos
+        )
+        SELECT resumen.*, muestra.* EXCLUDE (__conservar)
+        FROM resumen
+        LEFT JOIN (SELECT * FROM grupos ORDER BY __filas DESC, __conservar LIMIT {int(sample_size)}) muestra ON TRUE
+        """).fetchall()
+
+        total_groups, duplicated_rows, largest_group = (int(value) for value in rows[0][:3])
+        sample_groups = [
+            {"values": dict(zip(columns, row[3:-1])), "count": int(row[-1])}
+            for row in rows if row[-1] is not None
+        ]
+        return {
+            "success": True,
+            "file_id": file_id,
+            "version": version.version_id,
+            "columns_checked": columns,
+            "total_rows": version.live_rows,
+            "duplicate_groups": total_groups,
+            "duplicated_rows": duplicated_rows,
+            "largest_group": largest_group,
+            "rows_to_delete": {
+                "first": duplicated_rows - total_groups,
+                "last": duplicated_rows - total_groups,
+                "False": duplicated_rows
+            },
+            "sample_groups": sample_groups,
+            "processing_time": round(time.time() - start_time, 3)
+        }
+
+    def delete_duplicates(self, file_id: str, columns: Optional[List[str]] = None,
+                          keep: str = "first") -> Dict[str, Any]:
+        """
+        Duplicados por clave (todas las columnas si no se indica) con la semántica
+        de pandas: keep='first'/'last' conserva una fila, 'False' elimina todas.
+        Los nulos cuentan como iguales, igual que en drop_duplicates.
+        """
+        state = self._get_state(file_id)
+        with state.lock:
+            version = state.current
+            columns = self._duplicate_columns(version, columns)
+            keep_all = str(keep) in ("False", "false", "none")
+
+            join_condition = " AND ".join(
+                f"filas.{col} IS NOT DISTINCT FROM grupos.{col}"
+                for col in (self.sql_utils.escape_identifier(name) for name in columns)
+            )
+            if not keep_all:
+                join_condition += f" AND filas.{self.ROW_ID} <> grupos.__conservar"
+
+            deleted = self._append_vector(state, f"""
+                SELECT filas.{self.ROW_ID}
+                FROM {self._rows_source(version)} filas
+                JOIN ({self._duplicate_groups_sql(version, columns, keep)}) grupos ON {join_condition}
+            """, "delete_duplicates")
+            return {
+                "deleted_count": deleted,
+                "remaining_count": state.current.live_rows,
+                "columns_checked": columns,
+                "version": state.current.version_id
+            }
+
+    # ========== TRANSFORMACIONES ==========
+
+    def add_transformation(self, file_id: str, operation: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Agrega una capa de transformación (proyección SQL) como nueva versión.
+        No lee los datos: la validación es un DESCRIBE de la consulta resultante.
+        """
+        state = self._get_state(file_id)
+        with state.lock:
+            current = state.current
+            columns = self._describe(self._live_select(current))
+            projection = TransformationService.build_projection(columns, operation, params or {})
+            layer = {
+                "operation": getattr(operation, "value", operation),
+                "params": params or {},
+                "projection": projection
+            }
+
+            try:
+                new_columns = self._describe(self._live_select(current, current.transforms + [layer]))
+            except Exception as e:
+                raise ValueError(f"Transformación inválida ({layer['operation']}): {e}")
+
+            version = current.derive(state.next_version_id, layer["operation"], transforms=current.transforms + [layer])
+            self._commit(state, version)
+            print(f"🧩 Transformación {layer['operation']} sobre {file_id} (capa {len(version.transforms)}, versión {version.version_id})")
+            return {
+                "columns": [name for name, _ in new_columns],
+                "version": version.version_id,
+                "transform_layers": len(version.transforms)
+            }
+
+    # ========== COMPACTACIÓN ==========
+
+    def _needs_compaction(self, state: DatasetState) -> bool:
+        current = state.current
+        if state.compacting:
+            return False
+        return (
+            (bool(current.deletion_vectors) and current.deleted_rows >= current.base_rows * self.COMPACTION_RATIO)
+            or len(current.deletion_vectors) >= self.MAX_VECTORS
+            or len(current.transforms) >= self.MAX_TRANSFORMS
+        )
+
+    def _schedule_compaction(self, state: DatasetState):
+        if not self._needs_compaction(state):
+            return
+        state.compacting = True
+        threading.Thread(
+            target=self.compact, args=(state.file_id,), daemon=True, name=f"compact-{state.file_id}"
+        ).start()
+
+    def compact(self, file_id: str) -> Dict[str, Any]:
+        """
+        Materializa la versión actual (sin filas eliminadas, con transformaciones)
+        como nueva base. La versión conserva su id y su vista; las versiones
+        anteriores siguen apuntando a sus propios archivos.
+        """
+        state = self._get_state(file_id)
+        with state.lock:
+            version = state.current
+            live_sql = self._live_select(version)
+            state.compacting = True
+        if not version.has_layers:
+            state.compacting = False
+            return {"success": True, "compacted": False, "file_id": file_id, "version": version.version_id}
+
+        start_time = time.time()
+        new_base = os.path.join(self.layers_dir, f"{state.table_name}_base_{int(start_time * 1000)}.parquet")
+        cursor = self.conn.cursor()
+        try:
+            written = cursor.execute(
+                f"COPY ({live_sql}) TO {self._quote_path(new_base)} "
+                f"(FORMAT PARQUET, COMPRESSION ZSTD)"
+            ).fetchone()
+            new_rows = int(written[0]) if written else 0
+
+            with state.lock:
+                state.owned_files.add(new_base)
+                if version not in state.history:
+                    # Descartada por el GC mientras se escribía
+                    self._collect_garbage(state, cursor)
+                    return {"success": True, "compacted": False, "file_id": file_id, "reason": "version_discarded"}
+
+                previous_mask = version.mask_table
+                version.base_path = new_base
+                version.base_rows = new_rows
+                version.deletion_vectors = []
+                version.deleted_rows = 0
+                version.transforms = []
+                version.mask_table = None
+                if version.view_name:
+                    # Los lectores que fijaron la versión por nombre siguen viendo los mismos datos
+                    cursor.execute(f"CREATE OR REPLACE VIEW {version.view_name} AS {self._live_select(version)}")
+                if previous_mask:
+                    cursor.execute(f"DROP TABLE IF EXISTS {previous_mask}")
+                if version is state.current:
+                    self._activate(state)
+                self._collect_garbage(state, cursor)
+
+            elapsed = round(time.time() - start_time, 3)
+            print(f"🧹 Compactación de {file_id}: {new_rows:,} filas en {elapsed}s (versión {version.version_id})")
+            return {
+                "success": True, "compacted": True, "file_id": file_id, "version": version.version_id,
+                "rows": new_rows, "time_seconds": elapsed
+            }
+
+        except Exception as e:
+            print(f"Error compactando {file_id}: {e}")
+            if os.path.exists(new_base):
+                os.remove(new_base)
+            state.owned_files.discard(new_base)
+            return {"success": False, "file_id": file_id, "error": str(e)}
+        finally:
+            cursor.close()
+            state.compacting = False
+
+    # ========== INFORMACIÓN ==========
+
+    def get_dataset_stats(self, file_id: str) -> Dict[str, Any]:
+        return {"success": True, **self._get_state(file_id).get_stats()}
+
+    def forget(self, file_id: str) -> bool:
+        """Descarta el historial de un archivo eliminado (vistas, máscaras y archivos)"""
+        with self._lock:
+            state = self._datasets.pop(file_id, None)
+            if state is not None:
+                self._next_version_ids[file_id] = state.next_version_id
+        if state is None:
+            return False
+        self.loaded_tables.pop(file_id, None)
+        with state.lock:
+            for version in state.history + state.retired:
+                self._drop_version(version)
+            for path in state.owned_files:
+                if os.path.exists(path):
+                    os.remove(path)
+        return True
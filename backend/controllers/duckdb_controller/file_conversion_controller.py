@@ -561,7 +561,16 @@ class FileConversionController:
             "parquet_path": parquet_path,
             "validated": True
         }
-        
+
+        # Clasificación de columnas (palabra clave, edad, actividad, formato de fecha)
+        try:
+            from services.technical_note_services.column_classification_service import column_classification_service
+            cache_metadata["column_classification"] = column_classification_service.build_index(
+                self.conn, f"read_parquet('{parquet_path}')", columns
+            )
+        except Exception as e:
+            print(f"⚠️ Clasificación de columnas omitida: {e}")
+
         self.cache.save_cache_metadata(file_hash, cache_metadata)
         
         print(f"Conversión finalizada en {conversion_time:.2f}s")
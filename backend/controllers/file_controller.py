@@ -14,6 +14,7 @@ from controllers.files_controllers.transformation_handler import TransformationH
 from controllers.files_controllers.export_handler import ExportHandler
 from controllers.files_controllers.delete_handler import DeleteHandler
 from controllers.files_controllers.file_info_handler import FileInfoHandler
+from controllers.files_controllers.version_handler import VersionHandler
 
 class FileController:
     def __init__(self):
@@ -27,6 +28,7 @@ class FileController:
         self.export_handler = ExportHandler(self.storage_manager, self.data_handler)
         self.delete_handler = DeleteHandler(self.storage_manager)
         self.file_info_handler = FileInfoHandler(self.storage_manager)
+        self.version_handler = VersionHandler(self.storage_manager)
     
     async def upload_file(self, file: UploadFile) -> Dict[str, Any]:
         """Procesa la carga de archivo"""
@@ -53,20 +55,14 @@ class FileController:
         """Obtiene columnas específicas de un archivo y hoja - SIN CAMBIOS"""
         return self.data_handler.get_columns(file_id, sheet_name)
     
-    # MODIFICADO: Operaciones de Transformación con hilos
+    # Operaciones de Transformación: capas SQL perezosas, sin hilo dedicado
     def transform_data(self, request: TransformRequest) -> Dict[str, Any]:
-        """MODIFICADO: Aplica transformación a los datos CON HILOS"""
-        
-        file_info = self.storage_manager.get_file_info(request.file_id)
-        if file_info and file_info.get('total_rows', 0) > 15000:
-            
-            # Usar hilo para transformaciones de archivos grandes
-            transform_future = thread_manager.submit_cpu_task(
-                self.transformation_handler.transform_data, request
-            )
-            return transform_future.result(timeout=180)
-        else:
-            return self.transformation_handler.transform_data(request)
+        """Aplica transformación a los datos (no lee el archivo completo)"""
+        return self.transformation_handler.transform_data(request)
+    
+    def materialize_transformations(self, file_id: str) -> Dict[str, Any]:
+        """Materializa bajo demanda las capas pendientes del archivo"""
+        return self.transformation_handler.materialize_transformations(file_id)
     
     # MODIFICADO: Operaciones de Exportación con hilos
     def export_processed_data(self, request: ExportRequest) -> Dict[str, Any]:
@@ -109,10 +105,27 @@ class FileController:
         """Operación de eliminación masiva con confirmación"""
         return self.delete_handler.bulk_delete_operation(request)
     
+    def preview_duplicates(self, file_id: str, columns: list = None, sample_size: int = 10) -> Dict[str, Any]:
+        """Previsualiza grupos duplicados"""
+        return self.delete_handler.preview_duplicates(file_id, columns, sample_size)
+    
     def delete_duplicates(self, file_id: str, columns: list = None, keep: str = 'first', sheet_name: str = None) -> Dict[str, Any]:
         """Elimina filas duplicadas"""
         return self.delete_handler.delete_duplicates(file_id, columns, keep, sheet_name)
     
+    # Versiones: deshacer/rehacer mueven el puntero, no reescriben datos
+    def list_versions(self, file_id: str) -> Dict[str, Any]:
+        """Lista las versiones del archivo"""
+        return self.version_handler.list_versions(file_id)
+    
+    def undo_change(self, file_id: str) -> Dict[str, Any]:
+        """Deshace el último cambio del archivo"""
+        return self.version_handler.undo(file_id)
+    
+    def redo_change(self, file_id: str) -> Dict[str, Any]:
+        """Rehace el último cambio deshecho"""
+        return self.version_handler.redo(file_id)
+    
     def get_file_info(self, file_id: str) -> Dict[str, Any]:
         """Obtiene información básica del archivo"""
         return self.file_info_handler.get_file_info(file_id)
@@ -161,6 +174,18 @@ def get_data(request: DataRequest):
 def transform_data(request: TransformRequest):
     return file_controller.transform_data(request)
 
+def materialize_transformations(file_id: str):
+    return file_controller.materialize_transformations(file_id)
+
+def list_versions(file_id: str):
+    return file_controller.list_versions(file_id)
+
+def undo_change(file_id: str):
+    return file_controller.undo_change(file_id)
+
+def redo_change(file_id: str):
+    return file_controller.redo_change(file_id)
+
 def get_file_info(file_id: str):
     return file_controller.get_file_info(file_id)
 
@@ -191,6 +216,9 @@ def preview_delete_operation(file_id: str, filters: list, sheet_name: str = None
 def bulk_delete_operation(request: BulkDeleteRequest):
     return file_controller.bulk_delete_operation(request)
 
+def preview_duplicates(file_id: str, columns: list = None, sample_size: int = 10):
+    return file_controller.preview_duplicates(file_id, columns, sample_size)
+
 def delete_duplicates(file_id: str, columns: list = None, keep: str = 'first', sheet_name: str = None):
     return file_controller.delete_duplicates(file_id, columns, keep, sheet_name)
 
@@ -37,7 +37,7 @@ class CrossHandler:
             raise ValueError(f"Error en cruce ultra-rápido: {str(e)}")
 
     def suggest_compatible_columns(self, request) -> Dict[str, Any]:
-        """Sugiere columnas compatibles (simplificado para DuckDB)"""
+        """Sugiere columnas compatibles por solapamiento de valores (firmas MinHash/HLL)"""
         try:
             file1_info = self.storage_manager.get_file_info(request.file1_key)
             file2_info = self.storage_manager.get_file_info(request.file2_key)
@@ -45,24 +45,9 @@ class CrossHandler:
             if not file1_info or not file2_info:
                 raise ValueError("Uno o ambos archivos no fueron encontrados")
             
-            # Sugerencia simple basada en nombres de columna
-            suggestions = []
-            
-            for col1 in file1_info["columns"]:
-                for col2 in file2_info["columns"]:
-                    if col1.lower() == col2.lower():
-                        suggestions.append({
-                            "left_column": col1,
-                            "right_column": col2,
-                            "combined_score": 1.0,
-                            "recommendation": "Nombres idénticos - Altamente recomendado"
-                        })
-            
-            return {
-                "success": True,
-                "suggestions": suggestions[:10],
-                "ultra_fast": True
-            }
+            result = duckdb_service.suggest_cross_columns(request.file1_key, request.file2_key)
+            result["ultra_fast"] = True
+            return result
             
         except Exception as e:
             return {"success": False, "error": str(e)}
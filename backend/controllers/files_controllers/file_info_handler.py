@@ -4,6 +4,7 @@ from typing import Dict, Any
 
 import pandas as pd
 from controllers.files_controllers.storage_manager import FileStorageManager
+from services.duckdb_service.duckdb_service import duckdb_service
 
 class FileInfoHandler:
     def __init__(self, storage_manager: FileStorageManager):
@@ -70,4 +71,8 @@ class FileInfoHandler:
         if not success:
             raise ValueError("Archivo no encontrado")
         
+        # Vistas y vectores de borrado del archivo
+        if duckdb_service.dataset_layers:
+            duckdb_service.dataset_layers.forget(file_id)
+        
         return {"message": "Archivo eliminado exitosamente"}
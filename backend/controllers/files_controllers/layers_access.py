@@ -0,0 +1,15 @@
+# controllers/files_controllers/layers_access.py
+from typing import Any, Dict, Tuple
+from controllers.files_controllers.storage_manager import FileStorageManager
+from services.duckdb_service.duckdb_service import duckdb_service
+
+
+def get_file_layers(storage_manager: FileStorageManager, file_id: str) -> Tuple[Dict[str, Any], Any]:
+    """Valida el archivo y retorna (file_info, controlador de capas) con el archivo cargado"""
+    file_info = storage_manager.get_file_info(file_id)
+    if not file_info:
+        raise ValueError("Archivo no encontrado")
+
+    if not duckdb_service.dataset_layers or not duckdb_service.ensure_file_loaded(file_id):
+        raise ValueError("Archivo no disponible en DuckDB")
+    return file_info, duckdb_service.dataset_layers
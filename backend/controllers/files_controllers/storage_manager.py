@@ -60,6 +60,10 @@ class FileStorageManager:
         """Sincroniza una entrada del JSON con archivos físicos"""
         original_name = file_info.get("original_name", file_id)
         
+        # Resultados de cruce: viven en parquet_cache, válidos mientras exista el Parquet
+        if file_info.get("upload_type") == "cross_result":
+            return (os.path.exists(file_info.get("path", "")), file_info)
+        
         # Verificar por nombre original, no por UUID
         if original_name not in existing_files:
             print(f"Eliminando del JSON archivo inexistente: {original_name}")
@@ -327,7 +331,7 @@ class FileStorageManager:
                     "file_size": file_info.get("file_size", 0),
                     "stored_at": file_info.get("stored_at"),
                     "extension": os.path.splitext(original_name)[1].lower().replace('.', ''),
-                    "is_custom_upload": True
+                    "is_custom_upload": file_info.get("upload_type") != "cross_result"
                 })
         
         return files_info
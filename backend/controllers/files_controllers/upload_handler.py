@@ -136,6 +136,9 @@ class UploadHandler:
         
         # Carga lazy
         duckdb_service.load_parquet_lazy(file_id, parquet_result["parquet_path"])
+        
+        # Firmas de columnas para sugerencias de cruce (segundo plano)
+        duckdb_service.warm_column_sketches(file_id)
         return parquet_result
 
 
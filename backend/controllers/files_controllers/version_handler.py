@@ -0,0 +1,35 @@
+# controllers/version_handler.py
+from typing import Dict, Any
+from controllers.files_controllers.storage_manager import FileStorageManager
+from controllers.files_controllers.layers_access import get_file_layers
+
+class VersionHandler:
+    """Historial de versiones de un archivo: listar, deshacer y rehacer"""
+
+    def __init__(self, storage_manager: FileStorageManager):
+        self.storage_manager = storage_manager
+
+    def _sync_file_info(self, file_id: str, file_info: dict, result: Dict[str, Any]):
+        """La versión activa define columnas y filas visibles del archivo"""
+        file_info["columns"] = result["columns"]
+        file_info["total_rows"] = result["live_rows"]
+        self.storage_manager.store_file_info(file_id, file_info)
+
+    def list_versions(self, file_id: str) -> Dict[str, Any]:
+        """Lista las versiones disponibles del archivo"""
+        _, layers = get_file_layers(self.storage_manager, file_id)
+        return layers.list_versions(file_id)
+
+    def undo(self, file_id: str) -> Dict[str, Any]:
+        """Vuelve a la versión anterior del archivo"""
+        file_info, layers = get_file_layers(self.storage_manager, file_id)
+        result = layers.undo(file_id)
+        self._sync_file_info(file_id, file_info, result)
+        return {"message": "Cambio deshecho exitosamente", **result}
+
+    def redo(self, file_id: str) -> Dict[str, Any]:
+        """Vuelve a aplicar el cambio deshecho"""
+        file_info, layers = get_file_layers(self.storage_manager, file_id)
+        result = layers.redo(file_id)
+        self._sync_file_info(file_id, file_info, result)
+        return {"message": "Cambio rehecho exitosamente", **result}
@@ -0,0 +1,69 @@
+
+
+import csv
+import io
+from typing import Any, Callable, Iterator, List, Optional
+from services.duckdb_service.duckdb_service import duckdb_service
+
+
+class AbsentCsvStream:
+    """
+    Convierte una consulta DuckDB en un flujo CSV por bloques: las filas se leen
+    con fetchmany desde un cursor propio, así el primer bloque sale de inmediato
+    y la memoria no crece con el tamaño de la exportación.
+    """
+
+    def __init__(self, encoding: str = "cp1252", sep: str = ";",
+                 use_excel_sep_hint: bool = True, batch_size: int = 5000):
+        enc_map = {"cp1252": "cp1252", "latin-1": "latin-1", "utf-8-sig": "utf-8-sig"}
+        self.encoding = enc_map.get((encoding or "").lower(), "cp1252")
+        self.sep = sep
+        self.use_excel_sep_hint = use_excel_sep_hint
+        self.batch_size = batch_size
+
+    @property
+    def charset(self) -> str:
+        charset_map = {"cp1252": "windows-1252", "latin-1": "ISO-8859-1"}
+        return charset_map.get(self.encoding, "utf-8")
+
+    def _encode(self, text: str) -> bytes:
+        # utf-8-sig solo debe escribir el BOM una vez (en la cabecera)
+        encoding = "utf-8" if self.encoding == "utf-8-sig" else self.encoding
+        return text.encode(encoding, errors="replace")
+
+    def _header_bytes(self, headers: List[str]) -> bytes:
+        buffer = io.StringIO()
+        if self.use_excel_sep_hint:
+            buffer.write(f"sep={self.sep}\n")
+        csv.writer(buffer, delimiter=self.sep, quoting=csv.QUOTE_MINIMAL, lineterminator="\n").writerow(headers)
+        bom = "\ufeff".encode("utf-8") if self.encoding == "utf-8-sig" else b""
+        return bom + self._encode(buffer.getvalue())
+
+    def stream_query(
+        self,
+        sql: str,
+        headers: List[str],
+        row_transform: Optional[Callable[[tuple], List[Any]]] = None
+    ) -> Iterator[bytes]:
+        """Genera bytes CSV: cabecera primero y luego un bloque por lote de filas"""
+        yield self._header_bytes(headers)
+
+        cursor = duckdb_service.conn.cursor()
+        total_rows = 0
+        try:
+            result = cursor.execute(sql)
+            while True:
+                rows = result.fetchmany(self.batch_size)
+                if not rows:
+                    break
+
+                buffer = io.StringIO()
+                writer = csv.writer(buffer, delimiter=self.sep, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+                for row in rows:
+                    writer.writerow(row_transform(row) if row_transform else row)
+
+                total_rows += len(rows)
+                yield self._encode(buffer.getvalue())
+        finally:
+            cursor.close()
+            print(f"✓ Exportación CSV por flujo completada: {total_rows:,} filas")
@@ -1,10 +1,28 @@
 
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from services.duckdb_service.duckdb_service import duckdb_service
 
 
 class ReportActivity:
+    """
+    Reporte de inasistentes con UNA consulta UNPIVOT: cada persona del rango de
+    edad y geografía seleccionados se despliega en pares (persona, actividad) y
+    se conservan solo los pares sin dato. Estadísticas y página salen del mismo CTE.
+    """
+
+    PERSON_FIELDS = [
+        ("departamento", '"Departamento"'),
+        ("municipio", '"Municipio"'),
+        ("nombre_ips", '"Nombre IPS"'),
+        ("nro_identificacion", '"Nro Identificación"'),
+        ("primer_apellido", '"Primer Apellido"'),
+        ("segundo_apellido", '"Segundo Apellido"'),
+        ("primer_nombre", '"Primer Nombre"'),
+        ("segundo_nombre", '"Segundo Nombre"'),
+        ("fecha_nacimiento", '"Fecha Nacimiento"'),
+    ]
+
     def _clean_table_reference(self, data_source: str) -> str:
         """Extrae referencia limpia de la tabla para queries"""
         if data_source.startswith("read_parquet('") and data_source.endswith("')"):
@@ -12,61 +30,136 @@ class ReportActivity:
             return f"'{clean_path}'"
         elif data_source.startswith("'") and data_source.endswith("'"):
             return data_source
+        elif data_source.isidentifier():
+            # Vista versionada de un archivo editado
+            return data_source
         else:
             return f"'{data_source}'"
 
 
-    def _build_activity_query(self, table_reference: str, column: str, 
-                            age_filter: str, geo_filter: str, corte_fecha: str) -> str:
-        """Construye el query SQL para una actividad específica"""
+    def build_absent_pairs_cte(self, table_reference: str, activity_columns: List[str],
+                               age_filter: str, geo_filter: str, corte_fecha: str) -> str:
+        """
+        CTE 'pares' con un registro por (persona, actividad faltante).
+        Las columnas de actividad llegan entre comillas dobles ('"col"').
+        """
+        activity_columns = list(dict.fromkeys(activity_columns))
+        person_select = ",\n                ".join(
+            f"{column} AS {alias}" for alias, column in self.PERSON_FIELDS
+        )
+        activity_select = ",\n                ".join(
+            f"CAST({column} AS VARCHAR) AS {column}" for column in activity_columns
+        )
+        unpivot_on = ", ".join(activity_columns)
+
         return f"""
-        SELECT 
-            "Departamento" as departamento,
-            "Municipio" as municipio,
-            "Nombre IPS" as nombre_ips,
-            "Nro Identificación" as nro_identificacion,
-            "Primer Apellido" as primer_apellido,
-            "Segundo Apellido" as segundo_apellido,
-            "Primer Nombre" as primer_nombre,
-            "Segundo Nombre" as segundo_nombre,
-            "Fecha Nacimiento" as fecha_nacimiento,
-            TRY_CAST(edad AS INTEGER) as edad_anos,
-            date_diff('month', strptime("Fecha Nacimiento", '%d/%m/%Y'), DATE '{corte_fecha}') as edad_meses,
-            {column} as actividad_valor
-        FROM {table_reference}
-        WHERE 
-            ({column} IS NULL OR TRIM({column}) = '')
-            AND ({age_filter})
-            AND "Fecha Nacimiento" IS NOT NULL 
-            AND TRIM("Fecha Nacimiento") != ''
-            AND TRY_CAST(strptime("Fecha Nacimiento", '%d/%m/%Y') AS DATE) IS NOT NULL
-            AND {geo_filter}
-        ORDER BY "Departamento", "Municipio", "Nombre IPS", "Primer Apellido", "Primer Nombre"
+        WITH base AS (
+            SELECT
+                {person_select},
+                TRY_CAST(edad AS INTEGER) AS edad_anos,
+                date_diff('month', strptime("Fecha Nacimiento", '%d/%m/%Y'), DATE '{corte_fecha}') AS edad_meses,
+                {activity_select}
+            FROM {table_reference}
+            WHERE
+                ({age_filter})
+                AND "Fecha Nacimiento" IS NOT NULL
+                AND TRIM("Fecha Nacimiento") != ''
+                AND TRY_CAST(strptime("Fecha Nacimiento", '%d/%m/%Y') AS DATE) IS NOT NULL
+                AND {geo_filter}
+        ),
+        pares AS (
+            SELECT *
+            FROM base
+            UNPIVOT INCLUDE NULLS (actividad_valor FOR actividad IN ({unpivot_on}))
+            WHERE actividad_valor IS NULL OR TRIM(actividad_valor) = ''
+        )
         """
 
 
-    def _build_stats_query(self, table_reference: str, column: str, 
-                        age_filter: str, geo_filter: str) -> str:
-        """Construye el query SQL para estadísticas de una actividad"""
+    def _build_stats_query(self, pairs_cte: str) -> str:
+        """Estadísticas por actividad y global (GROUPING SETS) sobre los mismos pares"""
         return f"""
-        SELECT 
-            COUNT(*) as total_inasistentes,
-            COUNT(DISTINCT "Departamento") as departamentos_afectados,
-            COUNT(DISTINCT "Municipio") as municipios_afectados,
-            COUNT(DISTINCT "Nombre IPS") as ips_afectadas
-        FROM {table_reference}
-        WHERE 
-            ({column} IS NULL OR TRIM({column}) = '')
-            AND ({age_filter})
-            AND "Fecha Nacimiento" IS NOT NULL 
-            AND TRIM("Fecha Nacimiento") != ''
-            AND TRY_CAST(strptime("Fecha Nacimiento", '%d/%m/%Y') AS DATE) IS NOT NULL
-            AND {geo_filter}
+        {pairs_cte}
+        SELECT
+            actividad,
+            COUNT(*) AS total_inasistentes,
+            COUNT(DISTINCT departamento) AS departamentos_afectados,
+            COUNT(DISTINCT municipio) AS municipios_afectados,
+            COUNT(DISTINCT nombre_ips) AS ips_afectadas,
+            COUNT(DISTINCT nro_identificacion) AS personas_unicas
+        FROM pares
+        GROUP BY GROUPING SETS ((actividad), ())
         """
 
 
-    def _process_activity_row(self, row: tuple, column: str) -> dict:
-        """Procesa una fila individual de inasistente"""
+    def _build_page_query(self, pairs_cte: str, activity_names: List[str],
+                          limit: Optional[int], offset: int) -> str:
+        """Filas de detalle ordenadas por actividad y persona, con paginación opcional"""
+        names_list = ", ".join("'" + name.replace("'", "''") + "'" for name in activity_names)
+        person_aliases = ", ".join(alias for alias, _ in self.PERSON_FIELDS)
+        pagination = f"LIMIT {int(limit)} OFFSET {int(offset)}" if limit else ""
+
+        return f"""
+        {pairs_cte}
+        SELECT
+            {person_aliases},
+            edad_anos,
+            edad_meses,
+            actividad_valor,
+            actividad
+        FROM pares
+        ORDER BY list_position([{names_list}], actividad),
+            departamento, municipio, nombre_ips, primer_apellido, primer_nombre, nro_identificacion
+        {pagination}
+        """
+
+
+    def build_person_query(self, pairs_cte: str, activity_names: List[str],
+                           limit: Optional[int] = None, offset: int = 0) -> str:
+        """
+        Una fila por persona con la lista de actividades faltantes y un puntaje de
+        prioridad (porcentaje de actividades evaluadas que le faltan).
+        Cada actividad cuenta una vez aunque la columna o la persona se repitan.
+        """
+        activity_names = list(dict.fromkeys(activity_names))
+        names_list = ", ".join("'" + name.replace("'", "''") + "'" for name in activity_names)
+        total_activities = max(len(activity_names), 1)
+        person_aliases = ", ".join(alias for alias, _ in self.PERSON_FIELDS)
+        pagination = f"LIMIT {int(limit)} OFFSET {int(offset)}" if limit else ""
+
+        return f"""
+        {pairs_cte},
+        personas AS (
+            SELECT
+                {person_aliases},
+                MAX(edad_anos) AS edad_anos,
+                MAX(edad_meses) AS edad_meses,
+                COUNT(DISTINCT actividad) AS total_faltantes,
+                list(DISTINCT actividad ORDER BY list_position([{names_list}], actividad)) AS actividades_faltantes
+            FROM pares
+            GROUP BY {person_aliases}
+        )
+        SELECT
+            {person_aliases},
+            edad_anos,
+            edad_meses,
+            total_faltantes,
+            array_to_string(actividades_faltantes, ' | ') AS actividades_faltantes,
+            ROUND(100.0 * total_faltantes / {total_activities}, 2) AS prioridad_score,
+            CASE
+                WHEN 100.0 * total_faltantes / {total_activities} >= 75 THEN 'ALTA'
+                WHEN 100.0 * total_faltantes / {total_activities} >= 40 THEN 'MEDIA'
+                ELSE 'BAJA'
+            END AS prioridad_nivel
+        FROM personas
+        ORDER BY total_faltantes DESC, departamento, municipio, nombre_ips,
+            primer_apellido, primer_nombre, nro_identificacion
+        {pagination}
+        """
+
+
+    def _process_person_row(self, row: tuple) -> dict:
+        """Procesa una fila de persona con sus actividades faltantes"""
         return {
             "departamento": str(row[0]) if row[0] else "",
             "municipio": str(row[1]) if row[1] else "",
@@ -79,48 +172,99 @@ class ReportActivity:
             "fecha_nacimiento": str(row[8]) if row[8] else "",
             "edad_anos": int(row[9]) if row[9] is not None else None,
             "edad_meses": int(row[10]) if row[10] is not None else None,
-            "actividad_valor": str(row[11]) if row[11] else "VACÍO",
-            "columna_evaluada": column.replace('"', '')
+            "total_faltantes": int(row[11]),
+            "actividades_faltantes": str(row[12]).split(" | ") if row[12] else [],
+            "prioridad_score": float(row[13]),
+            "prioridad_nivel": str(row[14])
         }
 
 
-    def _process_stats_result(self, stats_result: tuple) -> dict:
-        """Procesa resultado de estadísticas"""
-        return {
-            "total_inasistentes": int(stats_result[0]) if stats_result[0] else 0,
-            "departamentos_afectados": int(stats_result[1]) if stats_result[1] else 0,
-            "municipios_afectados": int(stats_result[2]) if stats_result[2] else 0,
-            "ips_afectadas": int(stats_result[3]) if stats_result[3] else 0
-        }
+    def generate_person_report(
+        self,
+        data_source: str,
+        activity_columns: List[str],
+        age_filter: str,
+        geo_filter: str,
+        corte_fecha: str,
+        page: int = 1,
+        page_size: int = 1000
+    ) -> Dict[str, Any]:
+        """Reporte deduplicado por persona (una fila por persona, no por actividad)"""
+        table_reference = self._clean_table_reference(data_source)
+        activity_names = [column.replace('"', '') for column in activity_columns]
 
+        pairs_cte = self.build_absent_pairs_cte(
+            table_reference, activity_columns, age_filter, geo_filter, corte_fecha
+        )
 
-    def _process_single_activity(self, table_reference: str, column: str, 
-                                age_filter: str, geo_filter: str, corte_fecha: str) -> dict:
-        """Procesa una actividad individual completa"""
-        # Query de datos
-        activity_sql = self._build_activity_query(
-            table_reference, column, age_filter, geo_filter, corte_fecha
+        person_aliases = ", ".join(alias for alias, _ in self.PERSON_FIELDS)
+        summary_sql = f"""
+        {pairs_cte}
+        SELECT
+            COUNT(*) AS personas,
+            COALESCE(SUM(faltantes), 0) AS total_pares
+        FROM (
+            SELECT COUNT(DISTINCT actividad) AS faltantes
+            FROM pares
+            GROUP BY {person_aliases}
         )
-        activity_result = duckdb_service.conn.execute(activity_sql).fetchall()
-        
-        # Query de estadísticas
-        stats_sql = self._build_stats_query(table_reference, column, age_filter, geo_filter)
-        stats_result = duckdb_service.conn.execute(stats_sql).fetchone()
-        
-        # Procesar resultados
-        inasistentes_data = [
-            self._process_activity_row(row, column) 
-            for row in activity_result
+        """
+        summary = duckdb_service.conn.execute(summary_sql).fetchone()
+        total_personas = int(summary[0] or 0)
+
+        person_sql = self.build_person_query(pairs_cte, activity_names, page_size, (page - 1) * page_size)
+        personas = [
+            self._process_person_row(row)
+            for row in duckdb_service.conn.execute(person_sql).fetchall()
         ]
-        
-        statistics = self._process_stats_result(stats_result)
-        
-        print(f"✓ Actividad procesada: {column.replace('\"', '')} - {len(inasistentes_data)} inasistentes")
-        
+
+        total_pages = (total_personas + page_size - 1) // page_size if total_personas else 0
+
+        print(f"✓ Reporte por persona: {total_personas} personas, {int(summary[1] or 0)} actividades faltantes")
+
+        return {
+            "personas": personas,
+            "total_personas": total_personas,
+            "total_actividades_faltantes": int(summary[1] or 0),
+            "paginacion": {
+                "page": page,
+                "page_size": page_size,
+                "total_registros": total_personas,
+                "total_paginas": total_pages,
+                "has_next": page < total_pages,
+                "has_prev": page > 1
+            }
+        }
+
+
+    def _process_activity_row(self, row: tuple) -> dict:
+        """Procesa una fila individual de inasistente"""
+        return {
+            "departamento": str(row[0]) if row[0] else "",
+            "municipio": str(row[1]) if row[1] else "",
+            "nombre_ips": str(row[2]) if row[2] else "",
+            "nro_identificacion": str(row[3]) if row[3] else "",
+            "primer_apellido": str(row[4]) if row[4] else "",
+            "segundo_apellido": str(row[5]) if row[5] else "",
+            "primer_nombre": str(row[6]) if row[6] else "",
+            "segundo_nombre": str(row[7]) if row[7] else "",
+            "fecha_nacimiento": str(row[8]) if row[8] else "",
+            "edad_anos": int(row[9]) if row[9] is not None else None,
+            "edad_meses": int(row[10]) if row[10] is not None else None,
+            "actividad_valor": str(row[11]) if row[11] else "VACÍO",
+            "columna_evaluada": str(row[12])
+        }
+
+
+    def _process_stats_result(self, stats_result: Optional[tuple]) -> dict:
+        """Procesa resultado de estadísticas"""
+        if not stats_result:
+            stats_result = (None, 0, 0, 0, 0, 0)
         return {
-            "actividad": column.replace('"', ''),
-            "inasistentes": inasistentes_data,
-            "statistics": statistics
+            "total_inasistentes": int(stats_result[1]) if stats_result[1] else 0,
+            "departamentos_afectados": int(stats_result[2]) if stats_result[2] else 0,
+            "municipios_afectados": int(stats_result[3]) if stats_result[3] else 0,
+            "ips_afectadas": int(stats_result[4]) if stats_result[4] else 0
         }
 
 
@@ -130,24 +274,68 @@ class ReportActivity:
         activity_columns: List[str],
         age_filter: str,
         geo_filter: str,
-        corte_fecha: str
-    ) -> List[Dict[str, Any]]:
-        """Genera reportes individuales por cada actividad"""
-        activity_reports = []
-        
-        # Extraer referencia limpia para las queries
+        corte_fecha: str,
+        page: Optional[int] = None,
+        page_size: Optional[int] = None,
+        count_only: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Genera reportes por actividad con una consulta de estadísticas y, salvo en
+        modo solo-conteo, una consulta de detalle (página completa o solicitada).
+        """
         table_reference = self._clean_table_reference(data_source)
-        
-        # Procesar cada actividad
-        for column in activity_columns:
-            try:
-                report = self._process_single_activity(
-                    table_reference, column, age_filter, geo_filter, corte_fecha
-                )
-                activity_reports.append(report)
-                
-            except Exception as e:
-                print(f"❌ Error procesando actividad {column}: {e}")
-                continue
-        
-        return activity_reports
+        activity_columns = list(dict.fromkeys(activity_columns))
+        activity_names = [column.replace('"', '') for column in activity_columns]
+
+        pairs_cte = self.build_absent_pairs_cte(
+            table_reference, activity_columns, age_filter, geo_filter, corte_fecha
+        )
+
+        # Estadísticas por actividad + global en una pasada
+        stats_rows = duckdb_service.conn.execute(self._build_stats_query(pairs_cte)).fetchall()
+        stats_by_activity = {row[0]: row for row in stats_rows if row[0] is not None}
+        global_row = next((row for row in stats_rows if row[0] is None), None)
+
+        global_statistics = self._process_stats_result(global_row)
+        global_statistics["personas_unicas"] = int(global_row[5]) if global_row and global_row[5] else 0
+        total_pairs = global_statistics["total_inasistentes"]
+
+        # Detalle (paginado si se solicita)
+        rows_by_activity: Dict[str, List[dict]] = {name: [] for name in activity_names}
+        pagination = None
+
+        if not count_only:
+            limit = page_size if page and page_size else None
+            offset = (page - 1) * page_size if limit else 0
+            page_sql = self._build_page_query(pairs_cte, activity_names, limit, offset)
+            cursor = duckdb_service.conn.execute(page_sql)
+            for row in cursor.fetchall():
+                rows_by_activity.setdefault(row[12], []).append(self._process_activity_row(row))
+
+            if limit:
+                total_pages = (total_pairs + page_size - 1) // page_size if total_pairs else 0
+                pagination = {
+                    "page": page,
+                    "page_size": page_size,
+                    "total_registros": total_pairs,
+                    "total_paginas": total_pages,
+                    "has_next": page < total_pages,
+                    "has_prev": page > 1
+                }
+
+        activity_reports = [
+            {
+                "actividad": name,
+                "inasistentes": rows_by_activity.get(name, []),
+                "statistics": self._process_stats_result(stats_by_activity.get(name))
+            }
+            for name in activity_names
+        ]
+
+        print(f"✓ {len(activity_names)} actividades procesadas en una consulta UNPIVOT - {total_pairs} inasistentes")
+
+        return {
+            "activity_reports": activity_reports,
+            "global_statistics": global_statistics,
+            "pagination": pagination
+        }
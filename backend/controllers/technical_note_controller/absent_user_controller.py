@@ -1,14 +1,13 @@
-import csv
-import io
+from contextlib import ExitStack
 from typing import Any, Dict, List, Optional
-import unicodedata
 from fastapi.responses import StreamingResponse
-import pandas as pd
 
 from services.duckdb_service.duckdb_service import duckdb_service
 from services.technical_note_services.data_source_service import DataSourceService
+from services.technical_note_services.column_classification_service import column_classification_service, normalize_keyword
 from controllers.technical_note_controller.absent_user.reports_activity import ReportActivity
 from controllers.technical_note_controller.absent_user.activity_column import ActivityColumn
+from controllers.technical_note_controller.absent_user.absent_csv_stream import AbsentCsvStream
 
 
 class AbsentUserController:
@@ -43,11 +42,7 @@ class AbsentUserController:
 
     def _normalize_keyword(self, keyword: str) -> str:
         """Normaliza palabra clave removiendo tildes y convirtiendo a minúsculas"""
-        normalized = ''.join(
-            c for c in unicodedata.normalize('NFD', keyword)
-            if unicodedata.category(c) != 'Mn'
-        ).lower().strip()
-        return normalized[:-3] + 'ia' if normalized.endswith('ica') else normalized
+        return normalize_keyword(keyword)
 
     def _extract_clean_path(self, data_source: str) -> str:
         """Extrae la ruta limpia del data_source"""
@@ -122,6 +117,18 @@ class AbsentUserController:
     def _discover_activity_columns(self, data_source: str, keywords: List[str]) -> Dict[str, List[str]]:
         """Descubre dinámicamente columnas de actividades"""
         try:
+            # Clasificación precalculada del archivo: sin regex por columna
+            index = column_classification_service.get_index(data_source)
+            if index:
+                discovered_mapping = {}
+                for keyword in keywords:
+                    cols = column_classification_service.find_activity_columns(index, keyword)
+                    status = "✓" if cols else "✗"
+                    print(f"{status} {keyword}: {len(cols)} columnas encontradas (índice)")
+                    if cols:
+                        discovered_mapping[self._normalize_keyword(keyword)] = cols
+                return discovered_mapping if discovered_mapping else self._get_fallback_mapping(keywords)
+            
             clean_path = self._extract_clean_path(data_source)
             print(f"Descubriendo columnas en: {clean_path}")
             
@@ -168,6 +175,77 @@ class AbsentUserController:
         
         return result_mapping
 
+    def _build_age_filter(self, selected_months: List[int], selected_years: List[int], corte_fecha: str) -> str:
+        """Construye filtro de edad (meses OR años); vacío si no hay selección"""
+        age_conditions = []
+        if selected_months:
+            age_conditions.append(
+                f"date_diff('month', strptime(\"Fecha Nacimiento\", '%d/%m/%Y'), DATE '{corte_fecha}') "
+                f"IN ({','.join(map(str, selected_months))})"
+            )
+        if selected_years:
+            age_conditions.append(f"TRY_CAST(edad AS INTEGER) IN ({','.join(map(str, selected_years))})")
+        return " OR ".join(age_conditions)
+
+    def _build_geo_filter(self, departamento: Optional[str], municipio: Optional[str], ips: Optional[str]) -> str:
+        """Construye filtro geográfico"""
+        geo_conditions = []
+        if departamento:
+            geo_conditions.append(f'"Departamento" = \'{departamento}\'')
+        if municipio:
+            geo_conditions.append(f'"Municipio" = \'{municipio}\'')
+        if ips:
+            geo_conditions.append(f'"Nombre IPS" = \'{ips}\'')
+        return " AND ".join(geo_conditions) if geo_conditions else "1=1"
+
+    def _prepare_report_context(
+        self,
+        filename: str,
+        selected_months: List[int],
+        selected_years: List[int],
+        selected_keywords: List[str],
+        corte_fecha: str,
+        departamento: Optional[str],
+        municipio: Optional[str],
+        ips: Optional[str],
+        path_technical_note: str,
+        pins: ExitStack
+    ) -> Dict[str, Any]:
+        """
+        Resuelve fuente de datos, columnas de actividad y filtros compartidos por reporte y exportación.
+        La versión del archivo queda fijada hasta que el llamador cierre `pins`
+        """
+        file_key = f"technical_{filename.replace('.', '_').replace(' ', '_').replace('-', '_')}"
+        data_source_service = DataSourceService(path_technical_note)
+        data_source = data_source_service.ensure_data_source_available(filename, file_key)
+        data_source = pins.enter_context(data_source_service.pinned(filename, data_source))
+        
+        # Configurar keywords con fallback
+        selected_keywords = selected_keywords or ['medicina']
+        
+        # Descubrir columnas
+        discovered_columns = self._discover_activity_columns(data_source, selected_keywords)
+        # Una columna que coincide con varias keywords se unpivota una sola vez
+        all_activity_columns = list(dict.fromkeys(
+            col for cols in discovered_columns.values() for col in cols
+        ))
+        
+        if not all_activity_columns:
+            return {"error": f"No se encontraron columnas para: {selected_keywords}"}
+        
+        age_filter = self._build_age_filter(selected_months, selected_years, corte_fecha)
+        if not age_filter:
+            return {"error": "Debe seleccionar al menos una edad"}
+        
+        return {
+            "data_source": data_source,
+            "selected_keywords": selected_keywords,
+            "discovered_columns": discovered_columns,
+            "activity_columns": all_activity_columns,
+            "age_filter": age_filter,
+            "geo_filter": self._build_geo_filter(departamento, municipio, ips)
+        }
+
     def get_inasistentes_report(
         self,
         filename: str,
@@ -178,75 +256,57 @@ class AbsentUserController:
         departamento: Optional[str] = None,
         municipio: Optional[str] = None,
         ips: Optional[str] = None,
-        path_technical_note = ''
+        path_technical_note = '',
+        page: Optional[int] = None,
+        page_size: Optional[int] = None,
+        count_only: bool = False
     ) -> Dict[str, Any]:
-        """Genera reporte de inasistentes dinámico con descubrimiento automático de actividades"""
+        """
+        Genera reporte de inasistentes dinámico con descubrimiento automático de actividades.
+        Con page/page_size retorna solo esa página de detalle; con count_only solo estadísticas.
+        """
         try:
             print(f"Iniciando reporte: {filename}")
             
-            # Configurar fuente de datos
-            file_key = f"technical_{filename.replace('.', '_').replace(' ', '_').replace('-', '_')}"
-            data_source = DataSourceService(path_technical_note).ensure_data_source_available(filename, file_key)
-            
-            # Configurar keywords con fallback
-            selected_keywords = selected_keywords or ['medicina']
-            
-            # Descubrir columnas
-            discovered_columns = self._discover_activity_columns(data_source, selected_keywords)
-            all_activity_columns = [col for cols in discovered_columns.values() for col in cols]
-            
-            if not all_activity_columns:
-                return {
-                    "success": False,
-                    "error": f"No se encontraron columnas para: {selected_keywords}",
-                    "inasistentes_por_actividad": []
-                }
-            
-            # Construir filtros
-            age_conditions = []
-            if selected_months:
-                age_conditions.append(
-                    f"date_diff('month', strptime(\"Fecha Nacimiento\", '%d/%m/%Y'), DATE '{corte_fecha}') "
-                    f"IN ({','.join(map(str, selected_months))})"
+            with ExitStack() as pins:
+                context = self._prepare_report_context(
+                    filename, selected_months, selected_years, selected_keywords,
+                    corte_fecha, departamento, municipio, ips, path_technical_note, pins
                 )
-            if selected_years:
-                age_conditions.append(f"TRY_CAST(edad AS INTEGER) IN ({','.join(map(str, selected_years))})")
-            
-            if not age_conditions:
-                return {
-                    "success": False,
-                    "error": "Debe seleccionar al menos una edad",
-                    "inasistentes_por_actividad": []
-                }
-            
-            age_filter = " OR ".join(age_conditions)
-            
-            geo_conditions = []
-            if departamento:
-                geo_conditions.append(f'"Departamento" = \'{departamento}\'')
-            if municipio:
-                geo_conditions.append(f'"Municipio" = \'{municipio}\'')
-            if ips:
-                geo_conditions.append(f'"Nombre IPS" = \'{ips}\'')
-            geo_filter = " AND ".join(geo_conditions) if geo_conditions else "1=1"
-            
-            # Generar reportes
-            activity_reports = ReportActivity().generate_activity_reports(
-                data_source, all_activity_columns, age_filter, geo_filter, corte_fecha
-            )
+                if "error" in context:
+                    return {
+                        "success": False,
+                        "error": context["error"],
+                        "inasistentes_por_actividad": []
+                    }
+                
+                all_activity_columns = context["activity_columns"]
+                
+                # Generar reportes (una consulta UNPIVOT)
+                report = ReportActivity().generate_activity_reports(
+                    context["data_source"], all_activity_columns, context["age_filter"],
+                    context["geo_filter"], corte_fecha,
+                    page=page, page_size=page_size, count_only=count_only
+                )
+            activity_reports = report["activity_reports"]
+            global_statistics = report["global_statistics"]
             
             # Calcular resumen
-            total_inasistentes = sum(r["statistics"]["total_inasistentes"] for r in activity_reports)
+            total_inasistentes = global_statistics["total_inasistentes"]
             resumen_general = {
                 "total_actividades_evaluadas": len(all_activity_columns),
                 "total_inasistentes_global": total_inasistentes,
+                "departamentos_afectados": global_statistics["departamentos_afectados"],
+                "municipios_afectados": global_statistics["municipios_afectados"],
+                "ips_afectadas": global_statistics["ips_afectadas"],
+                "personas_unicas": global_statistics["personas_unicas"],
                 "actividades_con_inasistentes": sum(1 for r in activity_reports if r["statistics"]["total_inasistentes"] > 0),
                 "actividades_sin_inasistentes": sum(1 for r in activity_reports if r["statistics"]["total_inasistentes"] == 0)
             }
             
             print(f"Completado: {total_inasistentes} inasistentes")
             
-            return {
+            result = {
                 "success": True,
                 "filename": filename,
                 "corte_fecha": corte_fecha,
@@ -254,19 +314,24 @@ class AbsentUserController:
                 "filtros_aplicados": {
                     "selected_months": selected_months,
                     "selected_years": selected_years or [],
-                    "selected_keywords": selected_keywords,
+                    "selected_keywords": context["selected_keywords"],
                     "departamento": departamento,
                     "municipio": municipio,
                     "ips": ips
                 },
                 "columnas_descubiertas": {
                     k: [c.replace('"', '') for c in v] 
-                    for k, v in discovered_columns.items()
+                    for k, v in context["discovered_columns"].items()
                 },
                 "inasistentes_por_actividad": activity_reports,
                 "resumen_general": resumen_general,
-                "engine": "DuckDB_Dynamic_Discovery_v2"
+                "count_only": count_only,
+                "engine": "DuckDB_Unpivot_v3"
             }
+            if report["pagination"]:
+                result["paginacion"] = report["pagination"]
+            
+            return result
             
         except Exception as e:
             print(f"ERROR CRÍTICO: {e}")
@@ -278,7 +343,98 @@ class AbsentUserController:
                 "inasistentes_por_actividad": []
             }
 
-    def export_inasistentes_to_csv(
+    @staticmethod
+    def _release_after(stream, pins: ExitStack):
+        """Libera la versión fijada cuando termina (o se corta) el flujo CSV"""
+        with pins:
+            yield from stream
+
+    def _build_export_filename(
+        self,
+        prefix: str,
+        filename: str,
+        selected_keywords: Optional[List[str]],
+        selected_months: Optional[List[int]],
+        selected_years: Optional[List[int]],
+        departamento: Optional[str],
+        corte_fecha: str
+    ) -> str:
+        """Construye nombre del CSV exportado con los filtros aplicados"""
+        def sanitize(text):
+            for old, new in [("ñ", "n"), ("Ñ", "N"), ("á", "a"), ("é", "e"), ("í", "i"), 
+                           ("ó", "o"), ("ú", "u"), (" ", "-")]:
+                text = text.replace(old, new)
+            return text
+        
+        filters = []
+        if selected_keywords:
+            filters.append("palabras-" + "-".join(sanitize(k) for k in selected_keywords))
+        if selected_months:
+            filters.append("meses-" + "-".join(map(str, selected_months)))
+        if selected_years:
+            filters.append("años-" + "-".join(map(str, selected_years)))
+        if departamento:
+            filters.append("dept-" + sanitize(departamento))
+        
+        suffix = "_" + "_".join(filters) if filters else ""
+        return f"{prefix}_{filename.replace('.csv', '')}{suffix}_{corte_fecha}.csv"
+
+    def get_inasistentes_por_persona(
+        self,
+        filename: str,
+        selected_months: List[int],
+        selected_years: List[int] = None,
+        selected_keywords: List[str] = None,
+        corte_fecha: str = "2025-07-31",
+        departamento: Optional[str] = None,
+        municipio: Optional[str] = None,
+        ips: Optional[str] = None,
+        path_technical_note = '',
+        page: int = 1,
+        page_size: int = 1000
+    ) -> Dict[str, Any]:
+        """Inasistentes deduplicados: una fila por persona con sus actividades faltantes y prioridad"""
+        try:
+            print(f"Iniciando reporte por persona: {filename}")
+            
+            with ExitStack() as pins:
+                context = self._prepare_report_context(
+                    filename, selected_months, selected_years, selected_keywords,
+                    corte_fecha, departamento, municipio, ips, path_technical_note, pins
+                )
+                if "error" in context:
+                    return {"success": False, "error": context["error"], "personas": []}
+                
+                report = ReportActivity().generate_person_report(
+                    context["data_source"], context["activity_columns"], context["age_filter"],
+                    context["geo_filter"], corte_fecha, page=page, page_size=page_size
+                )
+            
+            return {
+                "success": True,
+                "filename": filename,
+                "corte_fecha": corte_fecha,
+                "metodo": "PIVOTE_POR_PERSONA",
+                "filtros_aplicados": {
+                    "selected_months": selected_months,
+                    "selected_years": selected_years or [],
+                    "selected_keywords": context["selected_keywords"],
+                    "departamento": departamento,
+                    "municipio": municipio,
+                    "ips": ips
+                },
+                "total_actividades_evaluadas": len(context["activity_columns"]),
+                **report,
+                "engine": "DuckDB_Unpivot_v3"
+            }
+            
+        except Exception as e:
+            print(f"ERROR CRÍTICO: {e}")
+            import traceback
+            traceback.print_exc()
+            return {"success": False, "error": str(e), "personas": []}
+
+    def export_inasistentes_por_persona_to_csv(
         self,
         filename: str,
         selected_months: List[int],
@@ -293,89 +449,117 @@ class AbsentUserController:
         use_excel_sep_hint: bool = True,
         sep: str = ";"
     ) -> StreamingResponse:
-        """Exporta reporte de inasistentes a CSV con encoding configurable"""
+        """Exporta el listado por persona directamente desde DuckDB a un flujo CSV"""
+        # La versión queda fijada hasta terminar de enviar el flujo (o hasta un error antes)
+        with ExitStack() as pins:
+            context = self._prepare_report_context(
+                filename, selected_months, selected_years, selected_keywords,
+                corte_fecha, departamento, municipio, ips, path_technical_note, pins
+            )
+            if "error" in context:
+                raise ValueError(context["error"])
+            release = pins.pop_all()
         
-        # Generar reporte
-        report_data = self.get_inasistentes_report(
-            filename, selected_months, selected_years, selected_keywords,
-            corte_fecha, departamento, municipio, ips, path_technical_note
+        report_activity = ReportActivity()
+        activity_columns = context["activity_columns"]
+        pairs_cte = report_activity.build_absent_pairs_cte(
+            report_activity._clean_table_reference(context["data_source"]),
+            activity_columns, context["age_filter"], context["geo_filter"], corte_fecha
+        )
+        person_sql = report_activity.build_person_query(
+            pairs_cte, [c.replace('"', '') for c in activity_columns]
         )
         
-        if not report_data.get("success"):
-            raise ValueError(report_data.get("error", "Error generando reporte"))
-        
-        # Extraer filas
-        rows = [
-            {
-                "Departamento": r["departamento"],
-                "Municipio": r["municipio"],
-                "Nombre IPS": r["nombre_ips"],
-                "Número Identificación": r["nro_identificacion"],
-                "Primer Apellido": r["primer_apellido"],
-                "Segundo Apellido": r["segundo_apellido"],
-                "Primer Nombre": r["primer_nombre"],
-                "Segundo Nombre": r["segundo_nombre"],
-                "Fecha Nacimiento": r["fecha_nacimiento"],
-                "Edad Años": r["edad_anos"],
-                "Edad Meses": r["edad_meses"],
-                "Actividad Faltante": r["columna_evaluada"],
-                "Estado Actividad": r["actividad_valor"],
-                "Grupo Actividad": activity_report["actividad"],
-                "Fecha Corte": report_data["corte_fecha"],
-            }
-            for activity_report in report_data["inasistentes_por_actividad"]
-            for r in activity_report["inasistentes"]
+        headers = [
+            "Departamento", "Municipio", "Nombre IPS", "Número Identificación",
+            "Primer Apellido", "Segundo Apellido", "Primer Nombre", "Segundo Nombre",
+            "Fecha Nacimiento", "Edad Años", "Edad Meses", "Total Actividades Faltantes",
+            "Actividades Faltantes", "Puntaje Prioridad", "Nivel Prioridad", "Fecha Corte"
         ]
         
-        # Crear DataFrame
-        df = pd.DataFrame(rows)
-        
-        # Mapeo de encoding
-        enc_map = {"cp1252": "cp1252", "latin-1": "latin-1", "utf-8-sig": "utf-8-sig"}
-        enc = enc_map.get(encoding.lower(), "cp1252")
-        
-        # Escribir a buffer
-        buf = io.BytesIO()
-        if use_excel_sep_hint:
-            buf.write(f"sep={sep}\n".encode(enc))
+        csv_stream = AbsentCsvStream(encoding=encoding, sep=sep, use_excel_sep_hint=use_excel_sep_hint)
+        out_name = self._build_export_filename(
+            "inasistentes_por_persona", filename, selected_keywords, selected_months,
+            selected_years, departamento, corte_fecha
+        )
         
-        df.to_csv(buf, index=False, encoding=enc, sep=sep, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
-        buf.seek(0)
+        return StreamingResponse(
+            self._release_after(csv_stream.stream_query(
+                person_sql, headers,
+                row_transform=lambda row: [v if v is not None else "" for v in row] + [corte_fecha]
+            ), release),
+            media_type="application/octet-stream",
+            headers={
+                "Content-Disposition": f'attachment; filename="{out_name}"',
+                "Content-Type": f"text/csv; charset={csv_stream.charset}"
+            }
+        )
+
+    def export_inasistentes_to_csv(
+        self,
+        filename: str,
+        selected_months: List[int],
+        selected_years: List[int] = None,
+        selected_keywords: List[str] = None,
+        corte_fecha: str = "2025-07-31",
+        departamento: Optional[str] = None,
+        municipio: Optional[str] = None,
+        ips: Optional[str] = None,
+        path_technical_note = '',
+        encoding: str = "cp1252",
+        use_excel_sep_hint: bool = True,
+        sep: str = ";"
+    ) -> StreamingResponse:
+        """
+        Exporta reporte de inasistentes a CSV con encoding configurable.
+        La consulta UNPIVOT se lee por lotes y se escribe directo al flujo de respuesta,
+        sin construir el reporte completo en memoria.
+        """
+        # La versión queda fijada hasta terminar de enviar el flujo (o hasta un error antes)
+        with ExitStack() as pins:
+            context = self._prepare_report_context(
+                filename, selected_months, selected_years, selected_keywords,
+                corte_fecha, departamento, municipio, ips, path_technical_note, pins
+            )
+            if "error" in context:
+                raise ValueError(context["error"])
+            release = pins.pop_all()
         
-        # Construir nombre de archivo
-        def sanitize(text):
-            for old, new in [("ñ", "n"), ("Ñ", "N"), ("á", "a"), ("é", "e"), ("í", "i"), 
-                           ("ó", "o"), ("ú", "u"), (" ", "-")]:
-                text = text.replace(old, new)
-            return text
+        report_activity = ReportActivity()
+        activity_columns = context["activity_columns"]
+        pairs_cte = report_activity.build_absent_pairs_cte(
+            report_activity._clean_table_reference(context["data_source"]),
+            activity_columns, context["age_filter"], context["geo_filter"], corte_fecha
+        )
+        detail_sql = report_activity._build_page_query(
+            pairs_cte, [c.replace('"', '') for c in activity_columns], None, 0
+        )
         
-        filters = []
-        if selected_keywords:
-            filters.append("palabras-" + "-".join(sanitize(k) for k in selected_keywords))
-        if selected_months:
-            filters.append("meses-" + "-".join(map(str, selected_months)))
-        if selected_years:
-            filters.append("años-" + "-".join(map(str, selected_years)))
-        if departamento:
-            filters.append("dept-" + sanitize(departamento))
+        headers = [
+            "Departamento", "Municipio", "Nombre IPS", "Número Identificación",
+            "Primer Apellido", "Segundo Apellido", "Primer Nombre", "Segundo Nombre",
+            "Fecha Nacimiento", "Edad Años", "Edad Meses", "Actividad Faltante",
+            "Estado Actividad", "Grupo Actividad", "Fecha Corte"
+        ]
         
-        suffix = "_" + "_".join(filters) if filters else ""
-        out_name = f"inasistentes_{filename.replace('.csv', '')}{suffix}_{corte_fecha}.csv"
+        def to_csv_row(row: tuple) -> list:
+            person = [v if v is not None else "" for v in row[:11]]
+            estado = row[11] if row[11] else "VACÍO"
+            return person + [row[12], estado, row[12], corte_fecha]
         
-        # Streaming
-        def stream():
-            buf.seek(0)
-            while chunk := buf.read(8192):
-                yield chunk
+        csv_stream = AbsentCsvStream(encoding=encoding, sep=sep, use_excel_sep_hint=use_excel_sep_hint)
         
-        charset_map = {"cp1252": "windows-1252", "latin-1": "ISO-8859-1"}
-        charset = charset_map.get(enc, "utf-8")
+        # Construir nombre de archivo
+        out_name = self._build_export_filename(
+            "inasistentes", filename, selected_keywords, selected_months,
+            selected_years, departamento, corte_fecha
+        )
         
         return StreamingResponse(
-            stream(),
+            self._release_after(csv_stream.stream_query(detail_sql, headers, row_transform=to_csv_row), release),
             media_type="application/octet-stream",
             headers={
                 "Content-Disposition": f'attachment; filename="{out_name}"',
-                "Content-Type": f"text/csv; charset={charset}"
+                "Content-Type": f"text/csv; charset={csv_stream.charset}"
             }
         )
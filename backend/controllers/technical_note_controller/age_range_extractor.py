@@ -1,5 +1,5 @@
 import re
-from typing import Optional
+from typing import Dict, Optional
 from dataclasses import dataclass
 
 @dataclass
@@ -57,8 +57,23 @@ class AgeRangeExtractor:
             (r'recién\s*nacid[oa]|neonat[oa]', 'months', 'special'),       # "recién nacido", "neonato"
             (r'lactante', 'months', 'special'),                            # "lactante"
         ]
+        # Resultados por nombre de columna (el nombre determina el rango)
+        self._memo: Dict[str, Optional[AgeRange]] = {}
+    
+    def seed(self, column_name: str, age_range: Optional[AgeRange]):
+        """Registra un rango ya calculado (índice de clasificación del archivo)"""
+        self._memo[column_name] = age_range
     
     def extract_age_range(self, column_name: str) -> Optional[AgeRange]:
+        """Extrae rango de edad desde nombre de columna, una sola vez por nombre"""
+        if column_name in self._memo:
+            return self._memo[column_name]
+        
+        age_range = self._extract_age_range_uncached(column_name)
+        self._memo[column_name] = age_range
+        return age_range
+    
+    def _extract_age_range_uncached(self, column_name: str) -> Optional[AgeRange]:
         """CORREGIDO: Extrae rango de edad desde nombre de columna"""
         try:
             normalized = column_name.lower().strip().replace('"', '')
@@ -72,7 +72,9 @@ class TechnicalNoteController:
                     geo_type
                 )
             
-            if not self.data_source_service.verify_data_source_readable(data_source):
+            # Si el índice geográfico ya existe no hace falta volver a escanear el archivo
+            if not self.geographic_service.is_index_cached(data_source) and \
+                    not self.data_source_service.verify_data_source_readable(data_source):
                 return self._build_error_response(
                     "No se puede leer el archivo", 
                     geo_type
@@ -91,6 +93,30 @@ class TechnicalNoteController:
             traceback.print_exc()
             raise HTTPException(status_code=500, detail=f"Error obteniendo valores geográficos: {str(e)}")
     
+    def get_geographic_tree(self, filename: str) -> Dict[str, Any]:
+        """Obtiene el árbol geográfico completo (Departamento → Municipio → IPS) con conteos"""
+        try:
+            file_key = generate_file_key(filename)
+            
+            try:
+                data_source = self.data_source_service.ensure_data_source_available(filename, file_key)
+            except Exception as data_error:
+                return {
+                    "success": False,
+                    "error": f"No se puede leer el archivo: {data_error}",
+                    "tree": []
+                }
+            
+            result = self.geographic_service.get_geographic_tree(data_source)
+            result["filename"] = filename
+            return result
+            
+        except Exception as e:
+            print(f"Error en get_geographic_tree: {e}")
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Error obteniendo árbol geográfico: {str(e)}")
+    
     def read_technical_file_data_paginated(
         self, 
         filename: str, 
@@ -174,16 +200,17 @@ class TechnicalNoteController:
                 'ips': ips
             }
             
-            # PASAR FECHA DINÁMICA AL SERVICIO
-            return self.report_service.generate_keyword_age_report(
-                data_source=data_source,
-                filename=filename,
-                keywords=keywords,
-                min_count=min_count,
-                include_temporal=include_temporal,
-                geographic_filters=geographic_filters,
-                corte_fecha=corte_fecha  # FECHA DINÁMICA
-            )
+            # PASAR FECHA DINÁMICA AL SERVICIO (versión fijada durante todo el reporte)
+            with self.data_source_service.pinned(filename, data_source) as data_source:
+                return self.report_service.generate_keyword_age_report(
+                    data_source=data_source,
+                    filename=filename,
+                    keywords=keywords,
+                    min_count=min_count,
+                    include_temporal=include_temporal,
+                    geographic_filters=geographic_filters,
+                    corte_fecha=corte_fecha  # FECHA DINÁMICA
+                )
             
         except HTTPException:
             raise
@@ -193,6 +220,99 @@ class TechnicalNoteController:
             traceback.print_exc()
             raise HTTPException(status_code=500, detail=f"Error generando reporte: {str(e)}")
     
+    def get_grouped_geographic_report(
+        self,
+        filename: str,
+        group_by: str,
+        keywords: Optional[List[str]] = None,
+        min_count: int = 0,
+        departamento: Optional[str] = None,
+        municipio: Optional[str] = None,
+        ips: Optional[str] = None,
+        corte_fecha: str = None
+    ) -> Dict[str, Any]:
+        """Genera reporte agrupado por nivel geográfico (tabla de posiciones / mapa de calor)"""
+        try:
+            if not corte_fecha:
+                raise HTTPException(
+                    status_code=400,
+                    detail="El parámetro 'corte_fecha' es obligatorio y debe venir desde el frontend"
+                )
+            file_key = generate_file_key(filename)
+            
+            try:
+                data_source = self.data_source_service.ensure_data_source_available(filename, file_key)
+            except Exception as data_error:
+                raise HTTPException(
+                    status_code=500, 
+                    detail=f"No se pudo acceder a los datos de {filename}: {str(data_error)}"
+                )
+            
+            with self.data_source_service.pinned(filename, data_source) as data_source:
+                return self.report_service.generate_grouped_geographic_report(
+                    data_source=data_source,
+                    filename=filename,
+                    group_by=group_by,
+                    keywords=keywords,
+                    min_count=min_count,
+                    geographic_filters={
+                        'departamento': departamento,
+                        'municipio': municipio,
+                        'ips': ips
+                    },
+                    corte_fecha=corte_fecha
+                )
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error en reporte agrupado: {e}")
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Error generando reporte agrupado: {str(e)}")
+    
+    def get_trend_report(
+        self,
+        filename: str,
+        cortes: List[str],
+        keywords: Optional[List[str]] = None,
+        departamento: Optional[str] = None,
+        municipio: Optional[str] = None,
+        ips: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Genera tendencia de cobertura para múltiples fechas de corte"""
+        try:
+            file_key = generate_file_key(filename)
+            
+            try:
+                data_source = self.data_source_service.ensure_data_source_available(filename, file_key)
+            except Exception as data_error:
+                raise HTTPException(
+                    status_code=500, 
+                    detail=f"No se pudo acceder a los datos de {filename}: {str(data_error)}"
+                )
+            
+            with self.data_source_service.pinned(filename, data_source) as data_source:
+                return self.report_service.generate_trend_report(
+                    data_source=data_source,
+                    filename=filename,
+                    cortes=cortes,
+                    keywords=keywords,
+                    geographic_filters={
+                        'departamento': departamento,
+                        'municipio': municipio,
+                        'ips': ips
+                    }
+                )
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error en tendencia: {e}")
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Error generando tendencia: {str(e)}")
+    
     def get_technical_file_metadata(self, filename: str) -> Dict[str, Any]:
         """Obtiene metadatos usando servicios especializados"""
         try:
@@ -201,11 +321,12 @@ class TechnicalNoteController:
             file_key = generate_file_key(filename)
             data_source = self.data_source_service.ensure_data_source_available(filename, file_key)
             
-            describe_sql = f"DESCRIBE SELECT * FROM {data_source}"
-            columns_result = duckdb_service.conn.execute(describe_sql).fetchall()
-            
-            count_sql = f"SELECT COUNT(*) FROM {data_source}"
-            total_rows = duckdb_service.conn.execute(count_sql).fetchone()[0]
+            with self.data_source_service.pinned(filename, data_source) as data_source:
+                describe_sql = f"DESCRIBE SELECT * FROM {data_source}"
+                columns_result = duckdb_service.conn.execute(describe_sql).fetchall()
+                
+                count_sql = f"SELECT COUNT(*) FROM {data_source}"
+                total_rows = duckdb_service.conn.execute(count_sql).fetchone()[0]
             
             columns = [
                 {
@@ -419,12 +540,41 @@ class TechnicalNoteController:
         selected_years: List[int] = None, selected_keywords: List[str] = None,
         corte_fecha: str = None,  # SIN VALOR POR DEFECTO
         departamento: Optional[str] = None, municipio: Optional[str] = None,
-        ips: Optional[str] = None
+        ips: Optional[str] = None, page: Optional[int] = None,
+        page_size: Optional[int] = None, count_only: bool = False
     ):
         """MODIFICADO: Pasar fecha dinámica al controlador de ausentes"""
         return AbsentUserController().get_inasistentes_report(
             filename, selected_months, selected_years, selected_keywords, corte_fecha,
-            departamento, municipio, ips, self.static_files_dir
+            departamento, municipio, ips, self.static_files_dir,
+            page=page, page_size=page_size, count_only=count_only
+        )
+    
+    def get_inasistentes_por_persona(
+        self, filename: str, selected_months: List[int],
+        selected_years: List[int] = None, selected_keywords: List[str] = None,
+        corte_fecha: str = None,
+        departamento: Optional[str] = None, municipio: Optional[str] = None,
+        ips: Optional[str] = None, page: int = 1, page_size: int = 1000
+    ):
+        """Inasistentes agrupados por persona (una fila por persona)"""
+        return AbsentUserController().get_inasistentes_por_persona(
+            filename, selected_months, selected_years, selected_keywords, corte_fecha,
+            departamento, municipio, ips, self.static_files_dir,
+            page=page, page_size=page_size
+        )
+    
+    def export_inasistentes_por_persona_csv(
+        self, filename: str, selected_months: List[int],
+        selected_years: List[int] = None, selected_keywords: List[str] = None,
+        corte_fecha: str = None,
+        departamento: Optional[str] = None,
+        municipio: Optional[str] = None, ips: Optional[str] = None
+    ):
+        """Exporta inasistentes por persona como flujo CSV"""
+        return AbsentUserController().export_inasistentes_por_persona_to_csv(
+            filename, selected_months, selected_years, selected_keywords, 
+            corte_fecha, departamento, municipio, ips, self.static_files_dir
         )
     
     def export_inasistentes_csv(
@@ -432,12 +582,14 @@ class TechnicalNoteController:
         selected_years: List[int] = None, selected_keywords: List[str] = None,
         corte_fecha: str = None,  # SIN VALOR POR DEFECTO
         departamento: Optional[str] = None,
-        municipio: Optional[str] = None, ips: Optional[str] = None
+        municipio: Optional[str] = None, ips: Optional[str] = None,
+        encoding: str = "cp1252"
     ):
         """MODIFICADO: Pasar fecha dinámica al exportador"""
         return AbsentUserController().export_inasistentes_to_csv(
             filename, selected_months, selected_years, selected_keywords, 
-            corte_fecha, departamento, municipio, ips, self.static_files_dir
+            corte_fecha, departamento, municipio, ips, self.static_files_dir,
+            encoding=encoding
         )
 
 
@@ -58,6 +58,22 @@ class FileCrossRequest(BaseModel):
     key_column_file2: str
     cross_type: str = "left"
     columns_to_include: Optional[Dict[str, List[str]]] = None 
+    key_normalization: List[str] = Field(default_factory=list)
+    preview_rows: int = Field(1000, ge=0, le=10000)
+
+class CrossPipelineStep(BaseModel):
+    file_key: str
+    base_key_columns: List[str]
+    lookup_key_columns: List[str]
+    columns_to_include: List[str] = Field(default_factory=list)
+    key_normalization: List[str] = Field(default_factory=list)
+    prefix: Optional[str] = None
+
+class CrossPipelineRequest(BaseModel):
+    base_file_key: str
+    base_columns: List[str] = Field(default_factory=list)
+    steps: List[CrossPipelineStep] = Field(..., min_length=1)
+    preview_rows: int = Field(1000, ge=0, le=10000)
 
 class FilterOperator(str, Enum):
     EQUALS = "equals"
@@ -0,0 +1,176 @@
+# services/aux_duckdb_services/column_sketch_cache.py
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from utils.sql_utils import SQLUtils
+
+
+class ColumnSketch:
+    """
+    Firma de contenido de una columna: MinHash de una permutación (mínimo hash
+    por cubeta) y cardinalidad estimada (HyperLogLog o mínimos de cubeta).
+    Dos firmas estiman Jaccard y contención de valores sin volver a leer los archivos.
+    """
+
+    def __init__(self, column: str, non_null: int, distinct: int, minhash: Dict[int, int]):
+        self.column = column
+        self.non_null = non_null
+        self.distinct = distinct
+        self.minhash = minhash
+
+    @property
+    def uniqueness(self) -> float:
+        """Distintos sobre valores no nulos: cerca de 1 en claves, cerca de 0 en categorías"""
+        return min(1.0, self.distinct / self.non_null) if self.non_null else 0.0
+
+    @property
+    def low_cardinality(self) -> bool:
+        """Columnas tipo bandera/categoría: pocos valores que se repiten mucho"""
+        return self.uniqueness < ColumnSketchCache.MIN_KEY_UNIQUENESS
+
+    def jaccard(self, other: 'ColumnSketch') -> float:
+        """Fracción de cubetas no vacías cuyo mínimo coincide en ambas firmas"""
+        buckets = self.minhash.keys() | other.minhash.keys()
+        if not buckets:
+            return 0.0
+        equal = sum(1 for bucket in buckets if self.minhash.get(bucket) == other.minhash.get(bucket))
+        return equal / len(buckets)
+
+    def overlap(self, other: 'ColumnSketch') -> Dict[str, float]:
+        """Jaccard, intersección estimada y contención en ambos sentidos"""
+        jaccard = self.jaccard(other)
+        intersection = jaccard / (1 + jaccard) * (self.distinct + other.distinct)
+        return {
+            "jaccard": jaccard,
+            "estimated_common_values": int(round(intersection)),
+            "containment_left": min(1.0, intersection / self.distinct) if self.distinct else 0.0,
+            "containment_right": min(1.0, intersection / other.distinct) if other.distinct else 0.0
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "column": self.column,
+            "non_null": self.non_null,
+            "distinct": self.distinct,
+            "uniqueness": round(self.uniqueness, 3),
+            "buckets": len(self.minhash),
+            "low_cardinality": self.low_cardinality
+        }
+
+
+class ColumnSketchCache:
+    """Firmas de columnas por versión de archivo (data_source), construidas con una sola pasada"""
+
+    SKETCH_BUCKETS = int(os.getenv("COLUMN_SKETCH_BUCKETS", "256"))
+    MIN_KEY_UNIQUENESS = 0.1
+
+    def __init__(self, buckets: Optional[int] = None):
+        self.buckets = buckets or self.SKETCH_BUCKETS
+        self.sql_utils = SQLUtils()
+        self._sketches: Dict[str, Dict[str, ColumnSketch]] = {}
+        self._build_times: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _build(self, conn, source_ref: str, columns: List[str]) -> Dict[str, ColumnSketch]:
+        """
+        UNPIVOT de todas las columnas (como texto recortado, vacíos = NULL) y una
+        agregación con GROUPING SETS: mínimo hash por (columna, cubeta) y totales por columna.
+        """
+        start_time = time.time()
+        select_list = ", ".join(
+            f"NULLIF(TRIM(CAST({col} AS VARCHAR)), '') AS {col}"
+            for col in (self.sql_utils.escape_identifier(name) for name in columns)
+        )
+        rows = conn.execute(f"""
+        WITH valores AS (
+            SELECT columna, valor, hash(valor) AS h
+            FROM (
+                UNPIVOT (SELECT {select_list} FROM {source_ref})
+                ON COLUMNS(*) INTO NAME columna VALUE valor
+            )
+        )
+        SELECT columna, GROUPING(h % {self.buckets}) AS es_total, h % {self.buckets} AS cubeta,
+               MIN(h) AS minimo, COUNT(*) AS valores, approx_count_distinct(valor) AS distintos
+        FROM valores
+        GROUP BY GROUPING SETS ((columna, h % {self.buckets}), (columna))
+        """).fetchall()
+
+        totals: Dict[str, Tuple[int, int]] = {}
+        minhashes: Dict[str, Dict[int, int]] = {col: {} for col in columns}
+        for columna, es_total, cubeta, minimo, valores, distintos in rows:
+            if es_total:
+                totals[columna] = (int(valores), int(distintos))
+            else:
+                minhashes[columna][int(cubeta)] = int(minimo)
+
+        sketches = {}
+        for col in columns:
+            non_null, distinct = totals.get(col, (0, 0))
+            distinct = min(self._estimate_distinct(minhashes[col], distinct), non_null)
+            sketches[col] = ColumnSketch(col, non_null, distinct, minhashes[col])
+
+        self._build_times[source_ref] = round(time.time() - start_time, 3)
+        print(f"🧬 Firmas de columnas listas: {len(sketches)} columnas de {source_ref} en {self._build_times[source_ref]}s")
+        return sketches
+
+    def _estimate_distinct(self, minhash: Dict[int, int], hll_distinct: int) -> int:
+        """
+        Con todas las cubetas ocupadas, los mínimos normalizados estiman la cardinalidad
+        con más precisión que approx_count_distinct; en columnas pequeñas se usa HLL.
+        """
+        if len(minhash) < self.buckets:
+            return max(hll_distinct, len(minhash))
+        bucket_width = 2 ** 64 / self.buckets
+        normalized_sum = sum((value // self.buckets) / bucket_width for value in minhash.values())
+        if normalized_sum <= 0:
+            return hll_distinct
+        return int(round(self.buckets * (self.buckets - 1) / normalized_sum))
+
+    def get(self, conn, source_ref: str, columns: List[str]) -> Tuple[Dict[str, ColumnSketch], bool]:
+        """Retorna (firmas por columna, desde_cache); construye las firmas si no existen"""
+        sketches = self._sketches.get(source_ref)
+        if sketches is not None:
+            return sketches, True
+
+        with self._lock:
+            source_lock = self._locks.setdefault(source_ref, threading.Lock())
+        with source_lock:
+            sketches = self._sketches.get(source_ref)
+            if sketches is not None:
+                return sketches, True
+            sketches = self._build(conn, source_ref, columns)
+            self._sketches[source_ref] = sketches
+            return sketches, False
+
+    def has(self, source_ref: str) -> bool:
+        return source_ref in self._sketches
+
+    def invalidate(self, source_ref: Optional[str] = None) -> int:
+        """Elimina las firmas de una fuente o todas si no se especifica"""
+        with self._lock:
+            if source_ref is None:
+                count = len(self._sketches)
+                self._sketches.clear()
+                self._build_times.clear()
+                return count
+            self._build_times.pop(source_ref, None)
+            return 1 if self._sketches.pop(source_ref, None) is not None else 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "total_sources": len(self._sketches),
+            "buckets": self.buckets,
+            "sources": [
+                {
+                    "source": source,
+                    "columns": len(sketches),
+                    "build_time_seconds": self._build_times.get(source)
+                }
+                for source, sketches in self._sketches.items()
+            ]
+        }
+
+    def __len__(self) -> int:
+        return len(self._sketches)
@@ -0,0 +1,49 @@
+# services/aux_duckdb_services/date_macros.py
+from typing import Optional
+
+
+# Formatos soportados en orden de preferencia (día/mes primero, convención local)
+DATE_FORMATS = ['%d/%m/%Y', '%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S']
+
+
+class DateMacros:
+    """
+    Macros DuckDB para parsear fechas de texto. Con el formato conocido de la
+    columna se evalúa un solo try_strptime por fila; fecha_flexible queda
+    como respaldo cuando el formato no se ha perfilado.
+    """
+
+    MACROS = [
+        """
+        CREATE OR REPLACE MACRO fecha_con_formato(valor, formato) AS
+            CAST(try_strptime(TRIM(CAST(valor AS VARCHAR)), formato) AS DATE)
+        """,
+        f"""
+        CREATE OR REPLACE MACRO fecha_flexible(valor) AS
+            COALESCE(
+                TRY_CAST(TRIM(CAST(valor AS VARCHAR)) AS DATE),
+                CAST(try_strptime(TRIM(CAST(valor AS VARCHAR)), {DATE_FORMATS}) AS DATE),
+                CAST(try_strptime(SUBSTR(TRIM(CAST(valor AS VARCHAR)), 1, 10), '%Y-%m-%d') AS DATE)
+            )
+        """
+    ]
+
+    def register(self, conn) -> bool:
+        """Registra (o reemplaza) las macros en la conexión"""
+        try:
+            for macro_sql in self.MACROS:
+                conn.execute(macro_sql)
+            return True
+        except Exception as e:
+            print(f"Error registrando macros de fecha: {e}")
+            return False
+
+    def parse_sql(self, column_expr: str, date_format: Optional[str] = None) -> str:
+        """Expresión SQL que convierte la columna a DATE"""
+        if date_format:
+            safe_format = date_format.replace("'", "''")
+            return f"fecha_con_formato({column_expr}, '{safe_format}')"
+        return f"fecha_flexible({column_expr})"
+
+
+date_macros = DateMacros()
@@ -4,6 +4,7 @@ from datetime import datetime
 import os
 import shutil
 import duckdb
+from services.aux_duckdb_services.date_macros import date_macros
 
 class InitializeConnection:
     
@@ -23,6 +24,9 @@ class InitializeConnection:
                 conn.execute("PRAGMA memory_limit='8GB'")
                 conn.execute("SET enable_progress_bar=true")
                 
+                # Macros de parseo de fechas usadas por los reportes
+                date_macros.register(conn)
+                
                 # Test de conexión
                 conn.execute("SELECT 1").fetchone()
                 
@@ -43,6 +47,7 @@ class InitializeConnection:
             conn = duckdb.connect(":memory:")
             conn.execute("PRAGMA threads=2")
             conn.execute("PRAGMA memory_limit='4GB'")
+            date_macros.register(conn)
             return conn
         except Exception as e:
             print(f"Error crítico: No se puede inicializar DuckDB: {e}")
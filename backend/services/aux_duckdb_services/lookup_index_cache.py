@@ -0,0 +1,219 @@
+# services/aux_duckdb_services/lookup_index_cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+from utils.sql_utils import SQLUtils
+
+
+class LookupIndex:
+    """
+    Tabla de búsqueda deduplicada (primera coincidencia por clave) persistida en
+    Parquet y ordenada por clave. La clave ya viene normalizada en la columna
+    __lookup_key, así que los cruces no repiten el ROW_NUMBER ni el CAST del lado lookup.
+    """
+
+    KEY_COLUMN = "__lookup_key"
+    ROW_COLUMN = "__lookup_row"
+
+    def __init__(self, source_ref: str, key_columns: Tuple[str, ...], normalization: str, parquet_path: str):
+        self.source_ref = source_ref
+        self.key_columns = key_columns
+        self.normalization = normalization
+        self.parquet_path = parquet_path
+        self.rows = 0
+        self.built_at: Optional[float] = None
+        self.build_time_seconds = 0.0
+        self.hits = 0
+
+    @property
+    def table_ref(self) -> str:
+        escaped_path = self.parquet_path.replace("'", "''")
+        return f"read_parquet('{escaped_path}')"
+
+    def _positioned_source(self) -> str:
+        """
+        Fuente con la posición original de cada fila: file_row_number para Parquet,
+        ROW_NUMBER() en orden de lectura para vistas (no tienen rowid)
+        """
+        if self.source_ref.startswith("read_parquet(") and self.source_ref.endswith(")"):
+            return (
+                f"(SELECT * EXCLUDE (file_row_number), file_row_number AS {self.ROW_COLUMN} "
+                f"FROM {self.source_ref[:-1]}, file_row_number=true))"
+            )
+        return f"(SELECT *, ROW_NUMBER() OVER () AS {self.ROW_COLUMN} FROM {self.source_ref})"
+
+    def build(self, conn) -> 'LookupIndex':
+        """Escribe la primera fila (en orden del archivo, como BUSCARX) de cada clave no nula, ordenada por clave"""
+        start_time = time.time()
+        sql_utils = SQLUtils()
+        key_expr = LookupIndexCache.composite_key_expression(
+            [sql_utils.escape_identifier(col) for col in self.key_columns], self.normalization
+        )
+        escaped_path = self.parquet_path.replace("'", "''")
+
+        written = conn.execute(f"""
+        COPY (
+            SELECT * EXCLUDE ({self.ROW_COLUMN}) FROM (
+                SELECT {key_expr} AS {self.KEY_COLUMN}, *
+                FROM {self._positioned_source()}
+            )
+            WHERE {self.KEY_COLUMN} IS NOT NULL
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY {self.KEY_COLUMN} ORDER BY {self.ROW_COLUMN}) = 1
+            ORDER BY {self.KEY_COLUMN}
+        ) TO '{escaped_path}' (FORMAT PARQUET, COMPRESSION ZSTD)
+        """).fetchone()
+
+        self.rows = int(written[0]) if written else 0
+        self.built_at = time.time()
+        self.build_time_seconds = round(self.built_at - start_time, 3)
+        print(f"🔑 Índice de búsqueda listo: {', '.join(self.key_columns)} ({self.normalization}) → {self.rows:,} claves en {self.build_time_seconds}s")
+        return self
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.source_ref,
+            "key_columns": list(self.key_columns),
+            "normalization": self.normalization,
+            "rows": self.rows,
+            "hits": self.hits,
+            "build_time_seconds": self.build_time_seconds,
+            "parquet_path": self.parquet_path
+        }
+
+
+class LookupIndexCache:
+    """Cache LRU de índices de búsqueda por (versión del archivo, columnas clave, normalización)"""
+
+    # Pasos de normalización de claves, siempre aplicados en este orden
+    NORMALIZATION_STEPS = ("trim", "upper", "digits", "strip_zeros")
+    MAX_INDEXES = int(os.getenv("CROSS_LOOKUP_INDEX_MAX", "32"))
+
+    def __init__(self, index_dir: str, max_indexes: Optional[int] = None):
+        self.index_dir = index_dir
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.max_indexes = max_indexes or self.MAX_INDEXES
+        self._indexes: "OrderedDict[Tuple[str, Tuple[str, ...], str], LookupIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def normalization_name(cls, steps: Optional[Sequence[str]] = None) -> str:
+        """Nombre canónico de una normalización ('none', 'trim+upper', 'digits+strip_zeros'...)"""
+        if not steps:
+            return "none"
+        if isinstance(steps, str):
+            steps = [] if steps == "none" else steps.split("+")
+
+        requested = {step.strip().lower() for step in steps}
+        invalid = requested - set(cls.NORMALIZATION_STEPS)
+        if invalid:
+            raise ValueError(
+                f"Normalización de clave no soportada: {', '.join(sorted(invalid))}. "
+                f"Use: {', '.join(cls.NORMALIZATION_STEPS)}"
+            )
+        ordered = [step for step in cls.NORMALIZATION_STEPS if step in requested]
+        return "+".join(ordered) if ordered else "none"
+
+    @classmethod
+    def key_expression(cls, escaped_column: str, normalization: str = "none") -> str:
+        """
+        Expresión SQL de la clave normalizada para una columna ya escapada.
+        Con 'digits' + 'strip_zeros' la clave es numérica (HUGEINT) para un hash join compacto;
+        en los demás modos normalizados una clave vacía queda NULL y no cruza.
+        """
+        if normalization == "none":
+            return f"CAST({escaped_column} AS VARCHAR)"
+
+        steps = cls.normalization_name(normalization).split("+")
+        expr = f"CAST({escaped_column} AS VARCHAR)"
+
+        if "digits" in steps and "strip_zeros" in steps:
+            return f"TRY_CAST(NULLIF(regexp_replace({expr}, '[^0-9]', '', 'g'), '') AS HUGEINT)"
+
+        if "trim" in steps:
+            expr = f"TRIM({expr})"
+        if "upper" in steps:
+            expr = f"UPPER({expr})"
+        if "digits" in steps:
+            expr = f"regexp_replace({expr}, '[^0-9]', '', 'g')"
+        if "strip_zeros" in steps:
+            expr = f"regexp_replace({expr}, '^0+([^0]|0$)', '\\1')"
+        return f"NULLIF({expr}, '')"
+
+    @classmethod
+    def composite_key_expression(cls, escaped_columns: Sequence[str], normalization: str = "none") -> str:
+        """
+        Clave de una o varias columnas. Las compuestas se unen con un separador
+        de control y son NULL si alguna parte es NULL (no cruzan, como en SQL).
+        """
+        parts = [cls.key_expression(col, normalization) for col in escaped_columns]
+        if len(parts) == 1:
+            return parts[0]
+        if normalization != "none":
+            parts = [f"CAST({part} AS VARCHAR)" for part in parts]
+
+        any_null = " OR ".join(f"({part}) IS NULL" for part in parts)
+        joined = " || chr(31) || ".join(f"({part})" for part in parts)
+        return f"CASE WHEN {any_null} THEN NULL ELSE {joined} END"
+
+    def _index_path(self, cache_key: Tuple[str, Tuple[str, ...], str]) -> str:
+        raw_key = "|".join([cache_key[0], chr(31).join(cache_key[1]), cache_key[2]])
+        digest = hashlib.md5(raw_key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.index_dir, f"lookup_{digest}.parquet")
+
+    def get(
+        self,
+        conn,
+        source_ref: str,
+        key_columns: Union[str, Sequence[str]],
+        normalization: str = "none"
+    ) -> Tuple[LookupIndex, bool]:
+        """Retorna (índice, desde_cache); construye el índice si no existe"""
+        normalization = self.normalization_name(normalization)
+        key_columns = (key_columns,) if isinstance(key_columns, str) else tuple(key_columns)
+        cache_key = (source_ref, key_columns, normalization)
+        with self._lock:
+            index = self._indexes.get(cache_key)
+            if index is not None and os.path.exists(index.parquet_path):
+                self._indexes.move_to_end(cache_key)
+                index.hits += 1
+                return index, True
+
+            index = LookupIndex(source_ref, key_columns, normalization, self._index_path(cache_key)).build(conn)
+            self._indexes[cache_key] = index
+            self._evict()
+            return index, False
+
+    def _evict(self):
+        while len(self._indexes) > self.max_indexes:
+            _, index = self._indexes.popitem(last=False)
+            self._remove_file(index)
+
+    @staticmethod
+    def _remove_file(index: LookupIndex):
+        try:
+            if os.path.exists(index.parquet_path):
+                os.remove(index.parquet_path)
+        except OSError:
+            pass
+
+    def invalidate(self, source_ref: Optional[str] = None) -> int:
+        """Elimina los índices de una fuente o todos si no se especifica"""
+        with self._lock:
+            keys = [key for key in self._indexes if source_ref is None or key[0] == source_ref]
+            for key in keys:
+                self._remove_file(self._indexes.pop(key))
+            return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_indexes": len(self._indexes),
+                "max_indexes": self.max_indexes,
+                "indexes": [index.get_stats() for index in self._indexes.values()]
+            }
+
+    def __len__(self) -> int:
+        return len(self._indexes)
@@ -20,8 +20,9 @@ class QueryPagination:
         page_size: int = 1000,
         selected_columns: Optional[List[str]] = None,
         loaded_tables: Dict[str, Any] = {},
+        table_ref: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Query ultra-rápida CON PAGINACIÓN COMPLETA """
+        """Query ultra-rápida CON PAGINACIÓN COMPLETA (table_ref: versión fijada por el llamador)"""
         
         try:
             # VERIFICAR Y REGENERAR PARQUET SI ES NECESARIO
@@ -37,10 +38,11 @@ class QueryPagination:
             # Obtener referencia a la tabla
             table_info = loaded_tables[file_id]
             
-            if table_info.get("type") == "lazy":
-                table_ref = f"read_parquet('{table_info['parquet_path']}')"
-            else:
-                table_ref = table_info["table_name"]
+            if not table_ref:
+                if table_info.get("type") == "lazy":
+                    table_ref = f"read_parquet('{table_info['parquet_path']}')"
+                else:
+                    table_ref = table_info["table_name"]
             
             # CONSTRUIR COLUMNAS PARA SELECT
             if selected_columns:
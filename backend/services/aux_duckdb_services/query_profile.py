@@ -0,0 +1,107 @@
+# services/aux_duckdb_services/query_profile.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+
+class QueryProfile:
+    """
+    Perfil de consultas por solicitud:
+    - production: sin consultas de diagnóstico ni log a archivo
+    - debug: ejecuta las consultas de diagnóstico y escribe el log de reportes
+
+    Mientras está activo, cada SQL ejecutado con duckdb_service.conn se cuenta.
+    """
+
+    PRODUCTION = "production"
+    DEBUG = "debug"
+    MODES = (PRODUCTION, DEBUG)
+
+    DEFAULT_MODE = os.getenv("REPORT_QUERY_PROFILE", PRODUCTION).lower()
+
+    def __init__(self, mode: Optional[str] = None):
+        mode = (mode or self.DEFAULT_MODE).lower()
+        if mode not in self.MODES:
+            raise ValueError(f"Perfil de consultas inválido: {mode}. Use {' o '.join(self.MODES)}")
+        self.mode = mode
+        self.sql_statements = 0
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def debug(self) -> bool:
+        return self.mode == self.DEBUG
+
+    def count_statement(self):
+        with self._lock:
+            self.sql_statements += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "sql_statements": self.sql_statements,
+            "elapsed_seconds": round(time.time() - self.started_at, 3)
+        }
+
+
+_active_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+
+def current_query_profile() -> Optional[QueryProfile]:
+    """Perfil activo en el contexto actual (hilos de fases incluidos)"""
+    return _active_profile.get()
+
+
+def is_debug_profile() -> bool:
+    """True si las consultas de diagnóstico deben ejecutarse"""
+    profile = _active_profile.get()
+    if profile is not None:
+        return profile.debug
+    return QueryProfile.DEFAULT_MODE == QueryProfile.DEBUG
+
+
+@contextmanager
+def query_profile_scope(mode: Optional[str] = None):
+    """
+    Activa un perfil para el bloque. Si ya hay uno activo (la ruta lo abrió)
+    y no se pide modo, se reutiliza para que el conteo sea de toda la solicitud.
+    """
+    active = _active_profile.get()
+    if active is not None and mode is None:
+        yield active
+        return
+
+    profile = QueryProfile(mode)
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+class CountingConnection:
+    """Envuelve la conexión/cursor DuckDB y cuenta cada sentencia ejecutada"""
+
+    __slots__ = ("_conn", "_profile")
+
+    def __init__(self, conn, profile: QueryProfile):
+        self._conn = conn
+        self._profile = profile
+
+    def execute(self, *args, **kwargs):
+        self._profile.count_statement()
+        return self._conn.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._profile.count_statement()
+        return self._conn.executemany(*args, **kwargs)
+
+    def sql(self, *args, **kwargs):
+        self._profile.count_statement()
+        return self._conn.sql(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
@@ -19,7 +19,12 @@ class SqlConditionFilter:
         try:
             column = filter_item.get('column')
             operator = filter_item.get('operator', '=').lower()
-            values = filter_item.get('values', filter_item.get('value'))
+            # Los filtros de /data llegan con 'value' o 'values' (el otro en None)
+            values = filter_item.get('values')
+            if values is None:
+                values = filter_item.get('value')
+            if values is None and operator in ['is_null', 'null', 'is_not_null', 'not_null']:
+                values = []
             
             if not column or values is None:
                 print(f"Filtro incompleto: {filter_item}")
@@ -1,158 +0,0 @@
-# services/cross_service.py
-import pandas as pd
-import io
-from fastapi.responses import StreamingResponse
-
-class CrossService:
-    @staticmethod
-    def cross_files(df1: pd.DataFrame, df2: pd.DataFrame, key1: str, key2: str, how='left'):
-        """
-        Cruce ultra-eficiente tipo VLOOKUP con técnica optimizada:
-        - df1: Archivo base (se mantienen TODOS los registros)
-        - df2: Archivo de búsqueda (solo PRIMERA coincidencia por clave)
-        - Hasta 10x más rápido que merge tradicional en archivos grandes
-        """
-        
-        df1_copy = df1.copy()
-        df2_copy = df2.copy()
-        
-        # Normalizar tipos de columnas clave
-        df1_copy[key1] = df1_copy[key1].astype(str).str.strip()
-        df2_copy[key2] = df2_copy[key2].astype(str).str.strip()
-        
-        # CLAVE: Eliminar duplicados del archivo de búsqueda (solo primer match)
-        df2_lookup = df2_copy.drop_duplicates(subset=[key2], keep='first')
-                
-        # ESTRATEGIA HÍBRIDA: usar map() para archivos grandes, merge() para medianos
-        if len(df1) > 100000:  # Archivos grandes: usar map (más eficiente)
-            result_df = CrossService._cross_with_map(df1_copy, df2_lookup, key1, key2)
-        else:  # Archivos medianos: usar merge tradicional
-            result_df = pd.merge(
-                df1_copy, df2_lookup,
-                left_on=key1, right_on=key2, 
-                how=how,
-                suffixes=('', '_cruce')
-            )
-        
-        return result_df
-
-    @staticmethod
-    def _cross_with_map(df1: pd.DataFrame, df2: pd.DataFrame, key1: str, key2: str):
-        """Método ultra-eficiente usando map() - ideal para archivos grandes"""
-        
-        # Obtener columnas a mapear (excluyendo la clave)
-        cols_to_map = [col for col in df2.columns if col != key2]
-        
-        # Crear resultado basado en df1
-        result_df = df1.copy()
-        
-        # TÉCNICA ULTRA-EFICIENTE: map() es 10x más rápido que merge para lookups
-        for col in cols_to_map:
-            lookup_dict = df2.set_index(key2)[col].to_dict()
-            result_df[col] = result_df[key1].map(lookup_dict)
-        
-        # Agregar columna indicadora para compatibilidad
-        result_df['_merge'] = result_df[cols_to_map[0]].apply(
-            lambda x: 'both' if pd.notna(x) else 'left_only'
-        ) if cols_to_map else 'left_only'
-        
-        matches = (result_df['_merge'] == 'both').sum()
-        no_matches = (result_df['_merge'] == 'left_only').sum()
-        
-        print(f"Map resultado: {matches:,} coincidencias, {no_matches:,} sin coincidencias")
-        
-        return result_df
-
-    @staticmethod
-    def cross_files_with_stats(df1: pd.DataFrame, df2: pd.DataFrame, key1: str, key2: str, columns_to_add: list = None):
-        """Versión con estadísticas detalladas"""
-        result_df = CrossService.cross_files(df1, df2, key1, key2)
-        
-        # Calcular estadísticas
-        if '_merge' in result_df.columns:
-            merge_counts = result_df['_merge'].value_counts().to_dict()
-            stats = {
-                "total_rows": len(result_df),
-                "matched_rows": merge_counts.get('both', 0),
-                "unmatched_rows": merge_counts.get('left_only', 0),
-                "match_percentage": (merge_counts.get('both', 0) / len(result_df)) * 100 if len(result_df) > 0 else 0,
-                "duplicates_removed": len(df2) - len(df2.drop_duplicates(subset=[key2], keep='first')),
-                "processing_method": "map_optimized" if len(df1) > 100000 else "merge_traditional"
-            }
-        else:
-            stats = {
-                "total_rows": len(result_df),
-                "matched_rows": 0,
-                "unmatched_rows": len(result_df),
-                "match_percentage": 0
-            }
-        
-        return result_df, stats
-
-    @staticmethod
-    def cross_files_to_stream(df1: pd.DataFrame, df2: pd.DataFrame, key1: str, key2: str, filename: str = "cruce_resultado.csv"):
-        """
-        Cruce optimizado que devuelve StreamingResponse para archivos grandes
-        - Procesa en chunks para mínimo uso de memoria
-        - Devuelve CSV descargable directamente
-        """
-        
-        # Preparar DataFrames
-        df1_copy = df1.copy()
-        df2_copy = df2.copy()
-        
-        # Normalizar claves
-        df1_copy[key1] = df1_copy[key1].astype(str).str.strip()
-        df2_copy[key2] = df2_copy[key2].astype(str).str.strip()
-        
-        # Eliminar duplicados del archivo de búsqueda
-        df2_lookup = df2_copy.drop_duplicates(subset=[key2], keep='first')
-        
-        # USAR MAP PARA MÁXIMA EFICIENCIA
-        cols_to_map = [col for col in df2_lookup.columns if col != key2]
-        result_df = df1_copy.copy()
-        
-        for col in cols_to_map:
-            lookup_dict = df2_lookup.set_index(key2)[col].to_dict()
-            result_df[col] = result_df[key1].map(lookup_dict)
-        
-        # GENERAR STREAMING RESPONSE
-        def generate_csv():
-            # Crear buffer en memoria
-            buffer = io.StringIO()
-            
-            # Escribir headers
-            headers = list(result_df.columns)
-            buffer.write(','.join(f'"{h}"' for h in headers) + '\n')
-            yield buffer.getvalue()
-            buffer.seek(0)
-            buffer.truncate(0)
-            
-            # ESCRIBIR DATOS EN CHUNKS PARA EFICIENCIA
-            chunk_size = 1000  # 1000 filas por chunk
-            total_chunks = len(result_df) // chunk_size + 1
-            
-            for i, chunk_start in enumerate(range(0, len(result_df), chunk_size)):
-                chunk_end = min(chunk_start + chunk_size, len(result_df))
-                chunk_df = result_df.iloc[chunk_start:chunk_end]
-                
-                # Convertir chunk a CSV
-                chunk_csv = chunk_df.to_csv(index=False, header=False, quoting=1)
-                yield chunk_csv
-                
-                # Log progreso
-                if i % 50 == 0:  # Cada 50 chunks
-                    progress = (i + 1) / total_chunks * 100
-                    print(f"📤 Progreso streaming: {progress:.1f}%")
-        
-        # RETORNAR STREAMING RESPONSE
-        headers = {
-            'Content-Disposition': f'attachment; filename="{filename}"',
-            'Content-Type': 'text/csv; charset=utf-8'
-        }
-        
-        return StreamingResponse(
-            generate_csv(),
-            media_type="text/csv",
-            headers=headers
-        )
@@ -1,7 +1,9 @@
 # services/duckdb_service/connection/connection_manager.py
 import os
+import threading
 from typing import Dict, Any
 from services.aux_duckdb_services.initialize_connection import InitializeConnection
+from services.aux_duckdb_services.query_profile import CountingConnection, current_query_profile
 
 class ConnectionManager:
     """Maneja la conexión DuckDB y su estado"""
@@ -12,6 +14,8 @@ class ConnectionManager:
         self.metadata_dir = metadata_dir
         self.db_path = os.path.join(duckdb_dir, "main.duckdb")
         self.conn = None
+        # Cursor propio por hilo (fases de reporte en paralelo)
+        self._thread_local = threading.local()
         self._initialize_connection()
     
     def _initialize_connection(self) -> bool:
@@ -72,8 +76,23 @@ class ConnectionManager:
             print(f"Error cerrando DuckDB: {e}")
     
     def get_connection(self):
-        """Obtiene la conexión actual"""
-        return self.conn
+        """Obtiene la conexión actual (o el cursor asignado al hilo)"""
+        cursor = getattr(self._thread_local, 'cursor', None)
+        conn = cursor if cursor is not None else self.conn
+        
+        # Con un perfil de consultas activo se cuenta cada SQL de la solicitud
+        profile = current_query_profile()
+        if profile is not None and conn is not None:
+            return CountingConnection(conn, profile)
+        return conn
+    
+    def bind_thread_cursor(self, cursor):
+        """Hace que get_connection retorne este cursor en el hilo actual"""
+        self._thread_local.cursor = cursor
+    
+    def unbind_thread_cursor(self):
+        """Vuelve a la conexión compartida en el hilo actual"""
+        self._thread_local.cursor = None
     
     def update_controllers_connection(self, controllers: Dict[str, Any]):
         """Actualiza la referencia de conexión en los controladores"""
@@ -81,7 +100,7 @@ class ConnectionManager:
             return
         
         connection_dependent_controllers = [
-            'file_validation', 'file_conversion', 'query', 'cross_files'
+            'file_validation', 'file_conversion', 'query', 'cross_files', 'dataset_layers'
         ]
         
         for controller_name in connection_dependent_controllers:
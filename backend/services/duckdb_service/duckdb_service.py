@@ -1,6 +1,8 @@
 # services/duckdb_service/duckdb_service.py
 import os
 import shutil
+import threading
+from contextlib import contextmanager
 import pandas as pd
 from typing import Dict, Any, List, Optional
 
@@ -11,6 +13,7 @@ from controllers.duckdb_controller.file_conversion_controller import FileConvers
 from controllers.duckdb_controller.excel_sheets_controller import ExcelSheetsController
 from controllers.duckdb_controller.query_controller import QueryController
 from controllers.duckdb_controller.cross_files_controller import CrossFilesController
+from controllers.duckdb_controller.dataset_layers_controller import DatasetLayersController
 
 # Servicios especializados
 from .connection.connection_manager import ConnectionManager
@@ -131,12 +134,18 @@ class DuckDBService:
         """Inicializa los controladores existentes"""
         conn = self.connection_manager.get_connection()
         
+        dataset_layers = DatasetLayersController(
+            conn, self.loaded_tables, os.path.join(self.parquet_dir, "dataset_layers")
+        )
         controllers = {
             'file_validation': FileValidationController(conn),
             'cache': CacheController(self.parquet_dir, self.metadata_dir),
             'excel_sheets': ExcelSheetsController(),
             'query': QueryController(conn, self.loaded_tables),
-            'cross_files': CrossFilesController(conn, self.loaded_tables),
+            'cross_files': CrossFilesController(
+                conn, self.loaded_tables, os.path.join(self.parquet_dir, "cross_results"), dataset_layers
+            ),
+            'dataset_layers': dataset_layers,
             'loaded_tables': self.loaded_tables
         }
         
@@ -179,6 +188,11 @@ class DuckDBService:
         """Propiedad de compatibilidad"""
         return self.controllers.get('query')
     
+    @property
+    def dataset_layers(self):
+        """Acceso al controlador de capas (vectores de borrado) sobre el Parquet"""
+        return self.controllers.get('dataset_layers')
+    
     @property
     def cross_files(self):
         """Propiedad de compatibilidad"""
@@ -209,12 +223,70 @@ class DuckDBService:
         key_column_file1: str,
         key_column_file2: str,
         join_type: str = "LEFT",
-        columns_to_include: Optional[Dict[str, List[str]]] = None
+        columns_to_include: Optional[Dict[str, List[str]]] = None,
+        key_normalization: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """Delega cruce de archivos ultra-rápido con carga bajo demanda"""
         return self.query_delegation_service.delegate_cross_files_query(
             file1_id, file2_id, key_column_file1, key_column_file2,
-            join_type, columns_to_include, self.loaded_tables, self.file_loader_service
+            join_type, columns_to_include, self.loaded_tables, self.file_loader_service,
+            key_normalization
+        )
+    
+    def stream_cross_files(
+        self,
+        file1_id: str,
+        file2_id: str,
+        key_column_file1: str,
+        key_column_file2: str,
+        columns_to_include: Optional[Dict[str, List[str]]] = None,
+        key_normalization: Optional[List[str]] = None,
+        output_format: str = "csv"
+    ) -> Dict[str, Any]:
+        """Delega cruce en streaming (CSV/Parquet) con carga bajo demanda"""
+        return self.query_delegation_service.delegate_cross_stream_query(
+            file1_id, file2_id, key_column_file1, key_column_file2,
+            columns_to_include, key_normalization, output_format,
+            self.loaded_tables, self.file_loader_service
+        )
+    
+    def suggest_cross_columns(
+        self,
+        file1_id: str,
+        file2_id: str,
+        limit: int = 10,
+        min_score: float = 0.15
+    ) -> Dict[str, Any]:
+        """Delega sugerencias de columnas clave por solapamiento de valores"""
+        return self.query_delegation_service.delegate_cross_suggestions_query(
+            file1_id, file2_id, limit, min_score, self.loaded_tables, self.file_loader_service
+        )
+    
+    def warm_column_sketches(self, file_id: str):
+        """Construye en segundo plano las firmas de columnas de un archivo recién ingerido"""
+        if not self.is_available() or not self.cross_files:
+            return
+        
+        def build_sketches():
+            cursor = self.conn.cursor()
+            try:
+                self.cross_files.get_column_sketches(file_id, cursor)
+            except Exception as e:
+                print(f"No se pudieron construir firmas de columnas para {file_id}: {e}")
+            finally:
+                cursor.close()
+        
+        threading.Thread(target=build_sketches, daemon=True, name=f"sketches-{file_id}").start()
+    
+    def cross_pipeline_ultra_fast(
+        self,
+        base_file_id: str,
+        steps: List[Dict[str, Any]],
+        base_columns: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Delega pipeline de cruces encadenados con claves compuestas"""
+        return self.query_delegation_service.delegate_cross_pipeline_query(
+            base_file_id, steps, base_columns, self.loaded_tables, self.file_loader_service
         )
     
     def get_unique_values_ultra_fast(
@@ -541,6 +613,21 @@ class DuckDBService:
         """Cierra conexión DuckDB de forma segura"""
         self.connection_manager.close()
     
+    def ensure_file_loaded(self, file_id: str) -> bool:
+        """Registra el archivo en DuckDB (carga bajo demanda) si aún no lo está"""
+        if file_id in self.loaded_tables:
+            return True
+        return self.is_available() and self._load_file_on_demand(file_id)
+    
+    @contextmanager
+    def pinned_source(self, file_id: str):
+        """Fuente SQL de la versión actual de un archivo editado, fijada durante el bloque (None si no tiene versiones)"""
+        if not self.dataset_layers:
+            yield None
+            return
+        with self.dataset_layers.pinned_source(file_id) as source:
+            yield source
+    
     # ========== MÉTODO PRIVADO DE CARGA BAJO DEMANDA ==========
     
     def _load_file_on_demand(self, file_id: str) -> bool:
@@ -601,18 +688,21 @@ class DuckDBService:
                 sql_utils = SQLUtils()
                 query_pagination._escape_identifier = lambda name: sql_utils.escape_identifier(name)
             
-            result = query_pagination.query_data_ultra_fast(
-                conn=self.conn,
-                file_id=file_id,
-                filters=filters,
-                search=search,
-                sort_by=sort_by,
-                sort_order=sort_order,
-                page=page,
-                page_size=page_size,
-                selected_columns=selected_columns,
-                loaded_tables=self.loaded_tables
-            )
+            # Conteo y página sobre la misma versión aunque llegue una edición entre ambos
+            with self.pinned_source(file_id) as table_ref:
+                result = query_pagination.query_data_ultra_fast(
+                    conn=self.conn,
+                    file_id=file_id,
+                    filters=filters,
+                    search=search,
+                    sort_by=sort_by,
+                    sort_order=sort_order,
+                    page=page,
+                    page_size=page_size,
+                    selected_columns=selected_columns,
+                    loaded_tables=self.loaded_tables,
+                    table_ref=table_ref
+                )
             
             # Normalizar respuesta: asegurar que 'total' esté en la raíz
             if result.get("success"):
@@ -18,14 +18,111 @@ class QueryDelegationService:
         join_type: str = "LEFT",
         columns_to_include: Optional[Dict[str, List[str]]] = None,
         loaded_tables: Dict[str, Any] = None,
-        file_loader_service=None
+        file_loader_service=None,
+        key_normalization: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """Delega cruce de archivos con carga bajo demanda"""
         if not self.connection_manager.is_available():
             return build_availability_response(False, True)
         
         # Verificar y cargar archivos bajo demanda
-        for file_id in [file1_id, file2_id]:
+        load_error = self._ensure_files_loaded([file1_id, file2_id], loaded_tables, file_loader_service)
+        if load_error:
+            return load_error
+        
+        # Delegación al controlador de cruce
+        cross_files_controller = self.controllers.get('cross_files')
+        if not cross_files_controller:
+            return build_availability_response(False, True)
+        
+        return cross_files_controller.cross_files_ultra_fast(
+            file1_id, file2_id, key_column_file1, key_column_file2, 
+            join_type, columns_to_include, key_normalization
+        )
+    
+    def delegate_cross_stream_query(
+        self,
+        file1_id: str,
+        file2_id: str,
+        key_column_file1: str,
+        key_column_file2: str,
+        columns_to_include: Optional[Dict[str, List[str]]] = None,
+        key_normalization: Optional[List[str]] = None,
+        output_format: str = "csv",
+        loaded_tables: Dict[str, Any] = None,
+        file_loader_service=None
+    ) -> Dict[str, Any]:
+        """Delega cruce en streaming (CSV/Parquet) con carga bajo demanda"""
+        if not self.connection_manager.is_available():
+            return build_availability_response(False, True)
+        
+        load_error = self._ensure_files_loaded([file1_id, file2_id], loaded_tables, file_loader_service)
+        if load_error:
+            return load_error
+        
+        cross_files_controller = self.controllers.get('cross_files')
+        if not cross_files_controller:
+            return build_availability_response(False, True)
+        
+        return cross_files_controller.stream_cross(
+            file1_id, file2_id, key_column_file1, key_column_file2,
+            columns_to_include, key_normalization, output_format
+        )
+    
+    def delegate_cross_suggestions_query(
+        self,
+        file1_id: str,
+        file2_id: str,
+        limit: int = 10,
+        min_score: float = 0.15,
+        loaded_tables: Dict[str, Any] = None,
+        file_loader_service=None
+    ) -> Dict[str, Any]:
+        """Delega sugerencias de columnas clave con carga bajo demanda"""
+        if not self.connection_manager.is_available():
+            return build_availability_response(False, True)
+        
+        load_error = self._ensure_files_loaded([file1_id, file2_id], loaded_tables, file_loader_service)
+        if load_error:
+            return load_error
+        
+        cross_files_controller = self.controllers.get('cross_files')
+        if not cross_files_controller:
+            return build_availability_response(False, True)
+        
+        return cross_files_controller.suggest_key_columns(file1_id, file2_id, limit, min_score)
+    
+    def delegate_cross_pipeline_query(
+        self,
+        base_file_id: str,
+        steps: List[Dict[str, Any]],
+        base_columns: Optional[List[str]] = None,
+        loaded_tables: Dict[str, Any] = None,
+        file_loader_service=None
+    ) -> Dict[str, Any]:
+        """Delega pipeline de cruces encadenados con carga bajo demanda"""
+        if not self.connection_manager.is_available():
+            return build_availability_response(False, True)
+        
+        file_ids = [base_file_id] + [step["file_key"] for step in steps]
+        load_error = self._ensure_files_loaded(file_ids, loaded_tables, file_loader_service)
+        if load_error:
+            return load_error
+        
+        cross_files_controller = self.controllers.get('cross_files')
+        if not cross_files_controller:
+            return build_availability_response(False, True)
+        
+        return cross_files_controller.cross_pipeline(base_file_id, steps, base_columns)
+    
+    def _ensure_files_loaded(
+        self,
+        file_ids: List[str],
+        loaded_tables: Dict[str, Any],
+        file_loader_service
+    ) -> Optional[Dict[str, Any]]:
+        """Carga bajo demanda los archivos faltantes; retorna respuesta de error si alguno falla"""
+        for file_id in dict.fromkeys(file_ids):
             if loaded_tables and file_id not in loaded_tables:
                 print(f"Archivo {file_id} no cargado, intentando carga bajo demanda...")
                 
@@ -44,16 +141,7 @@ class QueryDelegationService:
                             "error": f"Archivo {file_id} no se puede cargar en DuckDB",
                             "requires_fallback": True
                         }
-        
-        # Delegación al controlador de cruce
-        cross_files_controller = self.controllers.get('cross_files')
-        if not cross_files_controller:
-            return build_availability_response(False, True)
-        
-        return cross_files_controller.cross_files_ultra_fast(
-            file1_id, file2_id, key_column_file1, key_column_file2, 
-            join_type, columns_to_include
-        )
+        return None
     
     def delegate_unique_values_query(
         self, 
@@ -176,6 +176,10 @@ class ColumnKeywordReportService:
         if geo_filters:
             print(f"🔍 Filtros temporales COMBINADOS: {' AND '.join(geo_filters)}")
 
+        # Formato dominante por columna (índice de clasificación) + macro de parseo
+        from services.aux_duckdb_services.date_macros import date_macros
+        from services.technical_note_services.column_classification_service import column_classification_service
+
         union_parts = []
         
         for match in matches:
@@ -185,19 +189,15 @@ class ColumnKeywordReportService:
             keyword_safe = match["keyword"].replace("'", "''")
             age_range_safe = match["age_range"].replace("'", "''")
             
+            date_format = column_classification_service.get_date_format(data_source, match["column"])
+            fecha_expr = date_macros.parse_sql(col_escaped, date_format)
+            
             # CONSTRUIR WHERE COMPLETA CON TODOS LOS FILTROS
             where_conditions = [
                 f"{col_escaped} IS NOT NULL",
                 f"TRIM(CAST({col_escaped} AS VARCHAR)) <> ''",
                 f"TRIM(CAST({col_escaped} AS VARCHAR)) NOT IN ('NULL', 'null', 'None', 'none', 'NaN', 'nan')",
-                f"""(
-                    TRY_CAST({col_escaped} AS DATE) IS NOT NULL OR
-                    try_strptime({col_escaped}, '%d/%m/%Y') IS NOT NULL OR
-                    try_strptime({col_escaped}, '%Y-%m-%d') IS NOT NULL OR
-                    try_strptime({col_escaped}, '%m/%d/%Y') IS NOT NULL OR
-                    try_strptime({col_escaped}, '%d-%m-%Y') IS NOT NULL OR
-                    try_strptime(SUBSTR(CAST({col_escaped} AS VARCHAR), 1, 10), '%Y-%m-%d') IS NOT NULL
-                )"""
+                f"{fecha_expr} IS NOT NULL"
             ]
             
             # AGREGAR TODOS LOS FILTROS GEOGRÁFICOS
@@ -210,59 +210,12 @@ class ColumnKeywordReportService:
                 '{column_safe}' AS column_name,
                 '{keyword_safe}' AS keyword, 
                 '{age_range_safe}' AS age_range,
-                COALESCE(
-                    YEAR(TRY_CAST({col_escaped} AS DATE)),
-                    YEAR(try_strptime({col_escaped}, '%d/%m/%Y')),
-                    YEAR(try_strptime({col_escaped}, '%Y-%m-%d')),
-                    YEAR(try_strptime({col_escaped}, '%m/%d/%Y')),
-                    YEAR(try_strptime({col_escaped}, '%d-%m-%Y')),
-                    YEAR(try_strptime(SUBSTR(CAST({col_escaped} AS VARCHAR), 1, 10), '%Y-%m-%d'))
-                ) AS year,
-                COALESCE(
-                    MONTH(TRY_CAST({col_escaped} AS DATE)),
-                    MONTH(try_strptime({col_escaped}, '%d/%m/%Y')),
-                    MONTH(try_strptime({col_escaped}, '%Y-%m-%d')),
-                    MONTH(try_strptime({col_escaped}, '%m/%d/%Y')),
-                    MONTH(try_strptime({col_escaped}, '%d-%m-%Y')),
-                    MONTH(try_strptime(SUBSTR(CAST({col_escaped} AS VARCHAR), 1, 10), '%Y-%m-%d'))
-                ) AS month,
+                YEAR({fecha_expr}) AS year,
+                MONTH({fecha_expr}) AS month,
                 COUNT(*) AS count
             FROM {data_source}
             {where_clause}
-            GROUP BY 
-                COALESCE(
-                    YEAR(TRY_CAST({col_escaped} AS DATE)),
-                    YEAR(try_strptime({col_escaped}, '%d/%m/%Y')),
-                    YEAR(try_strptime({col_escaped}, '%Y-%m-%d')),
-                    YEAR(try_strptime({col_escaped}, '%m/%d/%Y')),
-                    YEAR(try_strptime({col_escaped}, '%d-%m-%Y')),
-                    YEAR(try_strptime(SUBSTR(CAST({col_escaped} AS VARCHAR), 1, 10), '%Y-%m-%d'))
-                ),
-                COALESCE(
-                    MONTH(TRY_CAST({col_escaped} AS DATE)),
-                    MONTH(try_strptime({col_escaped}, '%d/%m/%Y')),
-                    MONTH(try_strptime({col_escaped}, '%Y-%m-%d')),
-                    MONTH(try_strptime({col_escaped}, '%m/%d/%Y')),
-                    MONTH(try_strptime({col_escaped}, '%d-%m-%Y')),
-                    MONTH(try_strptime(SUBSTR(CAST({col_escaped} AS VARCHAR), 1, 10), '%Y-%m-%d'))
-                )
-            HAVING 
-                COALESCE(
-                    YEAR(TRY_CAST({col_escaped} AS DATE)),
-                    YEAR(try_strptime({col_escaped}, '%d/%m/%Y')),
-                    YEAR(try_strptime({col_escaped}, '%Y-%m-%d')),
-                    YEAR(try_strptime({col_escaped}, '%m/%d/%Y')),
-                    YEAR(try_strptime({col_escaped}, '%d-%m-%Y')),
-                    YEAR(try_strptime(SUBSTR(CAST({col_escaped} AS VARCHAR), 1, 10), '%Y-%m-%d'))
-                ) IS NOT NULL
-                AND COALESCE(
-                    MONTH(TRY_CAST({col_escaped} AS DATE)),
-                    MONTH(try_strptime({col_escaped}, '%d/%m/%Y')),
-                    MONTH(try_strptime({col_escaped}, '%Y-%m-%d')),
-                    MONTH(try_strptime({col_escaped}, '%m/%d/%Y')),
-                    MONTH(try_strptime({col_escaped}, '%d-%m-%Y')),
-                    MONTH(try_strptime(SUBSTR(CAST({col_escaped} AS VARCHAR), 1, 10), '%Y-%m-%d'))
-                ) IS NOT NULL
+            GROUP BY YEAR({fecha_expr}), MONTH({fecha_expr})
             """
             
             union_parts.append(temporal_part)
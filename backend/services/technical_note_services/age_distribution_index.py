@@ -0,0 +1,182 @@
+# services/technical_note_services/age_distribution_index.py
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from services.duckdb_service.duckdb_service import duckdb_service
+
+
+class AgeDistributionIndex:
+    """
+    Histogramas de edad de un archivo: fechas de nacimiento (DD/MM/YYYY) y
+    edad declarada en años, con conteo de filas. Se construye con una sola
+    consulta por versión de archivo; las edades en meses de cada fecha de
+    corte se derivan del histograma de nacimientos sin volver a escanear.
+    """
+
+    BIRTH_COLUMN = "Fecha Nacimiento"
+    AGE_COLUMN = "edad"
+    BIRTH_FORMAT = "%d/%m/%Y"
+
+    def __init__(self, data_source: str):
+        self.data_source = data_source
+        self.total_rows = 0
+        self.rows_with_birth_date = 0
+        self.rows_with_age = 0
+        self.min_age_years: Optional[int] = None
+        self.max_age_years: Optional[int] = None
+        self.built_at: Optional[float] = None
+        self.build_time_seconds = 0.0
+
+        # Histogramas: fecha de nacimiento -> filas, edad en años -> filas
+        self._births: List[Tuple[date, int]] = []
+        self._ages_years: Dict[int, int] = {}
+
+        # Resultados ya derivados por fecha de corte
+        self._by_cutoff: Dict[str, Dict[str, Any]] = {}
+
+    # ========== CONSTRUCCIÓN ==========
+
+    def build(self) -> 'AgeDistributionIndex':
+        """Construye ambos histogramas y los totales con una única agregación"""
+        start_time = time.time()
+        birth = duckdb_service.escape_identifier(self.BIRTH_COLUMN)
+        age = duckdb_service.escape_identifier(self.AGE_COLUMN)
+
+        sql = f"""
+        WITH base AS (
+            SELECT
+                CASE WHEN {birth} IS NOT NULL AND LENGTH(TRIM(CAST({birth} AS VARCHAR))) >= 10
+                     THEN CAST(try_strptime(CAST({birth} AS VARCHAR), '{self.BIRTH_FORMAT}') AS DATE)
+                END AS nacimiento,
+                CASE WHEN {age} IS NOT NULL AND TRIM(CAST({age} AS VARCHAR)) != ''
+                     THEN TRY_CAST({age} AS INTEGER)
+                END AS edad_años
+            FROM {self.data_source}
+        )
+        SELECT GROUPING(nacimiento) AS sin_nacimiento, GROUPING(edad_años) AS sin_edad,
+               nacimiento, edad_años, COUNT(*) AS filas
+        FROM base
+        GROUP BY GROUPING SETS ((nacimiento), (edad_años), ())
+        """
+
+        print(f"🎂 Construyendo histograma de edades: {self.data_source}")
+        rows = duckdb_service.conn.execute(sql).fetchall()
+
+        births: Dict[date, int] = {}
+        for sin_nacimiento, sin_edad, nacimiento, edad_anios, filas in rows:
+            filas = int(filas)
+            if sin_nacimiento and sin_edad:
+                self.total_rows = filas
+            elif not sin_nacimiento:
+                if nacimiento is not None:
+                    births[nacimiento] = filas
+            elif edad_anios is not None:
+                self._ages_years[int(edad_anios)] = filas
+
+        self._births = sorted(births.items())
+        self.rows_with_birth_date = sum(births.values())
+        self.rows_with_age = sum(self._ages_years.values())
+        if self._ages_years:
+            self.min_age_years = min(self._ages_years)
+            self.max_age_years = max(self._ages_years)
+
+        self.built_at = time.time()
+        self.build_time_seconds = round(self.built_at - start_time, 3)
+        print(
+            f"✓ Histograma de edades listo: {len(self._births)} fechas de nacimiento, "
+            f"{len(self._ages_years)} edades en años en {self.build_time_seconds}s"
+        )
+        return self
+
+    # ========== CONSULTAS ==========
+
+    @staticmethod
+    def _months_between(birth: date, cutoff: date) -> int:
+        """Igual que date_diff('month') de DuckDB: límites de mes cruzados"""
+        return (cutoff.year - birth.year) * 12 + (cutoff.month - birth.month)
+
+    def get_age_ranges(self, corte_fecha: str) -> Dict[str, Any]:
+        """Edades únicas (años y meses), histogramas y estadísticas para una fecha de corte"""
+        cached = self._by_cutoff.get(corte_fecha)
+        if cached is not None:
+            return cached
+
+        cutoff = datetime.strptime(corte_fecha, "%Y-%m-%d").date()
+
+        months_histogram: Dict[int, int] = {}
+        for birth, filas in self._births:
+            if birth > cutoff:
+                break
+            months = self._months_between(birth, cutoff)
+            months_histogram[months] = months_histogram.get(months, 0) + filas
+
+        years_histogram = {age: filas for age, filas in self._ages_years.items() if age >= 0}
+        unique_months = sorted(months_histogram)
+        unique_years = sorted(years_histogram)
+
+        result = {
+            "age_ranges": {
+                "years": unique_years,
+                "months": unique_months
+            },
+            "histograms": {
+                "years": [{"age": age, "count": years_histogram[age]} for age in unique_years],
+                "months": [{"age": age, "count": months_histogram[age]} for age in unique_months]
+            },
+            "statistics": {
+                "total_registros": self.total_rows,
+                "registros_con_fecha_nacimiento": self.rows_with_birth_date,
+                "registros_con_edad": self.rows_with_age,
+                "rango_años": {
+                    "min": self.min_age_years if self.min_age_years is not None else 0,
+                    "max": self.max_age_years if self.max_age_years is not None else 0
+                },
+                "rango_meses": {
+                    "min": unique_months[0] if unique_months else 0,
+                    "max": unique_months[-1] if unique_months else 0
+                }
+            }
+        }
+        self._by_cutoff[corte_fecha] = result
+        return result
+
+
+class AgeDistributionCache:
+    """Cache de histogramas de edad por versión de archivo (data_source)"""
+
+    def __init__(self):
+        self._indexes: Dict[str, AgeDistributionIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, data_source: str) -> Tuple[AgeDistributionIndex, bool]:
+        """Retorna (índice, desde_cache); construye el índice si no existe"""
+        index = self._indexes.get(data_source)
+        if index is not None:
+            return index, True
+
+        with self._lock:
+            index = self._indexes.get(data_source)
+            if index is not None:
+                return index, True
+            index = AgeDistributionIndex(data_source).build()
+            self._indexes[data_source] = index
+            return index, False
+
+    def has(self, data_source: str) -> bool:
+        return data_source in self._indexes
+
+    def invalidate(self, data_source: Optional[str] = None) -> int:
+        """Elimina un índice o todos si no se especifica fuente"""
+        with self._lock:
+            if data_source is None:
+                count = len(self._indexes)
+                self._indexes.clear()
+                return count
+            return 1 if self._indexes.pop(data_source, None) is not None else 0
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+
+age_distribution_cache = AgeDistributionCache()
@@ -0,0 +1,328 @@
+# services/technical_note_services/batch_report_service.py
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# IMPORTANTE: este módulo no importa duckdb_service a nivel de módulo. Cada
+# proceso del pool lo inicializa en su propio directorio de trabajo, porque el
+# servicio limpia sus carpetas de cache al arrancar y bloquea main.duckdb.
+
+SUPPORTED_EXTENSIONS = {'.csv', '.xlsx', '.xls'}
+ALL_DEPARTAMENTOS = '*'
+TOTAL_GEOGRAPHY = 'TODOS'
+
+
+def _slug(value: str) -> str:
+    """Texto seguro para nombres de archivo (sin tildes ni espacios)"""
+    ascii_value = ''.join(
+        c for c in unicodedata.normalize('NFD', value)
+        if unicodedata.category(c) != 'Mn'
+    )
+    return re.sub(r'[^A-Za-z0-9]+', '_', ascii_value).strip('_') or 'sin_nombre'
+
+
+# ========== PROCESO TRABAJADOR ==========
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(work_root: str, memory_limit: Optional[str], phase_workers: int):
+    """Inicializa DuckDB del proceso en un directorio propio y redirige la salida a un log"""
+    worker_dir = os.path.join(work_root, f"worker_{os.getpid()}")
+    os.makedirs(worker_dir, exist_ok=True)
+
+    log_file = open(os.path.join(worker_dir, "worker.log"), "a", encoding="utf-8", buffering=1)
+    sys.stdout = log_file
+    sys.stderr = log_file
+
+    os.environ["REPORT_MAX_PARALLEL_PHASES"] = str(phase_workers)
+
+    original_cwd = os.getcwd()
+    os.chdir(worker_dir)
+    try:
+        from services.duckdb_service.duckdb_service import duckdb_service
+    finally:
+        os.chdir(original_cwd)
+
+    if memory_limit:
+        duckdb_service.conn.execute(f"SET memory_limit='{memory_limit}'")
+
+    _worker_state["worker_dir"] = worker_dir
+
+
+def _load_data_source(file_path: str) -> str:
+    """Convierte el archivo a Parquet (cache del proceso) y retorna la fuente de datos"""
+    from services.duckdb_service.duckdb_service import duckdb_service
+
+    filename = os.path.basename(file_path)
+    _, ext = os.path.splitext(filename)
+    conversion = duckdb_service.convert_file_to_parquet(
+        file_path=file_path,
+        file_id=f"batch_{_slug(filename)}",
+        original_name=filename,
+        ext=ext.replace('.', '')
+    )
+    if not conversion.get("success"):
+        raise ValueError(conversion.get("error", f"No se pudo convertir {filename}"))
+
+    return f"read_parquet('{conversion['parquet_path']}')"
+
+
+def _resolve_geographies(data_source: str, departamentos: List[str], include_total: bool) -> List[Optional[str]]:
+    """Lista de departamentos a reportar; None representa el archivo completo"""
+    geographies: List[Optional[str]] = [None] if include_total else []
+
+    if ALL_DEPARTAMENTOS in departamentos:
+        from services.technical_note_services.geographic_hierarchy_index import GeographicHierarchyCache
+        index, _ = GeographicHierarchyCache().get(data_source)
+        geographies.extend(index.get_children('departamento')[0])
+    else:
+        geographies.extend(departamentos)
+
+    return geographies
+
+
+def _write_outputs(report: Dict[str, Any], output_dir: str, base_name: str,
+                   formats: List[str], exporter) -> List[str]:
+    """Escribe CSV/PDF (ReportExporter) y JSON opcional; retorna las rutas escritas"""
+    written = []
+
+    if 'csv' in formats or 'pdf' in formats:
+        export_result = exporter.export_report(
+            report_data=report,
+            base_filename=base_name,
+            export_csv='csv' in formats,
+            export_pdf='pdf' in formats,
+            include_temporal=True
+        )
+        if not export_result.get('success'):
+            raise ValueError(export_result.get('message', 'Error exportando reporte'))
+
+        for temp_id in export_result['files'].values():
+            path = exporter.temp_store.export_to(temp_id, output_dir)
+            if path:
+                written.append(path)
+
+    if 'json' in formats:
+        path = os.path.join(output_dir, f"{base_name}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        written.append(path)
+
+    return written
+
+
+def run_file_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Genera todos los reportes (cortes × geografías) de un archivo dentro de un proceso del pool"""
+    from services.technical_note_services.report_service import ReportService
+    from services.technical_note_services.report_service_aux.report_exporter import ReportExporter
+
+    file_path = job['file_path']
+    filename = os.path.basename(file_path)
+    file_stem = _slug(os.path.splitext(filename)[0])
+    summary = {"file": filename, "completed": 0, "skipped": 0, "failed": 0, "errors": []}
+
+    try:
+        data_source = _load_data_source(file_path)
+        geographies = _resolve_geographies(data_source, job['departamentos'], job['include_total'])
+    except Exception as e:
+        summary["failed"] = len(job['cortes'])
+        summary["errors"].append(f"{filename}: {e}")
+        return summary
+
+    report_service = ReportService()
+    exporter = ReportExporter()
+
+    for corte_fecha in job['cortes']:
+        output_dir = os.path.join(job['output_dir'], file_stem, corte_fecha)
+        os.makedirs(output_dir, exist_ok=True)
+
+        for departamento in geographies:
+            geo_label = _slug(departamento) if departamento else TOTAL_GEOGRAPHY
+            base_name = f"{file_stem}_{corte_fecha}_{geo_label}"
+            manifest_path = os.path.join(output_dir, f"{base_name}.done.json")
+
+            # Reanudación: la tarea ya terminó en una ejecución anterior
+            if job['resume'] and os.path.exists(manifest_path):
+                summary["skipped"] += 1
+                continue
+
+            start_time = time.time()
+            try:
+                report = report_service.generate_keyword_age_report(
+                    data_source=data_source,
+                    filename=filename,
+                    keywords=job['keywords'],
+                    min_count=job['min_count'],
+                    include_temporal=True,
+                    geographic_filters={'departamento': departamento, 'municipio': None, 'ips': None},
+                    corte_fecha=corte_fecha
+                )
+                written = _write_outputs(report, output_dir, base_name, job['formats'], exporter)
+
+                manifest = {
+                    "file": filename,
+                    "corte_fecha": corte_fecha,
+                    "departamento": departamento,
+                    "items": len(report.get('items', [])),
+                    "outputs": [os.path.basename(path) for path in written],
+                    "elapsed_seconds": round(time.time() - start_time, 2),
+                    "completed_at": datetime.now().isoformat()
+                }
+                # Escritura atómica: el manifiesto solo existe si la tarea terminó
+                tmp_path = f"{manifest_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, manifest_path)
+
+                summary["completed"] += 1
+            except Exception as e:
+                summary["failed"] += 1
+                summary["errors"].append(f"{filename} {corte_fecha} {geo_label}: {e}")
+
+    return summary
+
+
+# ========== ORQUESTADOR ==========
+
+class BatchReportRunner:
+    """
+    Ejecuta reportes de nota técnica para muchos archivos sin intervención:
+    un proceso por archivo (hasta `workers`), cada uno con su propia
+    conexión DuckDB. El progreso queda en manifiestos .done.json por tarea,
+    así una ejecución interrumpida se reanuda donde quedó.
+    """
+
+    def __init__(
+        self,
+        input_dir: str,
+        output_dir: str,
+        cortes: List[str],
+        departamentos: Optional[List[str]] = None,
+        include_total: bool = True,
+        keywords: Optional[List[str]] = None,
+        min_count: int = 0,
+        formats: Optional[List[str]] = None,
+        workers: Optional[int] = None,
+        phase_workers: int = 1,
+        memory_limit: Optional[str] = None,
+        resume: bool = True
+    ):
+        self.input_dir = os.path.abspath(input_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.cortes = self._validate_cortes(cortes)
+        self.departamentos = departamentos or []
+        self.include_total = include_total
+        self.keywords = keywords
+        self.min_count = min_count
+        self.formats = formats or ['csv', 'pdf']
+        self.workers = workers or os.cpu_count() or 1
+        self.phase_workers = phase_workers
+        self.memory_limit = memory_limit
+        self.resume = resume
+
+    def _validate_cortes(self, cortes: List[str]) -> List[str]:
+        """Valida fechas de corte YYYY-MM-DD"""
+        validated = []
+        for corte in cortes:
+            try:
+                validated.append(datetime.strptime(corte.strip(), '%Y-%m-%d').strftime('%Y-%m-%d'))
+            except ValueError:
+                raise ValueError(f"Fecha de corte inválida: {corte}. Use YYYY-MM-DD")
+        if not validated:
+            raise ValueError("Debe indicar al menos una fecha de corte")
+        return sorted(set(validated))
+
+    def discover_files(self) -> List[str]:
+        """Archivos de nota técnica soportados en el directorio de entrada"""
+        if not os.path.isdir(self.input_dir):
+            raise ValueError(f"Directorio de entrada no existe: {self.input_dir}")
+
+        return sorted(
+            os.path.join(self.input_dir, name)
+            for name in os.listdir(self.input_dir)
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+        )
+
+    def _build_jobs(self, files: List[str]) -> List[Dict[str, Any]]:
+        return [{
+            "file_path": file_path,
+            "output_dir": self.output_dir,
+            "cortes": self.cortes,
+            "departamentos": self.departamentos,
+            "include_total": self.include_total,
+            "keywords": self.keywords,
+            "min_count": self.min_count,
+            "formats": self.formats,
+            "resume": self.resume
+        } for file_path in files]
+
+    def run(self) -> Dict[str, Any]:
+        """Ejecuta el lote completo y guarda batch_summary.json en la salida"""
+        files = self.discover_files()
+        if not files:
+            raise ValueError(f"No hay archivos {sorted(SUPPORTED_EXTENSIONS)} en {self.input_dir}")
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        work_root = os.path.join(self.output_dir, ".trabajo")
+        workers = min(self.workers, len(files))
+        start_time = time.time()
+
+        print(f"📦 Lote: {len(files)} archivos × {len(self.cortes)} cortes con {workers} procesos")
+
+        results = []
+        # spawn: cada proceso arranca limpio, sin heredar conexiones DuckDB
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(work_root, self.memory_limit, self.phase_workers)
+        ) as pool:
+            futures = {pool.submit(run_file_job, job): job['file_path'] for job in self._build_jobs(files)}
+            for position, future in enumerate(as_completed(futures), 1):
+                file_path = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    summary = {"file": os.path.basename(file_path), "completed": 0,
+                               "skipped": 0, "failed": 1, "errors": [str(e)]}
+                results.append(summary)
+                status = "✓" if summary["failed"] == 0 else "⚠️"
+                print(
+                    f"{status} [{position}/{len(files)}] {summary['file']}: "
+                    f"{summary['completed']} generados, {summary['skipped']} ya existentes, "
+                    f"{summary['failed']} con error"
+                )
+
+        batch_summary = {
+            "success": all(result["failed"] == 0 for result in results),
+            "input_dir": self.input_dir,
+            "output_dir": self.output_dir,
+            "cortes": self.cortes,
+            "departamentos": self.departamentos,
+            "formats": self.formats,
+            "files": sorted(results, key=lambda r: r["file"]),
+            "completed": sum(r["completed"] for r in results),
+            "skipped": sum(r["skipped"] for r in results),
+            "failed": sum(r["failed"] for r in results),
+            "elapsed_seconds": round(time.time() - start_time, 2),
+            "finished_at": datetime.now().isoformat()
+        }
+
+        with open(os.path.join(self.output_dir, "batch_summary.json"), 'w', encoding='utf-8') as f:
+            json.dump(batch_summary, f, ensure_ascii=False, indent=2)
+
+        print(
+            f"🏁 Lote terminado en {batch_summary['elapsed_seconds']}s: "
+            f"{batch_summary['completed']} generados, {batch_summary['skipped']} reanudados, "
+            f"{batch_summary['failed']} con error"
+        )
+        return batch_summary
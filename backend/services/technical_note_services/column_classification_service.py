@@ -0,0 +1,254 @@
+# services/technical_note_services/column_classification_service.py
+import os
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional
+from services.duckdb_service.duckdb_service import duckdb_service
+from services.aux_duckdb_services.date_macros import DATE_FORMATS
+from services.keyword_age_report import ColumnKeywordReportService
+from utils.keywords_NT import KeywordRule
+from controllers.technical_note_controller.age_range_extractor import AgeRange, AgeRangeExtractor
+from controllers.technical_note_controller.absent_user.activity_column import ActivityColumn
+
+
+def normalize_keyword(text: str) -> str:
+    """Normaliza texto removiendo tildes y convirtiendo a minúsculas ('ica' → 'ia')"""
+    normalized = ''.join(
+        c for c in unicodedata.normalize('NFD', text)
+        if unicodedata.category(c) != 'Mn'
+    ).lower().strip()
+    return normalized[:-3] + 'ia' if normalized.endswith('ica') else normalized
+
+
+class ColumnClassificationService:
+    """
+    Índice de clasificación de columnas por archivo: regla de palabra clave,
+    rango de edad extraído, bandera de actividad y formato de fecha dominante.
+    Se calcula una vez (al cargar el archivo) y se guarda en la metadata del
+    cache, así la preparación de reportes es una búsqueda en diccionario.
+    """
+
+    VERSION = 2
+
+    # Filas leídas para perfilar el formato de fecha dominante de cada columna
+    DATE_PROFILE_ROWS = 100000
+
+    INVALID_VALUES = "('NULL', 'null', 'None', 'none', 'NaN', 'nan', 'N/A', 'n/a', '-')"
+
+    def __init__(self):
+        self.keyword_service = ColumnKeywordReportService()
+        self.age_extractor = AgeRangeExtractor()
+        self.activity_column = ActivityColumn()
+        self._indexes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    # ========== CLASIFICACIÓN ==========
+
+    def classify_column(self, column: str) -> Dict[str, Any]:
+        """Clasifica una columna solo a partir de su nombre"""
+        col_lower = column.lower()
+
+        keyword = None
+        for rule in self.keyword_service.keywords:
+            if any(synonym in col_lower for synonym in rule.synonyms):
+                keyword = rule.name
+                break
+
+        age_range = self.age_extractor.extract_age_range(column)
+
+        try:
+            is_activity = self.activity_column.is_activity_column(column)
+        except Exception:
+            is_activity = True
+
+        return {
+            "lower": col_lower,
+            "normalized": normalize_keyword(column),
+            "keyword": keyword,
+            "keyword_age_label": self.keyword_service._extract_age_range(column),
+            "age_range": {
+                "min_age": age_range.min_age,
+                "max_age": age_range.max_age,
+                "unit": age_range.unit
+            } if age_range else None,
+            "is_activity": is_activity
+        }
+
+    def _profile_date_formats(self, conn, data_source: str, columns: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Cuenta cuántos valores parsea cada formato, para todas las columnas en una consulta"""
+        if not columns:
+            return {}
+
+        escape = duckdb_service.escape_identifier
+        select_parts = []
+        for idx, column in enumerate(columns):
+            value = f"TRIM(CAST({escape(column)} AS VARCHAR))"
+            select_parts.append(
+                f"COUNT(*) FILTER (WHERE {value} != '' AND {value} NOT IN {self.INVALID_VALUES}) AS total_{idx}"
+            )
+            for fmt_idx, date_format in enumerate(DATE_FORMATS):
+                select_parts.append(
+                    f"COUNT(try_strptime({value}, '{date_format}')) AS f{fmt_idx}_{idx}"
+                )
+
+        projected = ", ".join(escape(column) for column in columns)
+        profile_sql = f"""
+        SELECT {", ".join(select_parts)}
+        FROM (SELECT {projected} FROM {data_source} LIMIT {self.DATE_PROFILE_ROWS})
+        """
+
+        row = conn.execute(profile_sql).fetchone()
+        width = 1 + len(DATE_FORMATS)
+
+        profiles = {}
+        for idx, column in enumerate(columns):
+            total = int(row[idx * width] or 0)
+            counts = [int(count or 0) for count in row[idx * width + 1:(idx + 1) * width]]
+            best = max(range(len(DATE_FORMATS)), key=lambda i: (counts[i], -i))
+            profiles[column] = {
+                "date_format": DATE_FORMATS[best] if counts[best] > 0 else None,
+                "date_format_ratio": round(counts[best] / total, 4) if total > 0 else 0.0
+            }
+        return profiles
+
+    def build_index(self, conn, data_source: str, columns: List[str]) -> Dict[str, Any]:
+        """Clasifica todas las columnas y perfila el formato de fecha de las candidatas"""
+        classified = {column: self.classify_column(column) for column in columns}
+
+        # Solo columnas de actividad o con palabra clave pueden traer fechas de atención
+        candidates = [
+            column for column, info in classified.items()
+            if info["is_activity"] or info["keyword"]
+        ]
+        try:
+            for column, profile in self._profile_date_formats(conn, data_source, candidates).items():
+                classified[column].update(profile)
+        except Exception as e:
+            print(f"⚠️ No se pudo perfilar formatos de fecha: {e}")
+
+        print(
+            f"🏷️ Clasificación de columnas: {len(columns)} columnas, "
+            f"{sum(1 for info in classified.values() if info['keyword'])} con palabra clave, "
+            f"{sum(1 for info in classified.values() if info['is_activity'])} de actividad"
+        )
+
+        return {"version": self.VERSION, "columns": classified}
+
+    # ========== ÍNDICE POR ARCHIVO ==========
+
+    def _extract_file_id(self, data_source: str) -> Optional[str]:
+        """El nombre del Parquet en cache es el hash del contenido"""
+        if data_source.startswith("read_parquet('") and data_source.endswith("')"):
+            return os.path.splitext(os.path.basename(data_source[14:-2]))[0]
+        return None
+
+    def _get_cache_controller(self):
+        return getattr(duckdb_service, 'controllers', {}).get('cache')
+
+    def get_index(self, data_source: str) -> Optional[Dict[str, Any]]:
+        """Índice del archivo: memoria → metadata del cache → cálculo y persistencia"""
+        index = self._indexes.get(data_source)
+        if index is not None:
+            return index
+
+        with self._lock:
+            index = self._indexes.get(data_source)
+            if index is not None:
+                return index
+
+            file_id = self._extract_file_id(data_source)
+            cache = self._get_cache_controller()
+            metadata = cache.file_cache.get(file_id) if cache and file_id else None
+
+            stored = (metadata or {}).get("column_classification")
+            if stored and stored.get("version") == self.VERSION:
+                index = stored
+            else:
+                try:
+                    columns_result = duckdb_service.conn.execute(
+                        f"DESCRIBE SELECT * FROM {data_source}"
+                    ).fetchall()
+                    columns = [str(row[0]) for row in columns_result]
+                    index = self.build_index(duckdb_service.conn, data_source, columns)
+                except Exception as e:
+                    print(f"❌ Error clasificando columnas: {e}")
+                    return None
+
+                if metadata is not None:
+                    cache.update_cache_metadata(file_id, {"column_classification": index})
+
+            self._indexes[data_source] = index
+            return index
+
+    def invalidate(self, data_source: Optional[str] = None) -> int:
+        """Elimina un índice en memoria o todos si no se especifica fuente"""
+        with self._lock:
+            if data_source is None:
+                count = len(self._indexes)
+                self._indexes.clear()
+                return count
+            return 1 if self._indexes.pop(data_source, None) is not None else 0
+
+    # ========== CONSULTAS SOBRE EL ÍNDICE ==========
+
+    def get_columns(self, index: Dict[str, Any]) -> List[str]:
+        return list(index["columns"].keys())
+
+    def match_columns(self, index: Dict[str, Any], keywords: Optional[List[str]] = None) -> List[Dict]:
+        """Equivalente a ColumnKeywordReportService.match_columns sin recorrer regex"""
+        matches = []
+
+        if not keywords:
+            for column, info in index["columns"].items():
+                if info["keyword"]:
+                    matches.append({
+                        "column": column,
+                        "keyword": info["keyword"],
+                        "age_range": info["keyword_age_label"]
+                    })
+            return matches
+
+        rules = [KeywordRule(name=k, synonyms=(k.lower(),)) for k in keywords]
+        for column, info in index["columns"].items():
+            for rule in rules:
+                if any(synonym in info["lower"] for synonym in rule.synonyms):
+                    matches.append({
+                        "column": column,
+                        "keyword": rule.name,
+                        "age_range": info["keyword_age_label"]
+                    })
+                    break
+
+        return matches
+
+    def find_activity_columns(self, index: Dict[str, Any], keyword: str) -> List[str]:
+        """Columnas de actividad (entre comillas) cuyo nombre normalizado contiene la keyword"""
+        normalized_keyword = normalize_keyword(keyword)
+        return [
+            f'"{column}"' for column, info in index["columns"].items()
+            if normalized_keyword in info["normalized"] and info["is_activity"]
+        ]
+
+    def get_date_format(self, data_source: str, column: str, default: Optional[str] = None) -> Optional[str]:
+        """Formato dominante; default si se perfiló sin coincidencias, None si no se perfiló"""
+        index = self.get_index(data_source)
+        info = index["columns"].get(column) if index else None
+        if not info or "date_format" not in info:
+            return None
+        return info["date_format"] or default
+
+    def seed_age_extractor(self, index: Dict[str, Any], age_extractor, columns: List[str]):
+        """Precarga los rangos de edad del índice en el extractor del reporte"""
+        for column in columns:
+            info = index["columns"].get(column)
+            if info is None:
+                continue
+            age_range = info["age_range"]
+            age_extractor.seed(
+                column,
+                AgeRange(age_range["min_age"], age_range["max_age"], age_range["unit"], column)
+                if age_range else None
+            )
+
+
+column_classification_service = ColumnClassificationService()
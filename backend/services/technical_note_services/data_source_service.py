@@ -1,7 +1,9 @@
 # services/technical_note_services/data_source_service.py
 import os
+from contextlib import contextmanager
 from typing import Optional
 from services.duckdb_service.duckdb_service import duckdb_service
+from services.aux_duckdb_services.query_profile import is_debug_profile
 from services.aux_duckdb_services.query_pagination import QueryPagination
 from utils.technical_note_utils.file_utils import find_csv_file
 
@@ -19,6 +21,12 @@ class DataSourceService:
         try:
             print(f"🔍 Verificando fuente de datos para: {filename}")
             
+            # Archivo subido con ediciones: las capas viven bajo su file_id (el nombre original)
+            owner_info = duckdb_service.loaded_tables.get(filename, {})
+            if owner_info.get('type') == 'view':
+                print(f"Usando vista versionada: {owner_info['table_name']}")
+                return owner_info['table_name']
+            
             # Usar método existente: ensure_parquet_exists_or_regenerate
             if self.query_pagination.ensure_parquet_exists_or_regenerate(
                 file_key, duckdb_service.loaded_tables
@@ -44,6 +52,20 @@ class DataSourceService:
             print(f"anioError asegurando fuente de datos: {e}")
             raise ValueError(f"No se pudo obtener fuente de datos para {filename}: {e}")
     
+    @contextmanager
+    def pinned(self, filename: str, data_source: str):
+        """
+        Fija la versión de la fuente mientras dura un reporte de varias consultas:
+        una edición concurrente crea otra versión y no cambia lo que el reporte lee.
+        Las versiones pertenecen al archivo subido (file_id = nombre original)
+        """
+        layers = duckdb_service.dataset_layers
+        if not layers:
+            yield data_source
+            return
+        with layers.pinned_source(filename, data_source) as source:
+            yield source
+    
     def _convert_from_csv(self, filename: str, file_key: str) -> str:
         """Convierte CSV a formato DuckDB usando métodos existentes"""
         csv_path = self._find_csv_file(filename)
@@ -80,6 +102,11 @@ class DataSourceService:
     def verify_data_source_readable(self, data_source: str) -> bool:
         """Verifica que la fuente de datos sea legible"""
         try:
+            if not is_debug_profile():
+                # Producción: basta con leer una fila, sin contar todo el archivo
+                duckdb_service.conn.execute(f"SELECT 1 FROM {data_source} LIMIT 1").fetchall()
+                return True
+            
             test_query = f"SELECT COUNT(*) FROM {data_source}"
             result = duckdb_service.conn.execute(test_query).fetchone()
             print(f"Archivo legible: {result[0]} filas totales")
@@ -0,0 +1,220 @@
+# services/technical_note_services/geographic_hierarchy_index.py
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from services.duckdb_service.duckdb_service import duckdb_service
+from services.keyword_age_report import ColumnKeywordReportService
+
+
+class GeographicHierarchyIndex:
+    """
+    Índice en memoria del árbol Departamento → Municipio → IPS con conteo de filas.
+    Se construye con una sola consulta GROUP BY por versión de archivo (la ruta
+    Parquet incluye el hash del contenido) y luego responde sin tocar DuckDB.
+    """
+
+    INVALID_VALUES = {'NULL', 'null', 'None', 'none', 'NaN', 'nan', ''}
+
+    def __init__(self, data_source: str):
+        self.data_source = data_source
+        self.columns: Dict[str, Optional[str]] = {}
+        self.total_rows = 0
+        self.built_at: Optional[float] = None
+        self.build_time_seconds = 0.0
+
+        # Mapas de hijos con conteos: clave padre -> {valor: filas}
+        self._departamentos: Dict[str, int] = {}
+        self._municipios: Dict[Optional[str], Dict[str, int]] = {}
+        self._ips: Dict[Tuple[Optional[str], Optional[str]], Dict[str, int]] = {}
+
+        # Listas ya ordenadas para servir en O(1)
+        self._sorted_cache: Dict[Tuple, List[str]] = {}
+
+    # ========== CONSTRUCCIÓN ==========
+
+    def build(self, column_service: ColumnKeywordReportService) -> 'GeographicHierarchyIndex':
+        """Construye el índice con una única agregación sobre el archivo"""
+        start_time = time.time()
+        escape = duckdb_service.escape_identifier
+
+        for geo_type in ('departamento', 'municipio', 'ips'):
+            self.columns[geo_type] = column_service._find_geographic_column(
+                self.data_source, geo_type, escape
+            )
+
+        select_parts = [
+            f"TRIM(CAST({column} AS VARCHAR))" if column else "NULL"
+            for column in self.columns.values()
+        ]
+
+        sql = f"""
+        SELECT
+            {select_parts[0]} AS departamento,
+            {select_parts[1]} AS municipio,
+            {select_parts[2]} AS ips,
+            COUNT(*) AS filas
+        FROM {self.data_source}
+        GROUP BY ALL
+        """
+
+        print(f"🗺️ Construyendo índice geográfico: {self.columns}")
+        rows = duckdb_service.conn.execute(sql).fetchall()
+
+        for departamento, municipio, ips, filas in rows:
+            self._add_row(
+                self._clean(departamento),
+                self._clean(municipio),
+                self._clean(ips),
+                int(filas)
+            )
+
+        self._sorted_cache.clear()
+        self.built_at = time.time()
+        self.build_time_seconds = round(self.built_at - start_time, 3)
+        print(
+            f"✓ Índice geográfico listo: {len(self._departamentos)} departamentos, "
+            f"{len(self._municipios.get(None, {}))} municipios, "
+            f"{len(self._ips.get((None, None), {}))} IPS en {self.build_time_seconds}s"
+        )
+        return self
+
+    def _clean(self, value: Any) -> Optional[str]:
+        """Normaliza un valor geográfico; None si no es válido"""
+        if value is None:
+            return None
+        value = str(value).strip()
+        return value if value not in self.INVALID_VALUES else None
+
+    def _add_row(self, departamento: Optional[str], municipio: Optional[str], ips: Optional[str], filas: int):
+        """Acumula una combinación del GROUP BY en todos los niveles del árbol"""
+        self.total_rows += filas
+
+        if departamento:
+            self._increment(self._departamentos, departamento, filas)
+
+        if municipio:
+            self._increment(self._municipios.setdefault(None, {}), municipio, filas)
+            if departamento:
+                self._increment(self._municipios.setdefault(departamento, {}), municipio, filas)
+
+        if ips:
+            parent_keys = [(None, None)]
+            if departamento:
+                parent_keys.append((departamento, None))
+            if municipio:
+                parent_keys.append((None, municipio))
+            if departamento and municipio:
+                parent_keys.append((departamento, municipio))
+            for key in parent_keys:
+                self._increment(self._ips.setdefault(key, {}), ips, filas)
+
+    @staticmethod
+    def _increment(target: Dict[str, int], key: str, filas: int):
+        target[key] = target.get(key, 0) + filas
+
+    # ========== CONSULTAS ==========
+
+    def get_children(
+        self,
+        geo_type: str,
+        departamento: Optional[str] = None,
+        municipio: Optional[str] = None
+    ) -> Tuple[List[str], Dict[str, int]]:
+        """Retorna (valores ordenados, conteos) para el nivel solicitado"""
+        departamento = departamento.strip() if departamento and departamento.strip() else None
+        municipio = municipio.strip() if municipio and municipio.strip() else None
+
+        if geo_type == 'departamento':
+            cache_key = ('departamento',)
+            counts = self._departamentos
+        elif geo_type == 'municipio':
+            cache_key = ('municipio', departamento)
+            counts = self._municipios.get(departamento, {})
+        elif geo_type == 'ips':
+            cache_key = ('ips', departamento, municipio)
+            counts = self._ips.get((departamento, municipio), {})
+        else:
+            raise ValueError(f"Tipo geográfico no soportado: {geo_type}")
+
+        values = self._sorted_cache.get(cache_key)
+        if values is None:
+            values = sorted(counts.keys())
+            self._sorted_cache[cache_key] = values
+
+        return values, counts
+
+    def get_tree(self) -> List[Dict[str, Any]]:
+        """Árbol completo con conteos para que el frontend lo cachee"""
+        tree = []
+        for departamento, _ in self._iter_sorted(self._departamentos):
+            municipios = []
+            for municipio, mun_count in self._iter_sorted(self._municipios.get(departamento, {})):
+                ips_items = self._ips.get((departamento, municipio), {})
+                municipios.append({
+                    "value": municipio,
+                    "count": mun_count,
+                    "ips": [
+                        {"value": ips, "count": ips_count}
+                        for ips, ips_count in self._iter_sorted(ips_items)
+                    ]
+                })
+            tree.append({
+                "value": departamento,
+                "count": self._departamentos[departamento],
+                "municipios": municipios
+            })
+        return tree
+
+    @staticmethod
+    def _iter_sorted(counts: Dict[str, int]):
+        for key in sorted(counts.keys()):
+            yield key, counts[key]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Resumen del índice para respuestas y monitoreo"""
+        return {
+            "columns": self.columns,
+            "total_rows": self.total_rows,
+            "total_departamentos": len(self._departamentos),
+            "total_municipios": len(self._municipios.get(None, {})),
+            "total_ips": len(self._ips.get((None, None), {})),
+            "build_time_seconds": self.build_time_seconds
+        }
+
+
+class GeographicHierarchyCache:
+    """Cache de índices geográficos por versión de archivo (data_source)"""
+
+    def __init__(self):
+        self._indexes: Dict[str, GeographicHierarchyIndex] = {}
+        self._lock = threading.Lock()
+        self.column_service = ColumnKeywordReportService()
+
+    def get(self, data_source: str) -> Tuple[GeographicHierarchyIndex, bool]:
+        """Retorna (índice, desde_cache); construye el índice si no existe"""
+        index = self._indexes.get(data_source)
+        if index is not None:
+            return index, True
+
+        with self._lock:
+            index = self._indexes.get(data_source)
+            if index is not None:
+                return index, True
+            index = GeographicHierarchyIndex(data_source).build(self.column_service)
+            self._indexes[data_source] = index
+            return index, False
+
+    def has(self, data_source: str) -> bool:
+        return data_source in self._indexes
+
+    def invalidate(self, data_source: Optional[str] = None) -> int:
+        """Elimina un índice o todos si no se especifica fuente"""
+        with self._lock:
+            if data_source is None:
+                count = len(self._indexes)
+                self._indexes.clear()
+                return count
+            return 1 if self._indexes.pop(data_source, None) is not None else 0
+
+    def __len__(self) -> int:
+        return len(self._indexes)
@@ -2,6 +2,7 @@
 from typing import Dict, Any, Optional
 from services.duckdb_service.duckdb_service import duckdb_service
 from services.keyword_age_report import ColumnKeywordReportService
+from services.technical_note_services.geographic_hierarchy_index import GeographicHierarchyCache
 
 class GeographicService:
     """Servicio especializado para operaciones geográficas"""
@@ -13,6 +14,7 @@ class GeographicService:
             'municipios': 'municipio',
             'ips': 'ips'
         }
+        self.hierarchy_cache = GeographicHierarchyCache()
     
     def get_geographic_values(
         self, 
@@ -33,6 +35,11 @@ class GeographicService:
             geo_type_for_service = self.geo_type_mapping.get(geo_type, geo_type)
             print(f"Mapeo: {geo_type} -> {geo_type_for_service}")
             
+            try:
+                return self._serve_from_index(data_source, geo_type, geo_type_for_service, parent_filter)
+            except Exception as index_error:
+                print(f"⚠️ Índice geográfico no disponible, usando consulta directa: {index_error}")
+            
             # Generar y ejecutar consulta
             geo_sql = self.column_service.get_unique_geographic_values_sql(
                 data_source, 
@@ -47,6 +54,62 @@ class GeographicService:
             print(f"Error en get_geographic_values: {e}")
             raise ValueError(f"Error obteniendo valores geográficos: {e}")
     
+    def get_geographic_tree(self, data_source: str) -> Dict[str, Any]:
+        """Retorna el árbol Departamento → Municipio → IPS completo con conteos"""
+        try:
+            index, from_cache = self.hierarchy_cache.get(data_source)
+            tree = index.get_tree()
+            return {
+                "success": True,
+                "tree": tree,
+                "summary": index.get_summary(),
+                "from_cache": from_cache,
+                "engine": "DuckDB_Geographic_Index"
+            }
+        except Exception as e:
+            print(f"Error en get_geographic_tree: {e}")
+            raise ValueError(f"Error construyendo árbol geográfico: {e}")
+    
+    def is_index_cached(self, data_source: str) -> bool:
+        """Indica si el índice geográfico de la fuente ya está en memoria"""
+        return self.hierarchy_cache.has(data_source)
+    
+    def clear_cache(self) -> int:
+        """Libera todos los índices geográficos en memoria"""
+        return self.hierarchy_cache.invalidate()
+    
+    def _serve_from_index(
+        self,
+        data_source: str,
+        geo_type: str,
+        geo_type_for_service: str,
+        parent_filter: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Responde desde el índice en memoria (lo construye la primera vez)"""
+        index, from_cache = self.hierarchy_cache.get(data_source)
+        
+        if not index.columns.get(geo_type_for_service):
+            print(f"No se encontró columna para {geo_type_for_service}")
+        
+        values, counts = index.get_children(
+            geo_type_for_service,
+            departamento=parent_filter.get('departamento'),
+            municipio=parent_filter.get('municipio')
+        )
+        
+        print(f"{geo_type} desde índice: {len(values)} valores (cache={from_cache})")
+        
+        return {
+            "success": True,
+            "geo_type": geo_type,
+            "values": values,
+            "counts": {value: counts[value] for value in values},
+            "total_values": len(values),
+            "filters_applied": parent_filter,
+            "from_cache": from_cache,
+            "engine": "DuckDB_Geographic_Index"
+        }
+    
     def _build_parent_filters(
         self, 
         geo_type: str, 
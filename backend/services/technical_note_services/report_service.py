@@ -41,6 +41,56 @@ class ReportService:
             corte_fecha  # FECHA DINÁMICA
         )
     
+    def generate_grouped_geographic_report(
+        self,
+        data_source: str,
+        filename: str,
+        group_by: str,
+        keywords: Optional[List[str]] = None,
+        min_count: int = 0,
+        geographic_filters: Optional[Dict[str, Optional[str]]] = None,
+        corte_fecha: str = None
+    ) -> Dict[str, Any]:
+        """Reporte agrupado por departamento, municipio o IPS en una sola ejecución"""
+        if not corte_fecha:
+            raise ValueError("El parámetro 'corte_fecha' es obligatorio y debe venir desde el frontend")
+        
+        if group_by not in ('departamento', 'municipio', 'ips'):
+            raise ValueError(f"group_by inválido: {group_by}. Use departamento, municipio o ips")
+        
+        print(f"ReportService agrupando por {group_by} con fecha: {corte_fecha}")
+        
+        return GenerateReport().generate_grouped_geographic_report(
+            self.age_extractor,
+            data_source,
+            filename,
+            group_by,
+            keywords,
+            min_count,
+            geographic_filters,
+            corte_fecha
+        )
+    
+    def generate_trend_report(
+        self,
+        data_source: str,
+        filename: str,
+        cortes: List[str],
+        keywords: Optional[List[str]] = None,
+        geographic_filters: Optional[Dict[str, Optional[str]]] = None
+    ) -> Dict[str, Any]:
+        """Serie temporal de cobertura por indicador para varias fechas de corte"""
+        print(f"ReportService generando tendencia con {len(cortes or [])} cortes")
+        
+        return GenerateReport().generate_trend_report(
+            self.age_extractor,
+            data_source,
+            filename,
+            cortes,
+            keywords,
+            geographic_filters
+        )
+    
     def _debug_age_range_coverage(
         self, data_source: str, age_range_obj, edad_meses_field: str, 
         edad_anios_field: str, geo_filter: str, corte_fecha: str, document_field: str
@@ -1,9 +1,11 @@
 # services/technical_note_services/report_service_aux/analysis_breakdown_temporal.py - FECHA DINÁMICA
 from typing import Any, Dict, List, Optional
 from services.duckdb_service.duckdb_service import duckdb_service
+from services.aux_duckdb_services.date_macros import date_macros
 from services.technical_note_services.report_service_aux.corrected_months import CorrectedMonths
 from services.technical_note_services.report_service_aux.corrected_years import CorrectedYear
 from services.technical_note_services.report_service_aux.identity_document import IdentityDocument
+from services.technical_note_services.column_classification_service import column_classification_service
 
 class AnalysisBreakdownTemporal:
     def execute_temporal_breakdown_analysis(
@@ -73,11 +75,12 @@ class AnalysisBreakdownTemporal:
                             geo_filter: str, corte_fecha: str) -> str:
         """Construye query SQL para extraer datos temporales"""
         escaped_column = duckdb_service.escape_identifier(column_name)
+        fecha_expr = date_macros.parse_sql(escaped_column, date_format)
         
         return f"""
         SELECT DISTINCT
-            date_part('year', TRY_CAST(strptime(TRIM({escaped_column}), '{date_format}') AS DATE)) as anio,
-            date_part('month', TRY_CAST(strptime(TRIM({escaped_column}), '{date_format}') AS DATE)) as mes
+            date_part('year', {fecha_expr}) as anio,
+            date_part('month', {fecha_expr}) as mes
         FROM {data_source}
         WHERE 
             ({specific_age_filter})
@@ -91,8 +94,8 @@ class AnalysisBreakdownTemporal:
             AND TRIM(CAST({escaped_column} AS VARCHAR)) != ''
             AND TRIM(CAST({escaped_column} AS VARCHAR)) NOT IN ('NULL', 'null', 'None', 'none', 'NaN', 'nan', 'N/A', 'n/a', '-')
             AND LENGTH(TRIM(CAST({escaped_column} AS VARCHAR))) >= 8
-            AND TRY_CAST(strptime(TRIM({escaped_column}), '{date_format}') AS DATE) IS NOT NULL
-            AND TRY_CAST(strptime(TRIM({escaped_column}), '{date_format}') AS DATE) <= DATE '{corte_fecha}'
+            AND {fecha_expr} IS NOT NULL
+            AND {fecha_expr} <= DATE '{corte_fecha}'
         ORDER BY anio, mes
         """
 
@@ -224,6 +227,7 @@ class AnalysisBreakdownTemporal:
         """
         try:
             escaped_column = duckdb_service.escape_identifier(column_name)
+            fecha_expr = date_macros.parse_sql(escaped_column, date_format)
             
             # DENOMINADOR TEMPORAL CON FECHA DINÁMICA
             denominator_sql = f"""
@@ -257,9 +261,9 @@ class AnalysisBreakdownTemporal:
                 AND TRIM(CAST({escaped_column} AS VARCHAR)) != ''
                 AND TRIM(CAST({escaped_column} AS VARCHAR)) NOT IN ('NULL', 'null', 'None', 'none', 'NaN', 'nan', 'N/A', 'n/a', '-')
                 AND LENGTH(TRIM(CAST({escaped_column} AS VARCHAR))) >= 8
-                AND TRY_CAST(strptime(TRIM({escaped_column}), '{date_format}') AS DATE) IS NOT NULL
-                AND date_part('year', TRY_CAST(strptime(TRIM({escaped_column}), '{date_format}') AS DATE)) = {anio}
-                AND date_part('month', TRY_CAST(strptime(TRIM({escaped_column}), '{date_format}') AS DATE)) = {mes}
+                AND {fecha_expr} IS NOT NULL
+                AND date_part('year', {fecha_expr}) = {anio}
+                AND date_part('month', {fecha_expr}) = {mes}
             """
             
             numerator_result = duckdb_service.conn.execute(numerator_sql).fetchone()
@@ -289,6 +293,12 @@ class AnalysisBreakdownTemporal:
     def _detect_date_format(self, data_source: str, column_name: str) -> str:
         """DETECTA AUTOMÁTICAMENTE EL FORMATO DE FECHA DE UNA COLUMNA"""
         retorno = '%d/%m/%Y'
+        
+        # Formato ya adivinado al clasificar las columnas del archivo
+        indexed_format = column_classification_service.get_date_format(data_source, column_name, retorno)
+        if indexed_format:
+            return indexed_format
+        
         try:
             escaped_column = duckdb_service.escape_identifier(column_name)
             
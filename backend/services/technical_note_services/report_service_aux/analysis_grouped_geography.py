@@ -0,0 +1,195 @@
+# services/technical_note_services/report_service_aux/analysis_grouped_geography.py
+from typing import Any, Dict, List, Optional
+from services.duckdb_service.duckdb_service import duckdb_service
+from services.aux_duckdb_services.query_profile import is_debug_profile
+from services.technical_note_services.report_service_aux.analysis_numerador_denominador import AnalysisNumeratorDenominator
+from services.technical_note_services.report_service_aux.semaforization import Semaforization
+
+
+class AnalysisGroupedGeography:
+    """
+    Numerador/denominador de todas las actividades para cada miembro de un nivel
+    geográfico (departamento, municipio o IPS) en UNA sola consulta agrupada.
+    Cada actividad se resuelve con agregados COUNT(...) FILTER (WHERE ...).
+    """
+
+    # Columnas que componen la llave del grupo (se incluyen los padres para
+    # no mezclar municipios o IPS homónimos de distintos departamentos)
+    GROUP_LEVELS = {
+        'departamento': [('departamento', '"Departamento"')],
+        'municipio': [('departamento', '"Departamento"'), ('municipio', '"Municipio"')],
+        'ips': [('departamento', '"Departamento"'), ('municipio', '"Municipio"'), ('ips', '"Nombre IPS"')]
+    }
+
+    INVALID_ACTIVITY_VALUES = "('NULL', 'null', 'None', 'none', 'NaN', 'nan', 'N/A', 'n/a', '-', 'No')"
+
+    def __init__(self):
+        self.analysis = AnalysisNumeratorDenominator()
+
+    def _build_activity_specs(self, matches: List[Dict], age_extractor,
+                              edad_meses_field: str, edad_anios_field: str) -> tuple:
+        """Prepara filtro de edad por actividad; separa las que no tienen rango"""
+        specs = []
+        skipped = []
+
+        for match in matches:
+            age_range_obj = age_extractor.extract_age_range(match['column'])
+            if not age_range_obj:
+                skipped.append(match['column'])
+                continue
+
+            specs.append({
+                "match": match,
+                "age_range_obj": age_range_obj,
+                "age_filter": self.analysis._build_exact_age_filter(
+                    age_range_obj, edad_meses_field, edad_anios_field
+                )
+            })
+
+        return specs, skipped
+
+    def _build_grouped_sql(self, data_source: str, specs: List[Dict], group_columns: List[tuple],
+                           document_field: str, geo_filter: str, corte_fecha: str) -> str:
+        """Construye la consulta única con un par num/den por actividad"""
+        group_select = [f"TRIM(CAST({column} AS VARCHAR)) AS {alias}" for alias, column in group_columns]
+
+        aggregates = []
+        for idx, spec in enumerate(specs):
+            escaped_column = duckdb_service.escape_identifier(spec['match']['column'])
+            age_filter = spec['age_filter']
+            aggregates.append(f"COUNT({document_field}) FILTER (WHERE ({age_filter})) AS den_{idx}")
+            aggregates.append(f"""COUNT({document_field}) FILTER (
+                WHERE ({age_filter})
+                AND {escaped_column} IS NOT NULL
+                AND TRIM(CAST({escaped_column} AS VARCHAR)) != ''
+                AND TRIM(CAST({escaped_column} AS VARCHAR)) NOT IN {self.INVALID_ACTIVITY_VALUES}
+            ) AS num_{idx}""")
+
+        group_aliases = ", ".join(alias for alias, _ in group_columns)
+
+        return f"""
+        SELECT
+            {", ".join(group_select)},
+            {", ".join(aggregates)}
+        FROM {data_source}
+        WHERE
+            "Fecha Nacimiento" IS NOT NULL
+            AND TRIM("Fecha Nacimiento") != ''
+            AND TRY_CAST(strptime("Fecha Nacimiento", '%d/%m/%Y') AS DATE) IS NOT NULL
+            AND strptime("Fecha Nacimiento", '%d/%m/%Y') <= DATE '{corte_fecha}'
+            AND {document_field} IS NOT NULL
+            AND TRIM({document_field}) != ''
+            AND {geo_filter}
+        GROUP BY {group_aliases}
+        ORDER BY {group_aliases}
+        """
+
+    def _build_metrics(self, numerador: int, denominador: int) -> Dict[str, Any]:
+        """Métricas con la misma semaforización que el reporte individual"""
+        porcentaje = round((numerador / denominador) * 100, 2) if denominador > 0 else 0.0
+        semaforizacion = Semaforization().calculate_semaforizacion(numerador, porcentaje)
+        return {
+            "numerador": numerador,
+            "denominador": denominador,
+            "cobertura_porcentaje": porcentaje,
+            "sin_datos": denominador - numerador,
+            "semaforizacion": semaforizacion['estado'],
+            "color": semaforizacion['color'],
+            "color_name": semaforizacion['color_name'],
+            "descripcion": semaforizacion['descripcion']
+        }
+
+    def _process_group_row(self, row: tuple, group_columns: List[tuple],
+                           specs: List[Dict], min_count: int, corte_fecha: str) -> Optional[Dict[str, Any]]:
+        """Convierte una fila agrupada en el bloque de resultados del miembro"""
+        group_size = len(group_columns)
+        group_values = {alias: row[idx] for idx, (alias, _) in enumerate(group_columns)}
+
+        items = []
+        total_num = 0
+        total_den = 0
+
+        for idx, spec in enumerate(specs):
+            denominador = int(row[group_size + idx * 2] or 0)
+            numerador = int(row[group_size + idx * 2 + 1] or 0)
+
+            if denominador == 0 or numerador < min_count:
+                continue
+
+            match = spec['match']
+            age_range_obj = spec['age_range_obj']
+            items.append({
+                "column": match['column'],
+                "keyword": match['keyword'],
+                "age_range": age_range_obj.get_description(),
+                "count": numerador,
+                "metodo": f"REGISTROS_TOTALES_{age_range_obj.unit.upper()}",
+                "corte_fecha": corte_fecha,
+                **self._build_metrics(numerador, denominador)
+            })
+            total_num += numerador
+            total_den += denominador
+
+        if not items:
+            return None
+
+        return {
+            **group_values,
+            "grupo": " / ".join(str(v) for v in group_values.values() if v),
+            "actividades": len(items),
+            "totales": self._build_metrics(total_num, total_den),
+            "items": items
+        }
+
+    def execute_grouped_analysis(
+        self, data_source: str, matches: List[Dict], group_by: str,
+        departamento: Optional[str], municipio: Optional[str], ips: Optional[str],
+        min_count: int, corte_fecha: str, age_extractor
+    ) -> Dict[str, Any]:
+        """Ejecuta el análisis agrupado y retorna un bloque por miembro del nivel"""
+        group_columns = self.GROUP_LEVELS.get(group_by)
+        if not group_columns:
+            raise ValueError(f"Nivel de agrupación no soportado: {group_by}")
+
+        document_field, edad_meses_field, edad_anios_field = self.analysis._setup_analysis_fields(
+            data_source, corte_fecha
+        )
+        if not document_field or not edad_meses_field or not edad_anios_field:
+            raise ValueError("No se pudieron detectar los campos de documento y edad")
+
+        specs, skipped = self._build_activity_specs(matches, age_extractor, edad_meses_field, edad_anios_field)
+        if not specs:
+            return {"groups": [], "skipped_columns": skipped, "activities": 0}
+
+        geo_filter = self.analysis._build_geo_filter(departamento, municipio, ips)
+        grouped_sql = self._build_grouped_sql(
+            data_source, specs, group_columns, document_field, geo_filter, corte_fecha
+        )
+
+        print(f"🧮 Reporte agrupado por {group_by}: {len(specs)} actividades en una consulta")
+        if is_debug_profile():
+            print(f"   SQL AGRUPADO: {grouped_sql[:300]}...")
+
+        rows = duckdb_service.conn.execute(grouped_sql).fetchall()
+
+        groups = []
+        for row in rows:
+            # Filas sin valor en el nivel agrupado no corresponden a ningún miembro
+            if row[len(group_columns) - 1] in (None, ''):
+                continue
+            group = self._process_group_row(row, group_columns, specs, min_count, corte_fecha)
+            if group:
+                groups.append(group)
+
+        # Tabla de posiciones: mayor cobertura primero
+        groups.sort(key=lambda g: (-g['totales']['cobertura_porcentaje'], g['grupo']))
+        for position, group in enumerate(groups, 1):
+            group['posicion'] = position
+
+        print(f"✓ {len(groups)} miembros de {group_by} con datos")
+
+        return {
+            "groups": groups,
+            "skipped_columns": skipped,
+            "activities": len(specs)
+        }
@@ -1,6 +1,7 @@
 # services/technical_note_services/report_service_aux/analysis_numerador_denominador.py
 from typing import Any, Dict, List, Optional
 from services.duckdb_service.duckdb_service import duckdb_service
+from services.aux_duckdb_services.query_profile import is_debug_profile
 from services.technical_note_services.report_service_aux.corrected_months import CorrectedMonths
 from services.technical_note_services.report_service_aux.corrected_years import CorrectedYear
 from services.technical_note_services.report_service_aux.identity_document import IdentityDocument
@@ -58,7 +59,8 @@ class AnalysisNumeratorDenominator:
             AND {geo_filter}
         """
         
-        print(f"   anioSQL DENOMINADOR: {denominador_sql[:300]}...")
+        if is_debug_profile():
+            print(f"   anioSQL DENOMINADOR: {denominador_sql[:300]}...")
         
         try:
             result = duckdb_service.conn.execute(denominador_sql).fetchone()
@@ -92,7 +94,8 @@ class AnalysisNumeratorDenominator:
             AND {geo_filter}
         """
         
-        print(f"   anioSQL NUMERADOR: {numerator_sql[:300]}...")
+        if is_debug_profile():
+            print(f"   anioSQL NUMERADOR: {numerator_sql[:300]}...")
         
         try:
             result = duckdb_service.conn.execute(numerator_sql).fetchone()
@@ -250,6 +253,10 @@ class AnalysisNumeratorDenominator:
         
         print("   anioAGREGADO AL REPORTE")
         
+        # Diagnóstico (solo perfil debug): desglose de rangos múltiples y muestra
+        if not is_debug_profile():
+            return result_item
+        
         # Debug para rangos múltiples
         if age_range_obj.min_age != age_range_obj.max_age:
             print("   anioDESGLOSE POR EDAD (rango múltiple):")
@@ -0,0 +1,175 @@
+# services/technical_note_services/report_service_aux/analysis_trend.py
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from services.duckdb_service.duckdb_service import duckdb_service
+from services.aux_duckdb_services.query_profile import is_debug_profile
+from services.technical_note_services.report_service_aux.analysis_numerador_denominador import AnalysisNumeratorDenominator
+from services.technical_note_services.report_service_aux.identity_document import IdentityDocument
+from services.technical_note_services.report_service_aux.semaforization import Semaforization
+
+
+class AnalysisMultiCutoffTrend:
+    """
+    Tendencia de cobertura para varias fechas de corte en UN solo escaneo.
+    La base de pacientes (fecha de nacimiento parseada + banderas de actividad)
+    se cruza con una tabla pequeña de cortes y se agrega por corte.
+    """
+
+    MAX_CORTES = 60
+
+    INVALID_ACTIVITY_VALUES = "('NULL', 'null', 'None', 'none', 'NaN', 'nan', 'N/A', 'n/a', '-', 'No')"
+
+    def __init__(self):
+        self.analysis = AnalysisNumeratorDenominator()
+
+    def normalize_cortes(self, cortes: List[str]) -> List[str]:
+        """Valida formato YYYY-MM-DD, elimina duplicados y ordena"""
+        normalized = set()
+        for corte in cortes:
+            corte = corte.strip()
+            if not corte:
+                continue
+            try:
+                normalized.add(datetime.strptime(corte, '%Y-%m-%d').strftime('%Y-%m-%d'))
+            except ValueError:
+                raise ValueError(f"Fecha de corte inválida: {corte}. Use YYYY-MM-DD")
+
+        if not normalized:
+            raise ValueError("Debe enviar al menos una fecha de corte")
+        if len(normalized) > self.MAX_CORTES:
+            raise ValueError(f"Máximo {self.MAX_CORTES} fechas de corte por solicitud")
+
+        return sorted(normalized)
+
+    def _sifecha_months(self, birth_field: str, corte_field: str) -> str:
+        """Meses cumplidos estilo SIFECHA con la fecha de corte como columna"""
+        return f"""(
+            (date_part('year', {corte_field}) - date_part('year', {birth_field})) * 12
+            + (date_part('month', {corte_field}) - date_part('month', {birth_field}))
+            + CASE
+                WHEN date_part('day', {birth_field}) <= date_part('day', {corte_field})
+                THEN 0 ELSE -1
+            END
+        )"""
+
+    def _build_trend_sql(self, data_source: str, specs: List[Dict], cortes: List[str],
+                         document_field: str, geo_filter: str) -> str:
+        """Construye la consulta única: base × cortes → agregados por corte"""
+        cortes_values = ", ".join(f"(DATE '{corte}')" for corte in cortes)
+
+        activity_flags = []
+        for idx, spec in enumerate(specs):
+            escaped_column = duckdb_service.escape_identifier(spec['match']['column'])
+            activity_flags.append(f"""(
+                {escaped_column} IS NOT NULL
+                AND TRIM(CAST({escaped_column} AS VARCHAR)) != ''
+                AND TRIM(CAST({escaped_column} AS VARCHAR)) NOT IN {self.INVALID_ACTIVITY_VALUES}
+            ) AS tiene_{idx}""")
+
+        aggregates = []
+        for idx, spec in enumerate(specs):
+            age_filter = spec['age_filter']
+            aggregates.append(f"COUNT(documento) FILTER (WHERE ({age_filter})) AS den_{idx}")
+            aggregates.append(f"COUNT(documento) FILTER (WHERE ({age_filter}) AND tiene_{idx}) AS num_{idx}")
+
+        return f"""
+        WITH cortes(corte) AS (
+            VALUES {cortes_values}
+        ),
+        base AS (
+            SELECT
+                {document_field} AS documento,
+                CAST(try_strptime("Fecha Nacimiento", '%d/%m/%Y') AS DATE) AS fecha_nacimiento,
+                {", ".join(activity_flags)}
+            FROM {data_source}
+            WHERE
+                "Fecha Nacimiento" IS NOT NULL
+                AND TRIM("Fecha Nacimiento") != ''
+                AND try_strptime("Fecha Nacimiento", '%d/%m/%Y') IS NOT NULL
+                AND {document_field} IS NOT NULL
+                AND TRIM({document_field}) != ''
+                AND {geo_filter}
+        ),
+        edades AS (
+            SELECT
+                base.*,
+                cortes.corte,
+                {self._sifecha_months('base.fecha_nacimiento', 'cortes.corte')} AS edad_meses
+            FROM base
+            CROSS JOIN cortes
+            WHERE base.fecha_nacimiento <= cortes.corte
+        )
+        SELECT
+            corte,
+            {", ".join(aggregates)}
+        FROM (SELECT *, CAST(floor(edad_meses / 12) AS INTEGER) AS edad_anios FROM edades)
+        GROUP BY corte
+        ORDER BY corte
+        """
+
+    def _build_point(self, corte: str, numerador: int, denominador: int) -> Dict[str, Any]:
+        """Punto de la serie con la semaforización estándar"""
+        porcentaje = round((numerador / denominador) * 100, 2) if denominador > 0 else 0.0
+        semaforizacion = Semaforization().calculate_semaforizacion(numerador, porcentaje)
+        return {
+            "corte_fecha": corte,
+            "numerador": numerador,
+            "denominador": denominador,
+            "cobertura_porcentaje": porcentaje,
+            "semaforizacion": semaforizacion['estado'],
+            "color": semaforizacion['color'],
+            "color_name": semaforizacion['color_name']
+        }
+
+    def execute_trend_analysis(
+        self, data_source: str, matches: List[Dict], cortes: List[str],
+        departamento: Optional[str], municipio: Optional[str], ips: Optional[str],
+        age_extractor
+    ) -> Dict[str, Any]:
+        """Retorna una serie temporal por indicador para todas las fechas de corte"""
+        document_field = IdentityDocument().get_document_field(data_source)
+
+        specs = []
+        skipped = []
+        for match in matches:
+            age_range_obj = age_extractor.extract_age_range(match['column'])
+            if not age_range_obj:
+                skipped.append(match['column'])
+                continue
+            specs.append({
+                "match": match,
+                "age_range_obj": age_range_obj,
+                "age_filter": self.analysis._build_exact_age_filter(age_range_obj, "edad_meses", "edad_anios")
+            })
+
+        if not specs:
+            return {"series": [], "skipped_columns": skipped}
+
+        geo_filter = self.analysis._build_geo_filter(departamento, municipio, ips)
+        trend_sql = self._build_trend_sql(data_source, specs, cortes, document_field, geo_filter)
+
+        print(f"📈 Tendencia: {len(specs)} indicadores × {len(cortes)} cortes en una consulta")
+        if is_debug_profile():
+            print(f"   SQL TENDENCIA: {trend_sql[:300]}...")
+
+        rows = duckdb_service.conn.execute(trend_sql).fetchall()
+        rows_by_corte = {row[0].strftime('%Y-%m-%d'): row for row in rows}
+
+        series = []
+        for idx, spec in enumerate(specs):
+            points = []
+            for corte in cortes:
+                row = rows_by_corte.get(corte)
+                denominador = int(row[1 + idx * 2] or 0) if row else 0
+                numerador = int(row[2 + idx * 2] or 0) if row else 0
+                points.append(self._build_point(corte, numerador, denominador))
+
+            match = spec['match']
+            series.append({
+                "column": match['column'],
+                "keyword": match['keyword'],
+                "age_range": spec['age_range_obj'].get_description(),
+                "points": points
+            })
+
+        return {"series": series, "skipped_columns": skipped}
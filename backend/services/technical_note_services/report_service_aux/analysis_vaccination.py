@@ -1,33 +1,73 @@
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, List, Tuple
 from services.duckdb_service.duckdb_service import duckdb_service
 
 class AnalysisVaccination:
+    # Estados por (fuente, columnas, filtros); la fuente Parquet incluye el hash del archivo
+    _states_cache: Dict[Tuple, Dict[str, Any]] = {}
+    _cache_lock = threading.Lock()
+    MAX_CACHED_RESULTS = 256
+
+    STATE_VALUES = {
+        'completo': 'Completo', 'complete': 'Completo',
+        'incompleto': 'Incompleto', 'incomplete': 'Incompleto'
+    }
+
     def execute_vaccination_states_analysis(self, data_source: str, matches, departamento, municipio, ips) -> Dict[str, Any]:
-        """Ejecuta análisis de estados de vacunación"""
+        """Ejecuta análisis de estados de vacunación (detección y conteo en una sola consulta)"""
         states_data = {}
         try:
-            vaccination_columns = []
-            for match in matches:
-                column_name = match['column']
-                if any(keyword in column_name.lower() for keyword in ['vacunación', 'vacunacion']):
-                    if self._column_has_states(data_source, column_name):
-                        vaccination_columns.append(match)
+            vaccination_columns = [
+                match for match in matches
+                if any(keyword in match['column'].lower() for keyword in ['vacunación', 'vacunacion'])
+            ]
             
             if vaccination_columns:
-                states_sql = self._build_vaccination_states_sql_simple(
-                    data_source, vaccination_columns, 
+                cache_key = (
+                    data_source,
+                    tuple(match['column'] for match in vaccination_columns),
+                    departamento, municipio, ips
+                )
+                cached = self._states_cache.get(cache_key)
+                if cached is not None:
+                    print(f"Estados de vacunación desde cache: {len(cached)} entradas")
+                    return self._copy_states(cached)
+                
+                states_sql = self._build_vaccination_states_sql(
+                    data_source, vaccination_columns,
                     duckdb_service.escape_identifier,
                     departamento, municipio, ips
                 )
-                states_result = duckdb_service.conn.execute(states_sql).fetchall()
-                states_data = self._process_vaccination_states_results(states_result)
+                counts = duckdb_service.conn.execute(states_sql).fetchall()
+                states_data = self._process_vaccination_states_results(
+                    self._to_state_rows(vaccination_columns, counts)
+                )
                 print(f"Estados de vacunación: {len(states_data)} entradas")
                 
+                with self._cache_lock:
+                    if len(self._states_cache) >= self.MAX_CACHED_RESULTS:
+                        self._states_cache.pop(next(iter(self._states_cache)))
+                    self._states_cache[cache_key] = states_data
+                return self._copy_states(states_data)
+                
         except Exception as e:
             print(f"Error análisis estados: {e}")
         
         return states_data
     
+    @staticmethod
+    def _copy_states(states_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia para que el reporte no modifique la entrada en cache"""
+        return {key: dict(value, states=dict(value["states"])) for key, value in states_data.items()}
+    
+    @classmethod
+    def clear_cache(cls) -> int:
+        """Elimina los estados de vacunación en cache"""
+        with cls._cache_lock:
+            count = len(cls._states_cache)
+            cls._states_cache.clear()
+            return count
+    
     def _extract_vaccination_row_data(self, row: tuple) -> tuple:
         """Extrae y valida datos de una fila de resultado de vacunación"""
         column_name = str(row[0]) if row[0] is not None else ""
@@ -93,45 +133,50 @@ class AnalysisVaccination:
         return states_data
 
     
-    def _build_vaccination_states_sql_simple(self, data_source: str, vaccination_columns, escape_func, departamento, municipio, ips) -> str:
-        """Construye SQL para estados de vacunación"""
-        queries = []
-        for match in vaccination_columns:
-            column_name = match['column']
-            keyword = match['keyword']
-            age_range = match['age_range']
-            escaped_column = escape_func(column_name)
-            
-            where_conditions = []
-            if departamento: where_conditions.append(f"{escape_func('departamento')} = '{departamento}'")
-            if municipio: where_conditions.append(f"{escape_func('municipio')} = '{municipio}'")
-            if ips: where_conditions.append(f"{escape_func('ips')} = '{ips}'")
-            base_where = " AND ".join(where_conditions) if where_conditions else "1=1"
-            
-            for estado in ['Completo', 'Incompleto']:
-                state_condition = "completo" if estado == "Completo" else "incompleto"
-                query = f"""
-                SELECT '{column_name}', '{keyword}', '{age_range}', '{estado}', COUNT(*)
-                FROM {data_source}
-                WHERE {base_where} AND {escaped_column} IS NOT NULL
-                AND (TRIM(LOWER({escaped_column})) = '{state_condition}' 
-                     OR TRIM(LOWER({escaped_column})) = '{state_condition.replace("completo", "complete").replace("incompleto", "incomplete")}')
-                """
-                queries.append(query)
+    def _build_vaccination_states_sql(self, data_source: str, vaccination_columns, escape_func, departamento, municipio, ips) -> str:
+        """
+        Una sola pasada: UNPIVOT de las columnas de vacunación y GROUP BY por
+        columna y estado. Las columnas sin estados simplemente no aparecen.
+        """
+        where_conditions = []
+        if departamento: where_conditions.append(f"{escape_func('departamento')} = '{departamento}'")
+        if municipio: where_conditions.append(f"{escape_func('municipio')} = '{municipio}'")
+        if ips: where_conditions.append(f"{escape_func('ips')} = '{ips}'")
+        base_where = " AND ".join(where_conditions) if where_conditions else "1=1"
+        
+        projected = ", ".join(
+            f"CAST({escape_func(match['column'])} AS VARCHAR) AS c{idx}"
+            for idx, match in enumerate(vaccination_columns)
+        )
+        state_list = ", ".join(f"'{value}'" for value in self.STATE_VALUES)
         
-        return " UNION ALL ".join(queries) + " ORDER BY 1, 4" if queries else "SELECT 'no_data', 'no_data', 'no_data', 'no_data', 0 WHERE 1=0"
+        return f"""
+        WITH filtrado AS (
+            SELECT {projected}
+            FROM {data_source}
+            WHERE {base_where}
+        ),
+        valores AS (
+            UNPIVOT filtrado ON COLUMNS(*) INTO NAME columna VALUE valor
+        )
+        SELECT columna, TRIM(LOWER(valor)) AS estado, COUNT(*) AS total
+        FROM valores
+        WHERE TRIM(LOWER(valor)) IN ({state_list})
+        GROUP BY ALL
+        """
     
-    def _column_has_states(self, data_source: str, column_name: str) -> bool:
-        """Verifica si columna tiene estados"""
-        try:
-            escaped_column = duckdb_service.escape_identifier(column_name)
-            check_sql = f"""
-            SELECT DISTINCT {escaped_column} FROM {data_source} 
-            WHERE {escaped_column} IS NOT NULL 
-            AND TRIM(LOWER({escaped_column})) IN ('completo', 'incompleto', 'complete', 'incomplete')
-            LIMIT 1
-            """
-            result = duckdb_service.conn.execute(check_sql).fetchall()
-            return len(result) > 0
-        except Exception:
-            return False
\ No newline at end of file
+    def _to_state_rows(self, vaccination_columns, counts) -> List[tuple]:
+        """Convierte (c<idx>, estado, total) en filas (columna, keyword, rango, estado, conteo)"""
+        totals: Dict[Tuple[int, str], int] = {}
+        for alias, raw_state, total in counts:
+            key = (int(alias[1:]), self.STATE_VALUES[raw_state])
+            totals[key] = totals.get(key, 0) + int(total)
+        
+        rows = []
+        for (idx, estado), total in totals.items():
+            match = vaccination_columns[idx]
+            rows.append((match['column'], str(match['keyword']), str(match['age_range']), estado, total))
+        
+        # Mismo orden que antes: columna y luego estado
+        rows.sort(key=lambda row: (row[0], row[3]))
+        return rows
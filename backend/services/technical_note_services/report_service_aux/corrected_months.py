@@ -1,5 +1,6 @@
 # services/technical_note_services/report_service_aux/corrected_months.py
 from services.duckdb_service.duckdb_service import duckdb_service
+from services.aux_duckdb_services.query_profile import is_debug_profile
 
 class CorrectedMonths:
     def _find_existing_age_months_column(self, column_names: list) -> str:
@@ -112,8 +113,9 @@ class CorrectedMonths:
             # PASO 4: Construir fórmula SIFECHA
             calc_field = self._build_excel_sifecha_formula(fecha_field, corte_fecha)
             
-            # PASO 5: Validar cálculo
-            self._validate_age_calculation(data_source, fecha_field, calc_field, corte_fecha)
+            # PASO 5: Validar cálculo (consulta de diagnóstico, solo perfil debug)
+            if is_debug_profile():
+                self._validate_age_calculation(data_source, fecha_field, calc_field, corte_fecha)
             
             print("===== FIN DEBUG =====\n")
             return calc_field
@@ -1,6 +1,8 @@
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from services.duckdb_service.duckdb_service import duckdb_service
+from services.aux_duckdb_services.date_macros import date_macros
+from services.aux_duckdb_services.query_profile import is_debug_profile
 from services.keyword_age_report import ColumnKeywordReportService, KeywordRule
 from services.technical_note_services.report_service_aux.analysis_breakdown_temporal import AnalysisBreakdownTemporal
 from services.technical_note_services.report_service_aux.analysis_numerador_denominador import AnalysisNumeratorDenominator
@@ -11,12 +13,19 @@ from services.technical_note_services.report_service_aux.report_empty import Rep
 from services.technical_note_services.report_service_aux.report_exporter import ReportExporter
 from services.technical_note_services.report_service_aux.semaforization import Semaforization
 from services.technical_note_services.report_service_aux.statistics import Statistics
+from services.technical_note_services.column_classification_service import column_classification_service
 from utils.keywords_NT import KeywordRule
+from .analysis_grouped_geography import AnalysisGroupedGeography
+from .parallel_phases import ParallelReportPhases
 from .analysis_temporal import AnalysisTemporal
+from .analysis_trend import AnalysisMultiCutoffTrend
 from .analysis_vaccination import AnalysisVaccination
 
 
 def log(msg):
+    """Log de diagnóstico en generate_report.txt (solo con el perfil debug)"""
+    if not is_debug_profile():
+        return
     with open('generate_report.txt', 'a', encoding='utf-8') as f:
         f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {msg}\n")
 
@@ -62,22 +71,11 @@ class GenerateReport:
         
         return " AND ".join(conditions) if conditions else "1=1"
     
-    def _parse_date_flexible(self, date_field: str) -> str:
-        """Parseo flexible de fechas en múltiples formatos"""
-        return f"""
-        CASE
-            WHEN {date_field} ~ '^[0-9]{{1,2}}/[0-9]{{1,2}}/[0-9]{{4}}$' 
-                THEN TRY_CAST(strptime({date_field}, '%d/%m/%Y') AS DATE)
-            WHEN {date_field} ~ '^[0-9]{{4}}-[0-9]{{1,2}}-[0-9]{{1,2}}$'
-                THEN TRY_CAST(strptime({date_field}, '%Y-%m-%d') AS DATE)
-            WHEN {date_field} ~ '^[0-9]{{1,2}}-[0-9]{{1,2}}-[0-9]{{4}}$'
-                THEN TRY_CAST(strptime({date_field}, '%d-%m-%Y') AS DATE)
-            WHEN {date_field} ~ '^[0-9]{{1,2}}/[0-9]{{1,2}}/[0-9]{{4}}$' AND 
-                 CAST(split_part({date_field}, '/', 1) AS INTEGER) > 12
-                THEN TRY_CAST(strptime({date_field}, '%m/%d/%Y') AS DATE)
-            ELSE NULL
-        END
-        """
+    def _parse_date_flexible(self, data_source: str, date_field: str) -> str:
+        """Parseo de fechas con el formato dominante de la columna (macro DuckDB)"""
+        column_name = date_field.strip('"').replace('""', '"')
+        date_format = column_classification_service.get_date_format(data_source, column_name)
+        return date_macros.parse_sql(date_field, date_format)
     
     def _calculate_denominator_unified(
         self, data_source: str, age_range_obj, document_field: str, geo_filter: str,
@@ -92,7 +90,7 @@ class GenerateReport:
             
             edad_filter = self._build_age_filter(age_range_obj, corte_fecha)
             column_safe = f'"{column_name}"' if not column_name.startswith('"') else column_name
-            date_parser = self._parse_date_flexible(column_safe)
+            date_parser = self._parse_date_flexible(data_source, column_safe)
             
             # Condición temporal: si mes existe, filtrar por mes; si no, filtrar por año
             temporal_condition = f"""
@@ -131,14 +129,15 @@ class GenerateReport:
                 )
             """
             
-            log(f"      SQL (primeros 300 chars): {sql[:300]}...")
+            if is_debug_profile():
+                log(f"      SQL (primeros 300 chars): {sql[:300]}...")
             
             result = duckdb_service.conn.execute(sql).fetchone()
             denominador = int(result[0]) if result and result[0] else 0
             
             log(f"      DENOMINADOR {period}: {denominador:,}")
             
-            if denominador > 0:
+            if denominador > 0 and is_debug_profile():
                 self._log_debug_breakdown(data_source, edad_filter, document_field, geo_filter, 
                                          column_safe, date_parser, temporal_condition, mes, anio)
             
@@ -365,39 +364,45 @@ class GenerateReport:
             municipio = geographic_filters.get('municipio')
             ips = geographic_filters.get('ips')
             
-            # Ejecutar matching
-            columns = self._get_table_columns(data_source)
-            rules = [KeywordRule(name=k, synonyms=(k.lower(),)) for k in keywords] if keywords else None
-            service = ColumnKeywordReportService(keywords=rules)
-            matches = service.match_columns(columns)
+            # Ejecutar matching (índice de clasificación del archivo)
+            service, matches = self._match_columns(data_source, keywords, age_extractor)
             
             if not matches:
                 return ReportEmpty().build_empty_report(filename, keywords, geographic_filters)
             
-            # Análisis numerador/denominador
-            items_with_numerator_denominator = AnalysisNumeratorDenominator().execute_numerator_denominator_analysis(
-                data_source, matches, departamento, municipio, ips, min_count, corte_fecha, age_extractor
-            )
+            # Numerador/denominador primero: decide si hacen falta los análisis temporales
+            phase_runner = ParallelReportPhases()
+            items_with_numerator_denominator = phase_runner.run({
+                "numerador_denominador": (
+                    AnalysisNumeratorDenominator().execute_numerator_denominator_analysis,
+                    (data_source, matches, departamento, municipio, ips, min_count, corte_fecha, age_extractor)
+                )
+            })["numerador_denominador"]
+            phase_timings = dict(phase_runner.last_timings)
             
-            # Análisis temporales
+            # Análisis temporales en paralelo (solo si hay items con numerador/denominador)
             temporal_breakdown_data = {}
             combined_temporal_data = {}
             
             if include_temporal and items_with_numerator_denominator:
-                temporal_breakdown_data = AnalysisBreakdownTemporal().execute_temporal_breakdown_analysis(
-                    data_source, matches, departamento, municipio, ips, corte_fecha, age_extractor
-                )
-                
-                temporal_data = AnalysisTemporal().execute_temporal_analysis(
-                    service, data_source, matches, departamento, municipio, ips
-                )
-                
-                vaccination_states_data = AnalysisVaccination().execute_vaccination_states_analysis(
-                    data_source, matches, departamento, municipio, ips
-                )
-                
-                combined_temporal_data.update(temporal_data)
-                combined_temporal_data.update(vaccination_states_data)
+                phase_results = phase_runner.run({
+                    "desglose_temporal": (
+                        AnalysisBreakdownTemporal().execute_temporal_breakdown_analysis,
+                        (data_source, matches, departamento, municipio, ips, corte_fecha, age_extractor)
+                    ),
+                    "temporal": (
+                        AnalysisTemporal().execute_temporal_analysis,
+                        (service, data_source, matches, departamento, municipio, ips)
+                    ),
+                    "vacunacion": (
+                        AnalysisVaccination().execute_vaccination_states_analysis,
+                        (data_source, matches, departamento, municipio, ips)
+                    )
+                })
+                phase_timings.update(phase_runner.last_timings)
+                temporal_breakdown_data = phase_results["desglose_temporal"]
+                combined_temporal_data.update(phase_results["temporal"])
+                combined_temporal_data.update(phase_results["vacunacion"])
             
             # Calcular totales y estadísticas
             totals_by_keyword = AnalysisNumeratorDenominator().calculate_totals_with_numerator_denominator(
@@ -433,11 +438,13 @@ class GenerateReport:
             log(f"✅ Reporte generado exitosamente con fecha: {corte_fecha}")
             
             # Construir reporte final
-            return AnalysisNumeratorDenominator().build_success_report_with_numerator_denominator(
+            report = AnalysisNumeratorDenominator().build_success_report_with_numerator_denominator(
                 filename, keywords, geographic_filters, items_with_numerator_denominator,
                 totals_by_keyword, combined_temporal_data, data_source, global_statistics,
                 corte_fecha, temporal_breakdown_data
             )
+            report["phase_timings"] = phase_timings
+            return report
             
         except Exception as e:
             log(f"❌ Error generando reporte: {e}")
@@ -445,6 +452,136 @@ class GenerateReport:
             traceback.print_exc()
             raise ValueError(f"Error en generación de reporte: {e}")
     
+    def generate_grouped_geographic_report(
+        self,
+        age_extractor,
+        data_source: str,
+        filename: str,
+        group_by: str,
+        keywords: Optional[List[str]] = None,
+        min_count: int = 0,
+        geographic_filters: Optional[Dict[str, Optional[str]]] = None,
+        corte_fecha: str = None,
+    ) -> Dict[str, Any]:
+        """Genera cobertura y semaforización para todos los miembros de un nivel geográfico"""
+        try:
+            if not corte_fecha:
+                raise ValueError("El parámetro 'corte_fecha' es obligatorio y debe venir desde el frontend")
+            
+            log(f"GENERANDO REPORTE AGRUPADO POR {group_by} con fecha: {corte_fecha}")
+            
+            geographic_filters = geographic_filters or {}
+            
+            _, matches = self._match_columns(data_source, keywords, age_extractor)
+            
+            if not matches:
+                return {
+                    **ReportEmpty().build_empty_report(filename, keywords, geographic_filters),
+                    "group_by": group_by,
+                    "groups": [],
+                    "total_groups": 0
+                }
+            
+            grouped = AnalysisGroupedGeography().execute_grouped_analysis(
+                data_source, matches, group_by,
+                geographic_filters.get('departamento'),
+                geographic_filters.get('municipio'),
+                geographic_filters.get('ips'),
+                min_count, corte_fecha, age_extractor
+            )
+            
+            log(f"✅ Reporte agrupado generado: {len(grouped['groups'])} grupos")
+            
+            return {
+                "success": True,
+                "filename": filename,
+                "corte_fecha": corte_fecha,
+                "group_by": group_by,
+                "rules": {"keywords": keywords or []},
+                "geographic_filters": geographic_filters,
+                "groups": grouped["groups"],
+                "total_groups": len(grouped["groups"]),
+                "total_activities": grouped["activities"],
+                "skipped_columns": grouped["skipped_columns"],
+                "engine": "DuckDB_Grouped_FilterAggregates",
+                "data_source_used": data_source,
+                "metodo": "REGISTROS_TOTALES_DATE_DIFF"
+            }
+            
+        except Exception as e:
+            log(f"❌ Error generando reporte agrupado: {e}")
+            import traceback
+            traceback.print_exc()
+            raise ValueError(f"Error en generación de reporte agrupado: {e}")
+    
+    def generate_trend_report(
+        self,
+        age_extractor,
+        data_source: str,
+        filename: str,
+        cortes: List[str],
+        keywords: Optional[List[str]] = None,
+        geographic_filters: Optional[Dict[str, Optional[str]]] = None,
+    ) -> Dict[str, Any]:
+        """Genera series de cobertura para varias fechas de corte en un solo escaneo"""
+        try:
+            trend_analysis = AnalysisMultiCutoffTrend()
+            cortes = trend_analysis.normalize_cortes(cortes or [])
+            
+            log(f"GENERANDO TENDENCIA para {len(cortes)} cortes: {cortes[0]} → {cortes[-1]}")
+            
+            geographic_filters = geographic_filters or {}
+            
+            _, matches = self._match_columns(data_source, keywords, age_extractor)
+            
+            trend = {"series": [], "skipped_columns": []}
+            if matches:
+                trend = trend_analysis.execute_trend_analysis(
+                    data_source, matches, cortes,
+                    geographic_filters.get('departamento'),
+                    geographic_filters.get('municipio'),
+                    geographic_filters.get('ips'),
+                    age_extractor
+                )
+            
+            log(f"✅ Tendencia generada: {len(trend['series'])} indicadores")
+            
+            return {
+                "success": True,
+                "filename": filename,
+                "cortes": cortes,
+                "rules": {"keywords": keywords or []},
+                "geographic_filters": geographic_filters,
+                "series": trend["series"],
+                "total_series": len(trend["series"]),
+                "skipped_columns": trend["skipped_columns"],
+                "engine": "DuckDB_MultiCorte_CrossJoin",
+                "data_source_used": data_source,
+                "metodo": "REGISTROS_TOTALES_DATE_DIFF"
+            }
+            
+        except Exception as e:
+            log(f"❌ Error generando tendencia: {e}")
+            import traceback
+            traceback.print_exc()
+            raise ValueError(f"Error en generación de tendencia: {e}")
+    
+    def _match_columns(self, data_source: str, keywords: Optional[List[str]], age_extractor) -> tuple:
+        """Matching de columnas desde el índice de clasificación; recorre regex solo sin índice"""
+        rules = [KeywordRule(name=k, synonyms=(k.lower(),)) for k in keywords] if keywords else None
+        service = ColumnKeywordReportService(keywords=rules)
+        
+        index = column_classification_service.get_index(data_source)
+        if index:
+            matches = column_classification_service.match_columns(index, keywords)
+            column_classification_service.seed_age_extractor(
+                index, age_extractor, [match['column'] for match in matches]
+            )
+            return service, matches
+        
+        columns = self._get_table_columns(data_source)
+        return service, service.match_columns(columns)
+    
     def _get_table_columns(self, data_source: str) -> List[str]:
         """Obtiene columnas de la tabla"""
         try:
@@ -0,0 +1,59 @@
+# services/technical_note_services/report_service_aux/parallel_phases.py
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from services.duckdb_service.duckdb_service import duckdb_service
+
+
+class ParallelReportPhases:
+    """
+    Ejecuta fases independientes del reporte al mismo tiempo. Cada fase corre
+    en su propio hilo con un cursor DuckDB dedicado (duckdb_service.conn lo
+    retorna mientras la fase se ejecuta), con un límite de concurrencia.
+    """
+
+    MAX_WORKERS = int(os.getenv("REPORT_MAX_PARALLEL_PHASES", "4"))
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max(1, max_workers or self.MAX_WORKERS)
+        self.last_timings: Dict[str, float] = {}
+
+    def _run_phase(self, func: Callable, args: Tuple) -> Tuple[Any, float]:
+        """Ejecuta una fase con un cursor propio y mide su duración"""
+        manager = duckdb_service.connection_manager
+        cursor = manager.conn.cursor()
+        manager.bind_thread_cursor(cursor)
+        start_time = time.time()
+        try:
+            return func(*args), round(time.time() - start_time, 3)
+        finally:
+            manager.unbind_thread_cursor()
+            cursor.close()
+
+    def run(self, phases: Dict[str, Tuple[Callable, Tuple]]) -> Dict[str, Any]:
+        """Ejecuta {nombre: (función, argumentos)} y retorna {nombre: resultado}"""
+        results: Dict[str, Any] = {}
+        self.last_timings = {}
+        start_time = time.time()
+
+        if self.max_workers == 1 or len(phases) <= 1:
+            for name, (func, args) in phases.items():
+                phase_start = time.time()
+                results[name] = func(*args)
+                self.last_timings[name] = round(time.time() - phase_start, 3)
+        else:
+            workers = min(self.max_workers, len(phases))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-phase") as pool:
+                # Cada fase hereda el contexto (perfil de consultas de la solicitud)
+                futures = {
+                    name: pool.submit(contextvars.copy_context().run, self._run_phase, func, args)
+                    for name, (func, args) in phases.items()
+                }
+                for name, future in futures.items():
+                    results[name], self.last_timings[name] = future.result()
+
+        total = round(time.time() - start_time, 3)
+        print(f"⚡ Fases del reporte ({len(phases)}, máx {self.max_workers} en paralelo): {self.last_timings} → {total}s")
+        return results
@@ -1,6 +1,7 @@
 # services/technical_note_services/report_service_aux/pdf_exporter.py
 import io
 import os
+import time
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
@@ -12,12 +13,27 @@ try:
     from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
     from reportlab.lib.enums import TA_CENTER
     from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
     print("ReportLab no disponible. Instalar con: pip install reportlab")
 
 
+# Imágenes de marca de agua ya decodificadas (una vez por proceso)
+_WATERMARK_READERS: Dict[str, Any] = {}
+
+
+def get_watermark_reader(image_path: str):
+    """Decodifica la imagen una sola vez y la reutiliza entre páginas y reportes"""
+    reader = _WATERMARK_READERS.get(image_path)
+    if reader is None:
+        reader = ImageReader(image_path)
+        reader.getRGBData()  # fuerza la decodificación ahora
+        _WATERMARK_READERS[image_path] = reader
+    return reader
+
+
 class NumberedCanvas(canvas.Canvas):
     """
     Canvas personalizado para agregar marca de agua (texto e imagen) y numeración en cada página
@@ -38,32 +54,53 @@ class NumberedCanvas(canvas.Canvas):
         
         canvas.Canvas.__init__(self, *args, **kwargs)
         self._saved_page_states = []
+        self.page_count = 0
     
     def showPage(self):
         """Sobrescribe showPage para agregar marca de agua antes de cada página"""
         self._saved_page_states.append(dict(self.__dict__))
         self._startPage()
     
+    WATERMARK_FORM = 'marca_agua'
+    
     def save(self):
         """Sobrescribe save para agregar marca de agua en todas las páginas"""
         num_pages = len(self._saved_page_states)
+        has_watermark = bool(self.watermark_image or self.watermark_text)
+        watermark_ready = False
+        
         for state in self._saved_page_states:
             self.__dict__.update(state)
             
-            # Dibujar imagen de marca de agua (si existe)
-            if self.watermark_image:
-                self.draw_watermark_image()
-            
-            # Dibujar texto de marca de agua (si existe)
-            if self.watermark_text:
-                self.draw_watermark_text()
+            # Marca de agua: se dibuja una vez y cada página la referencia
+            if has_watermark:
+                if not watermark_ready:
+                    self._define_watermark_form()
+                    watermark_ready = True
+                self.doForm(self.WATERMARK_FORM)
             
             # Dibujar footer
             self.draw_page_footer(self._pageNumber, num_pages)
             
             canvas.Canvas.showPage(self)
+        
+        self.page_count = num_pages
         canvas.Canvas.save(self)
     
+    def _define_watermark_form(self):
+        """Define la marca de agua (imagen + texto) como Form XObject reutilizable"""
+        self.beginForm(self.WATERMARK_FORM)
+        
+        # Dibujar imagen de marca de agua (si existe)
+        if self.watermark_image:
+            self.draw_watermark_image()
+        
+        # Dibujar texto de marca de agua (si existe)
+        if self.watermark_text:
+            self.draw_watermark_text()
+        
+        self.endForm()
+    
     def draw_watermark_image(self):
         """Dibuja imagen como marca de agua en la página"""
         if not self.watermark_image or not os.path.exists(self.watermark_image):
@@ -99,7 +136,7 @@ class NumberedCanvas(canvas.Canvas):
         try:
             self.setFillAlpha(self.watermark_opacity)
             self.drawImage(
-                self.watermark_image,
+                get_watermark_reader(self.watermark_image),
                 x, y,
                 width=self.image_width,
                 height=self.image_height,
@@ -198,6 +235,10 @@ class PDFExporter:
         self.image_height = image_height
         self.image_position = image_position
         
+        # Métricas del último render
+        self.last_page_count = 0
+        self.last_render_seconds = 0.0
+        
         # Validar que la imagen exista si se proporcionó
         if self.watermark_image and not os.path.exists(self.watermark_image):
             print(f"Imagen de marca de agua no encontrada: {self.watermark_image}")
@@ -243,6 +284,8 @@ class PDFExporter:
             
             print(f"📄 Generando PDF en memoria con {watermark_desc}: {len(items)} actividades")
             
+            start_time = time.time()
+            
             # Crear buffer en memoria
             pdf_buffer = io.BytesIO()
             
@@ -269,9 +312,10 @@ class PDFExporter:
                 self._add_temporal_analysis(elements, report_data)
             
             # Generar PDF con canvas personalizado (marca de agua)
-            doc.build(
-                elements,
-                canvasmaker=lambda *args, **kwargs: NumberedCanvas(
+            canvases = []
+            
+            def make_canvas(*args, **kwargs):
+                numbered_canvas = NumberedCanvas(
                     *args,
                     watermark_text=self.watermark_text,
                     watermark_image=self.watermark_image,
@@ -283,12 +327,21 @@ class PDFExporter:
                     image_position=self.image_position,
                     **kwargs
                 )
-            )
+                canvases.append(numbered_canvas)
+                return numbered_canvas
+            
+            doc.build(elements, canvasmaker=make_canvas)
+            
+            self.last_page_count = canvases[-1].page_count if canvases else 0
+            self.last_render_seconds = round(time.time() - start_time, 3)
             
             # Mover puntero al inicio
             pdf_buffer.seek(0)
             
-            print(f"PDF con {watermark_desc} generado en memoria")
+            print(
+                f"PDF con {watermark_desc} generado en memoria: "
+                f"{self.last_page_count} páginas en {self.last_render_seconds}s"
+            )
             return pdf_buffer
             
         except Exception as e:
@@ -0,0 +1,175 @@
+# services/technical_note_services/report_service_aux/pdf_render_pool.py
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from services.technical_note_services.report_service_aux.pdf_exporter import PDFExporter
+
+
+# Exportador por proceso: la marca de agua se decodifica una vez y se reutiliza entre trabajos
+_worker_exporter: Optional[PDFExporter] = None
+
+
+def render_pdf_job(
+    report_data: Dict[str, Any],
+    include_temporal: bool,
+    exporter_config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Renderiza el PDF en el proceso de trabajo y retorna bytes y métricas"""
+    global _worker_exporter
+    if _worker_exporter is None:
+        _worker_exporter = PDFExporter(**exporter_config)
+
+    pdf_buffer = _worker_exporter.export_report(report_data, include_temporal)
+    if pdf_buffer is None:
+        raise ValueError("PDF no generado")
+
+    return {
+        'content': pdf_buffer.getvalue(),
+        'pages': _worker_exporter.last_page_count,
+        'render_seconds': _worker_exporter.last_render_seconds
+    }
+
+
+class PdfRenderPool:
+    """
+    Pool de procesos para renderizar PDFs fuera del hilo de la petición.
+    Cada trabajo recibe un job_id; su estado y métricas se consultan mientras
+    el PDF se genera en otro núcleo.
+    """
+
+    MAX_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+
+    def __init__(self, exporter_config: Dict[str, Any], max_workers: Optional[int] = None):
+        self.exporter_config = exporter_config
+        self.max_workers = max(1, max_workers or self.MAX_WORKERS)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self.metrics = {
+            'jobs_submitted': 0,
+            'jobs_completed': 0,
+            'jobs_failed': 0,
+            'pages_rendered': 0,
+            'render_seconds_total': 0.0,
+            'max_render_seconds': 0.0
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Crea el pool al primer uso (spawn: los procesos no heredan DuckDB)"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                print(f"🖨️ Pool de PDF iniciado con {self.max_workers} procesos")
+            return self._executor
+
+    def submit(
+        self,
+        report_data: Dict[str, Any],
+        include_temporal: bool = True,
+        on_done: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> str:
+        """Encola el render y retorna el job_id; on_done recibe (job_id, resultado)"""
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self.jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'pending',
+                'submitted_at': datetime.now(),
+                'finished_at': None,
+                'pages': None,
+                'render_seconds': None,
+                'error': None
+            }
+            self.metrics['jobs_submitted'] += 1
+
+        future = self._get_executor().submit(
+            render_pdf_job, report_data, include_temporal, self.exporter_config
+        )
+        with self._lock:
+            self._futures[job_id] = future
+
+        submitted = time.time()
+
+        def _finish(done_future: Future):
+            try:
+                result = done_future.result()
+                if on_done:
+                    on_done(job_id, result)
+            except Exception as e:
+                print(f"❌ Error renderizando PDF {job_id}: {e}")
+                with self._lock:
+                    self.jobs[job_id].update(status='error', error=str(e), finished_at=datetime.now())
+                    self.metrics['jobs_failed'] += 1
+                return
+
+            with self._lock:
+                self.jobs[job_id].update(
+                    status='done',
+                    pages=result['pages'],
+                    render_seconds=result['render_seconds'],
+                    finished_at=datetime.now()
+                )
+                self.metrics['jobs_completed'] += 1
+                self.metrics['pages_rendered'] += result['pages']
+                self.metrics['render_seconds_total'] = round(
+                    self.metrics['render_seconds_total'] + result['render_seconds'], 3
+                )
+                self.metrics['max_render_seconds'] = max(
+                    self.metrics['max_render_seconds'], result['render_seconds']
+                )
+            print(
+                f"🖨️ PDF {job_id}: {result['pages']} páginas, render {result['render_seconds']}s, "
+                f"total {round(time.time() - submitted, 3)}s"
+            )
+
+        future.add_done_callback(_finish)
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_future(self, job_id: str) -> Optional[Future]:
+        with self._lock:
+            return self._futures.get(job_id)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(1 for job in self.jobs.values() if job['status'] == 'pending')
+            metrics = dict(self.metrics)
+        completed = metrics['jobs_completed']
+        metrics.update({
+            'jobs_pending': pending,
+            'max_workers': self.max_workers,
+            'avg_render_seconds': round(metrics['render_seconds_total'] / completed, 3) if completed else 0.0,
+            'avg_pages': round(metrics['pages_rendered'] / completed, 1) if completed else 0.0
+        })
+        return metrics
+
+    def cleanup_jobs(self, max_age_minutes: int = 30):
+        """Olvida trabajos terminados más antiguos que max_age_minutes"""
+        now = datetime.now()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job['finished_at'] and (now - job['finished_at']).total_seconds() > max_age_minutes * 60
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+                self._futures.pop(job_id, None)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
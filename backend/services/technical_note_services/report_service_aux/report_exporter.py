@@ -1,7 +1,6 @@
 # services/technical_note_services/report_service_aux/report_exporter.py
-import io
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Any, Dict, Optional
 try:
     from reportlab.lib.units import inch
@@ -10,37 +9,39 @@ except ImportError:
     inch = 72  # 1 pulgada = 72 puntos
 from services.technical_note_services.report_service_aux.csv_exporter import CSVExporter
 from services.technical_note_services.report_service_aux.pdf_exporter import PDFExporter
+from services.technical_note_services.report_service_aux.pdf_render_pool import PdfRenderPool
+from services.technical_note_services.report_service_aux.temp_artifact_store import TempArtifactStore
 
 
 class ReportExporter:
     """
-    ORQUESTADOR DE EXPORTACIÓN EN MEMORIA (SIN ARCHIVOS TEMPORALES)
+    ORQUESTADOR DE EXPORTACIÓN
     
     Responsabilidades:
-    - Coordina exportación de CSV y PDF en memoria
-    - Gestiona archivos en memoria con registro temporal
+    - Coordina exportación de CSV y PDF
+    - Registra los archivos en un almacén temporal con presupuesto de memoria
+      (los grandes o menos usados pasan a disco, todos expiran por TTL)
     - Provee enlaces de descarga
-    
-    Ventajas en producción:
-    - No depende de rutas del sistema operativo
-    - No deja archivos huérfanos en disco
-    - Funciona en cualquier entorno (Windows, Linux, Docker, etc.)
     """
     
     def __init__(self):
         """Inicializa el orquestador"""
-        self.temp_files_registry: Dict[str, Dict[str, Any]] = {}
+        self.temp_store = TempArtifactStore()
         
         # Inyección de dependencias
         self.csv_exporter = CSVExporter(separator=';', encoding='latin1')
-        self.pdf_exporter = PDFExporter(
-            watermark_image="assets/mallamas.png",
-            watermark_opacity=0.1,
-            image_width=6 * inch,
-            image_height=6 * inch,
-            image_position='center',
-            show_page_numbers=True
-        )
+        self.pdf_config = {
+            'watermark_image': "assets/mallamas.png",
+            'watermark_opacity': 0.1,
+            'image_width': 6 * inch,
+            'image_height': 6 * inch,
+            'image_position': 'center',
+            'show_page_numbers': True
+        }
+        self.pdf_exporter = PDFExporter(**self.pdf_config)
+        
+        # Render de PDF en procesos aparte (no bloquea el worker de la API)
+        self.pdf_pool = PdfRenderPool(self.pdf_config)
     
     def export_report(
         self,
@@ -118,14 +119,9 @@ class ReportExporter:
         
         if csv_buffer:
             file_id = str(uuid.uuid4())
-            self.temp_files_registry[file_id] = {
-                'content': csv_buffer,
-                'filename': f"{base_filename}_temporal.csv",
-                'content_type': 'text/csv',
-                'created_at': datetime.now()
-            }
+            self.temp_store.put(file_id, csv_buffer, f"{base_filename}_temporal.csv", 'text/csv')
             
-            print(f"CSV generado en memoria: ID={file_id}")
+            print(f"CSV generado: ID={file_id}")
             
             return {
                 'files': {'csv_temporal': file_id},
@@ -146,14 +142,9 @@ class ReportExporter:
         
         if pdf_buffer:
             file_id = str(uuid.uuid4())
-            self.temp_files_registry[file_id] = {
-                'content': pdf_buffer,
-                'filename': f"{base_filename}.pdf",
-                'content_type': 'application/pdf',
-                'created_at': datetime.now()
-            }
+            self.temp_store.put(file_id, pdf_buffer, f"{base_filename}.pdf", 'application/pdf')
             
-            print(f"PDF generado en memoria: ID={file_id}")
+            print(f"PDF generado: ID={file_id}")
             
             return {
                 'files': {'pdf': file_id},
@@ -163,39 +154,70 @@ class ReportExporter:
         print("PDF no generado")
         return None
     
+    def submit_pdf_job(
+        self,
+        report_data: Dict[str, Any],
+        base_filename: str = "reporte",
+        include_temporal: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Encola el PDF en el pool de procesos. Al terminar, el archivo queda
+        registrado con el mismo job_id, así el enlace de descarga se conoce
+        desde el inicio.
+        """
+        def _register(job_id: str, result: Dict[str, Any]):
+            self.temp_store.put(job_id, result['content'], f"{base_filename}.pdf", 'application/pdf')
+        
+        job_id = self.pdf_pool.submit(report_data, include_temporal, on_done=_register)
+        print(f"PDF encolado: job={job_id}")
+        
+        return {
+            'job_id': job_id,
+            'status': 'pending',
+            'status_link': f"/technical-note/reports/pdf-jobs/{job_id}",
+            'download_link': f"/technical-note/reports/download/{job_id}"
+        }
+    
+    def get_pdf_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado del trabajo de PDF con su enlace de descarga cuando termina"""
+        job = self.pdf_pool.get_job(job_id)
+        if job and job['status'] == 'done':
+            job['download_link'] = f"/technical-note/reports/download/{job_id}"
+        return job
+    
+    def get_pdf_metrics(self) -> Dict[str, Any]:
+        return self.pdf_pool.get_metrics()
+    
     def get_temp_file(self, file_id: str) -> Optional[Dict[str, Any]]:
         """
-        Obtiene archivo en memoria por ID
+        Obtiene archivo exportado por ID
         
         Args:
             file_id: UUID del archivo
             
         Returns:
-            Diccionario con content (BytesIO), filename y content_type
+            Diccionario con filename, content_type, size y 'data' (bytes en
+            memoria) o 'path' (archivo en disco); None si no existe o expiró
         """
-        return self.temp_files_registry.get(file_id)
+        return self.temp_store.get(file_id)
+    
+    def get_storage_stats(self) -> Dict[str, Any]:
+        return self.temp_store.get_stats()
     
     def cleanup_old_temp_files(self, max_age_minutes: int = 30):
         """
-        Limpia archivos en memoria antiguos
+        Limpia archivos exportados antiguos
         
         Args:
             max_age_minutes: Edad máxima en minutos antes de eliminar
         """
         try:
-            now = datetime.now()
-            to_delete = []
-            
-            for file_id, file_info in self.temp_files_registry.items():
-                age = now - file_info['created_at']
-                if age > timedelta(minutes=max_age_minutes):
-                    to_delete.append(file_id)
+            expired = self.temp_store.cleanup_expired(max_age_minutes)
             
-            for file_id in to_delete:
-                del self.temp_files_registry[file_id]
+            if expired:
+                print(f"🗑️ Limpieza: {expired} archivos exportados eliminados")
             
-            if to_delete:
-                print(f"🗑️ Limpieza: {len(to_delete)} archivos en memoria eliminados")
+            self.pdf_pool.cleanup_jobs(max_age_minutes)
                 
         except Exception as e:
             print(f"Error en limpieza: {e}")
@@ -0,0 +1,225 @@
+# services/technical_note_services/report_service_aux/temp_artifact_store.py
+import atexit
+import io
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Union
+
+
+class TempArtifactStore:
+    """
+    Almacén temporal de archivos exportados (CSV/PDF) con presupuesto de memoria.
+
+    - Los archivos pequeños quedan en memoria; los grandes se escriben a disco
+    - Si la memoria supera el presupuesto, los menos usados se pasan a disco
+    - Cada archivo expira por TTL
+    """
+
+    MEMORY_BUDGET_BYTES = int(os.getenv("REPORT_STORE_MEMORY_MB", "128")) * 1024 * 1024
+    SPILL_THRESHOLD_BYTES = int(os.getenv("REPORT_STORE_SPILL_MB", "4")) * 1024 * 1024
+    TTL_MINUTES = int(os.getenv("REPORT_STORE_TTL_MINUTES", "30"))
+
+    def __init__(
+        self,
+        memory_budget_bytes: Optional[int] = None,
+        spill_threshold_bytes: Optional[int] = None,
+        ttl_minutes: Optional[int] = None,
+        spill_dir: Optional[str] = None
+    ):
+        self.memory_budget_bytes = memory_budget_bytes if memory_budget_bytes is not None else self.MEMORY_BUDGET_BYTES
+        self.spill_threshold_bytes = spill_threshold_bytes if spill_threshold_bytes is not None else self.SPILL_THRESHOLD_BYTES
+        self.ttl_minutes = ttl_minutes if ttl_minutes is not None else self.TTL_MINUTES
+
+        # Directorio propio por proceso: varios workers no se pisan los archivos
+        base_dir = spill_dir or os.getenv("REPORT_STORE_DIR") or None
+        if base_dir:
+            os.makedirs(base_dir, exist_ok=True)
+        self.spill_dir = tempfile.mkdtemp(prefix="reportes_", dir=base_dir)
+        atexit.register(shutil.rmtree, self.spill_dir, True)
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.counters = {
+            'stored': 0,
+            'spilled_on_write': 0,
+            'spilled_by_budget': 0,
+            'expired': 0,
+            'deleted': 0
+        }
+
+    # ========== ESCRITURA ==========
+
+    def put(
+        self,
+        file_id: str,
+        content: Union[bytes, io.BytesIO],
+        filename: str,
+        content_type: str
+    ) -> Dict[str, Any]:
+        """Registra un archivo; retorna su metadata (sin contenido)"""
+        data = content.getvalue() if isinstance(content, io.BytesIO) else bytes(content)
+
+        with self._lock:
+            self._remove(file_id)
+
+            entry = {
+                'file_id': file_id,
+                'filename': filename,
+                'content_type': content_type,
+                'size': len(data),
+                'created_at': datetime.now(),
+                'data': None,
+                'path': None
+            }
+
+            if len(data) >= self.spill_threshold_bytes:
+                self._write_to_disk(entry, data)
+                self.counters['spilled_on_write'] += 1
+            else:
+                entry['data'] = data
+                self.memory_bytes += entry['size']
+
+            self._entries[file_id] = entry
+            self.counters['stored'] += 1
+            self._enforce_budget()
+
+            return self._public(entry)
+
+    def _write_to_disk(self, entry: Dict[str, Any], data: bytes):
+        path = os.path.join(self.spill_dir, f"{entry['file_id']}.bin")
+        with open(path, 'wb') as f:
+            f.write(data)
+        entry['path'] = path
+        entry['data'] = None
+        self.disk_bytes += entry['size']
+
+    def _enforce_budget(self):
+        """Pasa a disco los archivos en memoria menos usados hasta cumplir el presupuesto"""
+        if self.memory_bytes <= self.memory_budget_bytes:
+            return
+
+        for entry in list(self._entries.values()):
+            if self.memory_bytes <= self.memory_budget_bytes:
+                break
+            if entry['data'] is None:
+                continue
+            data = entry['data']
+            self.memory_bytes -= entry['size']
+            self._write_to_disk(entry, data)
+            self.counters['spilled_by_budget'] += 1
+
+    # ========== LECTURA ==========
+
+    def _is_expired(self, entry: Dict[str, Any], ttl_minutes: Optional[int] = None) -> bool:
+        ttl = self.ttl_minutes if ttl_minutes is None else ttl_minutes
+        return datetime.now() - entry['created_at'] > timedelta(minutes=ttl)
+
+    def _public(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        info = {key: value for key, value in entry.items() if key != 'data'}
+        info['in_memory'] = entry['data'] is not None
+        return info
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna metadata del archivo con 'path' (en disco) o 'data' (bytes en memoria).
+        None si no existe o ya expiró.
+        """
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is None:
+                return None
+            if self._is_expired(entry):
+                self._remove(file_id)
+                self.counters['expired'] += 1
+                return None
+
+            self._entries.move_to_end(file_id)
+            info = self._public(entry)
+            info['data'] = entry['data']
+            return info
+
+    def export_to(self, file_id: str, directory: str) -> Optional[str]:
+        """Mueve el archivo a directory/filename y lo retira del almacén"""
+        with self._lock:
+            info = self.get(file_id)
+            if info is None:
+                return None
+
+            target = os.path.join(directory, info['filename'])
+            if info['data'] is not None:
+                with open(target, 'wb') as f:
+                    f.write(info['data'])
+                self._remove(file_id)
+            else:
+                self.disk_bytes -= info['size']
+                del self._entries[file_id]
+                shutil.move(info['path'], target)
+            return target
+
+    # ========== LIMPIEZA ==========
+
+    def _remove(self, file_id: str) -> bool:
+        entry = self._entries.pop(file_id, None)
+        if entry is None:
+            return False
+
+        if entry['data'] is not None:
+            self.memory_bytes -= entry['size']
+        elif entry['path']:
+            self.disk_bytes -= entry['size']
+            try:
+                os.remove(entry['path'])
+            except OSError:
+                pass
+        return True
+
+    def delete(self, file_id: str) -> bool:
+        with self._lock:
+            removed = self._remove(file_id)
+            if removed:
+                self.counters['deleted'] += 1
+            return removed
+
+    def cleanup_expired(self, ttl_minutes: Optional[int] = None) -> int:
+        """Elimina los archivos más antiguos que el TTL"""
+        with self._lock:
+            expired = [
+                file_id for file_id, entry in self._entries.items()
+                if self._is_expired(entry, ttl_minutes)
+            ]
+            for file_id in expired:
+                self._remove(file_id)
+            self.counters['expired'] += len(expired)
+            return len(expired)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            for file_id in list(self._entries.keys()):
+                self._remove(file_id)
+            self.counters['deleted'] += count
+            return count
+
+    # ========== ESTADÍSTICAS ==========
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            memory_entries = sum(1 for entry in self._entries.values() if entry['data'] is not None)
+            return {
+                'entries': len(self._entries),
+                'memory_entries': memory_entries,
+                'disk_entries': len(self._entries) - memory_entries,
+                'memory_bytes': self.memory_bytes,
+                'disk_bytes': self.disk_bytes,
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'spill_threshold_bytes': self.spill_threshold_bytes,
+                'ttl_minutes': self.ttl_minutes,
+                'spill_dir': self.spill_dir,
+                **self.counters
+            }
@@ -1,140 +1,262 @@
-import pandas as pd
+# services/transformation_service.py
 import re
+from typing import List, Optional, Tuple
 from models.schemas import TransformOperation
+from utils.sql_utils import SQLUtils
+
+NUMERIC_TYPES = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "UTINYINT", "USMALLINT",
+                 "UINTEGER", "UBIGINT", "FLOAT", "DOUBLE", "DECIMAL")
+
+# Números, columnas (simples o entre `backticks`, como en pandas.eval) y operadores aritméticos
+EXPRESSION_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|`([^`]+)`|([^\W\d]\w*)|([-+*/%()]))", re.UNICODE)
+
+sql_utils = SQLUtils()
+
 
 class TransformationService:
+    """
+    Traduce cada transformación a la lista SELECT que produce la nueva versión
+    de las columnas. Las capas se apilan como vistas sobre el Parquet, sin
+    cargar ni copiar el DataFrame.
+    """
+
     @staticmethod
-    def apply_transformation(df: pd.DataFrame, operation: TransformOperation, params: dict) -> pd.DataFrame:
-        """Aplica una transformación específica al DataFrame"""
+    def build_projection(columns: List[Tuple[str, str]], operation: TransformOperation, params: dict) -> List[str]:
+        """Retorna las expresiones SELECT (con alias) de la transformación sobre columns [(nombre, tipo)]"""
         if operation == TransformOperation.CONCATENATE:
-            return TransformationService._concatenate_columns(df, params)
+            return TransformationService._concatenate_columns(columns, params)
         elif operation == TransformOperation.SPLIT_COLUMN:
-            return TransformationService._split_column(df, params)
+            return TransformationService._split_column(columns, params)
         elif operation == TransformOperation.REPLACE_VALUES:
-            return TransformationService._replace_values(df, params)
+            return TransformationService._replace_values(columns, params)
         elif operation == TransformOperation.CREATE_CALCULATED:
-            return TransformationService._create_calculated_column(df, params)
+            return TransformationService._create_calculated_column(columns, params)
         elif operation == TransformOperation.RENAME_COLUMN:
-            return TransformationService._rename_column(df, params)
+            return TransformationService._rename_column(columns, params)
         elif operation == TransformOperation.DELETE_COLUMN:
-            return TransformationService._delete_column(df, params)
+            return TransformationService._delete_column(columns, params)
         elif operation == TransformOperation.FILL_NULL:
-            return TransformationService._fill_null(df, params)
+            return TransformationService._fill_null(columns, params)
         elif operation == TransformOperation.TO_UPPERCASE:
-            return TransformationService._to_uppercase(df, params)
+            return TransformationService._to_uppercase(columns, params)
         elif operation == TransformOperation.TO_LOWERCASE:
-            return TransformationService._to_lowercase(df, params)
+            return TransformationService._to_lowercase(columns, params)
         elif operation == TransformOperation.EXTRACT_SUBSTRING:
-            return TransformationService._extract_substring(df, params)
-        elif operation == TransformOperation.VLOOKUP:
-            return TransformationService._vlookup(df, params)
+            return TransformationService._extract_substring(columns, params)
         else:
             raise ValueError(f"Operación no soportada: {operation}")
-    
+
+    # ========== AUXILIARES ==========
+
+    @staticmethod
+    def _column(columns: List[Tuple[str, str]], name: Optional[str]) -> Tuple[str, str]:
+        """Retorna (identificador escapado, tipo) de una columna existente"""
+        for column, column_type in columns:
+            if column == name:
+                return sql_utils.escape_identifier(column), column_type
+        raise ValueError(f"Columna no encontrada: {name}")
+
+    @staticmethod
+    def _with_column(columns: List[Tuple[str, str]], name: str, expression: str) -> List[str]:
+        """Reemplaza la columna en su posición o la agrega al final (como df[name] = ...)"""
+        alias = sql_utils.escape_identifier(name)
+        projection = [
+            f"{expression} AS {alias}" if column == name else sql_utils.escape_identifier(column)
+            for column, _ in columns
+        ]
+        if name not in [column for column, _ in columns]:
+            projection.append(f"{expression} AS {alias}")
+        return projection
+
+    @staticmethod
+    def _typed_literal(column_type: str, value) -> Optional[str]:
+        """Literal SQL del tipo de la columna, o None si el valor no es compatible"""
+        if value is None:
+            return "NULL"
+        if column_type.startswith(NUMERIC_TYPES):
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                return None
+            return f"CAST({sql_utils.escape_sql_value(value)} AS {column_type})"
+        if column_type == "VARCHAR":
+            return sql_utils.escape_sql_value(value)
+        return None
+
+    @staticmethod
+    def _as_text(escaped_column: str) -> str:
+        return f"CAST({escaped_column} AS VARCHAR)"
+
+    # ========== TRANSFORMACIONES ==========
+
     @staticmethod
-    def _concatenate_columns(df: pd.DataFrame, params: dict) -> pd.DataFrame:
-        """Concatena múltiples columnas"""
-        columns = params.get("columns", [])
+    def _concatenate_columns(columns: List[Tuple[str, str]], params: dict) -> List[str]:
+        """Concatena múltiples columnas (nulos como texto vacío)"""
+        source_columns = params.get("columns", [])
         new_column = params.get("new_column", "concatenated")
-        separator = params.get("separator", "_")
-        
-        df[new_column] = df[columns].astype(str).agg(separator.join, axis=1)
-        return df
-    
-    @staticmethod
-    def _split_column(df: pd.DataFrame, params: dict) -> pd.DataFrame:
-        """Divide una columna en múltiples columnas"""
-        column = params.get("column")
-        separator = params.get("separator", ";")
-        new_columns = params.get("new_columns", [])
-        
-        split_data = df[column].astype(str).str.split(separator, expand=True)
-        for i, new_col in enumerate(new_columns):
-            if i < split_data.shape[1]:
-                df[new_col] = split_data[i]
-        
-        return df
-    
-    @staticmethod
-    def _replace_values(df: pd.DataFrame, params: dict) -> pd.DataFrame:
-        """Reemplaza valores en una columna"""
-        column = params.get("column")
+        separator = sql_utils.escape_sql_value(params.get("separator", "_"))
+
+        if not source_columns:
+            raise ValueError("Debe indicar las columnas a concatenar")
+        parts = [
+            f"COALESCE({TransformationService._as_text(TransformationService._column(columns, col)[0])}, '')"
+            for col in source_columns
+        ]
+        return TransformationService._with_column(columns, new_column, f" || {separator} || ".join(parts))
+
+    @staticmethod
+    def _split_column(columns: List[Tuple[str, str]], params: dict) -> List[str]:
+        """Divide una columna en múltiples columnas (piezas faltantes quedan nulas)"""
+        column, _ = TransformationService._column(columns, params.get("column"))
+        separator = sql_utils.escape_sql_value(params.get("separator", ";"))
+        pieces = {
+            new_col: f"string_split({TransformationService._as_text(column)}, {separator})[{i + 1}]"
+            for i, new_col in enumerate(params.get("new_columns", []))
+        }
+
+        existing = [name for name, _ in columns]
+        projection = [
+            f"{pieces[name]} AS {sql_utils.escape_identifier(name)}" if name in pieces
+            else sql_utils.escape_identifier(name)
+            for name in existing
+        ]
+        projection += [
+            f"{expression} AS {sql_utils.escape_identifier(name)}"
+            for name, expression in pieces.items() if name not in existing
+        ]
+        return projection
+
+    @staticmethod
+    def _replace_values(columns: List[Tuple[str, str]], params: dict) -> List[str]:
+        """Reemplaza valores exactos en una columna"""
+        column, column_type = TransformationService._column(columns, params.get("column"))
         old_value = params.get("old_value")
         new_value = params.get("new_value")
-        
-        df[column] = df[column].replace(old_value, new_value)
-        return df
-    
+
+        old_literal = TransformationService._typed_literal(column_type, old_value)
+        if old_value is None:
+            condition = f"{column} IS NULL"
+        elif old_literal is not None:
+            condition = f"{column} = {old_literal}"
+        else:
+            condition = f"{TransformationService._as_text(column)} = {sql_utils.escape_sql_value(old_value)}"
+
+        new_literal = TransformationService._typed_literal(column_type, new_value)
+        if new_literal is not None:
+            expression = f"CASE WHEN {condition} THEN {new_literal} ELSE {column} END"
+        else:
+            # El nuevo valor no cabe en el tipo de la columna: pasa a texto
+            expression = (
+                f"CASE WHEN {condition} THEN {sql_utils.escape_sql_value(new_value)} "
+                f"ELSE {TransformationService._as_text(column)} END"
+            )
+        return TransformationService._with_column(columns, params.get("column"), expression)
+
     @staticmethod
-    def _create_calculated_column(df: pd.DataFrame, params: dict) -> pd.DataFrame:
-        """Crea una columna calculada basada en una expresión"""
+    def _create_calculated_column(columns: List[Tuple[str, str]], params: dict) -> List[str]:
+        """Crea una columna calculada con una expresión aritmética (Ej: "col1 + col2")"""
         new_column = params.get("new_column")
-        expression = params.get("expression")  # Ej: "col1 + col2"
-        
-        try:
-            # Evaluación segura de expresiones matemáticas básicas
-            df[new_column] = df.eval(expression)
-        except Exception:
-            df[new_column] = None
-        
-        return df
-    
-    @staticmethod
-    def _rename_column(df: pd.DataFrame, params: dict) -> pd.DataFrame:
+        if not new_column:
+            raise ValueError("Debe indicar el nombre de la nueva columna")
+
+        expression = TransformationService._translate_expression(columns, params.get("expression") or "")
+        # Expresión no válida: columna nula, igual que el comportamiento anterior con df.eval
+        return TransformationService._with_column(columns, new_column, expression or "NULL")
+
+    @staticmethod
+    def _translate_expression(columns: List[Tuple[str, str]], expression: str) -> Optional[str]:
+        """Solo números, columnas existentes y + - * / % ( ); cualquier otra cosa invalida la expresión"""
+        names = {name for name, _ in columns}
+        tokens, position = [], 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = EXPRESSION_TOKEN.match(expression, position)
+            if not match:
+                return None
+            number, quoted, name, operator = match.groups()
+            if number or operator:
+                tokens.append(number or operator)
+            else:
+                column = quoted or name
+                if column not in names:
+                    return None
+                tokens.append(sql_utils.escape_identifier(column))
+            position = match.end()
+        return f"({' '.join(tokens)})" if tokens else None
+
+    @staticmethod
+    def _rename_column(columns: List[Tuple[str, str]], params: dict) -> List[str]:
         """Renombra una columna"""
         old_name = params.get("old_name")
         new_name = params.get("new_name")
-        
-        df = df.rename(columns={old_name: new_name})
-        return df
-    
+        TransformationService._column(columns, old_name)
+        if not new_name:
+            raise ValueError("Debe indicar el nuevo nombre de la columna")
+
+        return [
+            f"{sql_utils.escape_identifier(name)} AS {sql_utils.escape_identifier(new_name)}"
+            if name == old_name else sql_utils.escape_identifier(name)
+            for name, _ in columns
+        ]
+
     @staticmethod
-    def _delete_column(df: pd.DataFrame, params: dict) -> pd.DataFrame:
-        """Elimina una columna"""
+    def _delete_column(columns: List[Tuple[str, str]], params: dict) -> List[str]:
+        """Elimina una columna (sin error si no existe)"""
         column = params.get("column")
-        
-        if column in df.columns:
-            df = df.drop(columns=[column])
-        
-        return df
-    
-    @staticmethod
-    def _fill_null(df: pd.DataFrame, params: dict) -> pd.DataFrame:
+        projection = [sql_utils.escape_identifier(name) for name, _ in columns if name != column]
+        if not projection:
+            raise ValueError("No se puede eliminar la única columna del archivo")
+        return projection
+
+    @staticmethod
+    def _fill_null(columns: List[Tuple[str, str]], params: dict) -> List[str]:
         """Llena valores nulos"""
-        column = params.get("column")
+        column, column_type = TransformationService._column(columns, params.get("column"))
         fill_value = params.get("fill_value", "")
-        
-        df[column] = df[column].fillna(fill_value)
-        return df
-    
+
+        fill_literal = TransformationService._typed_literal(column_type, fill_value)
+        if fill_literal is not None:
+            expression = f"COALESCE({column}, {fill_literal})"
+        else:
+            expression = f"COALESCE({TransformationService._as_text(column)}, {sql_utils.escape_sql_value(fill_value)})"
+        return TransformationService._with_column(columns, params.get("column"), expression)
+
     @staticmethod
-    def _to_uppercase(df: pd.DataFrame, params: dict) -> pd.DataFrame:
+    def _to_uppercase(columns: List[Tuple[str, str]], params: dict) -> List[str]:
         """Convierte texto a mayúsculas"""
-        column = params.get("column")
-        
-        df[column] = df[column].astype(str).str.upper()
-        return df
-    
+        column, _ = TransformationService._column(columns, params.get("column"))
+        return TransformationService._with_column(
+            columns, params.get("column"), f"upper({TransformationService._as_text(column)})"
+        )
+
     @staticmethod
-    def _to_lowercase(df: pd.DataFrame, params: dict) -> pd.DataFrame:
+    def _to_lowercase(columns: List[Tuple[str, str]], params: dict) -> List[str]:
         """Convierte texto a minúsculas"""
-        column = params.get("column")
-        
-        df[column] = df[column].astype(str).str.lower()
-        return df
-    
+        column, _ = TransformationService._column(columns, params.get("column"))
+        return TransformationService._with_column(
+            columns, params.get("column"), f"lower({TransformationService._as_text(column)})"
+        )
+
     @staticmethod
-    def _extract_substring(df: pd.DataFrame, params: dict) -> pd.DataFrame:
-        """Extrae substring usando posiciones o regex"""
-        column = params.get("column")
+    def _extract_substring(columns: List[Tuple[str, str]], params: dict) -> List[str]:
+        """Extrae substring usando posiciones (como str[start:end]) o regex"""
+        column, _ = TransformationService._column(columns, params.get("column"))
         new_column = params.get("new_column")
-        start = params.get("start", 0)
+        start = int(params.get("start") or 0)
         end = params.get("end")
         pattern = params.get("pattern")  # Regex pattern
-        
+        text = TransformationService._as_text(column)
+
         if pattern:
-            df[new_column] = df[column].astype(str).str.extract(pattern)[0]
+            # Como str.extract: primer grupo de captura; sin coincidencia, nulo
+            group = 1 if re.compile(pattern).groups else 0
+            expression = f"NULLIF(regexp_extract({text}, {sql_utils.escape_sql_value(pattern)}, {group}), '')"
         else:
-            df[new_column] = df[column].astype(str).str[start:end]
-        
-        return df
+            # Slicing de Python (0-based, fin exclusivo) a DuckDB (1-based, fin inclusivo)
+            begin = start + 1 if start >= 0 else start
+            if end is None:
+                expression = f"{text}[{begin}:]"
+            else:
+                end = int(end)
+                expression = f"array_slice({text}, {begin}, {end if end >= 0 else end - 1})"
+        return TransformationService._with_column(columns, new_column, expression)
@@ -6,6 +6,7 @@ import sys
 import os
 from fastapi.testclient import TestClient
 from io import BytesIO
+import pyarrow.parquet as pq
 
 # Agregar el directorio raíz al path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -183,6 +184,329 @@ class TestCruceArchivos(unittest.TestCase):
         except ImportError:
             self.skipTest("openpyxl no está instalado")
     
+    def test_CA_03(self):
+        """CA-03: El resultado del cruce queda registrado y se pagina con /data"""
+        payload = {
+            "file1_key": self.file1_id,
+            "file2_key": self.file2_id,
+            "key_column_file1": "documento",
+            "key_column_file2": "num_documento",
+            "cross_type": "left",
+            "columns_to_include": {
+                "file1_columns": ["documento", "nombre"],
+                "file2_columns": ["diagnostico"]
+            },
+            "preview_rows": 1
+        }
+        response = client.post("/api/v1/cross", json=payload)
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+
+        self.assertIn("result_id", data)
+        self.assertEqual(data["total_rows"], 3)
+        self.assertEqual(len(data["data"]), 1)
+        self.assertTrue(data["has_more"])
+        self.assertEqual(data["statistics"]["matched_rows"], 2)
+        self.assertEqual(data["statistics"]["no_match_rows"], 1)
+
+        page = client.post("/api/v1/data", json={
+            "file_id": data["result_id"],
+            "page": 2,
+            "page_size": 2
+        })
+        self.assertEqual(page.status_code, 200, page.text)
+        self.assertEqual(page.json()["total"], 3)
+        self.assertEqual(len(page.json()["data"]), 1)
+
+        client.delete(f"/api/v1/file/{data['result_id']}")
+        print(f"CA-03 PASSED: resultado {data['result_id']} paginado con /data")
+
+    def test_CA_04(self):
+        """CA-04: Cruces repetidos contra el mismo archivo reutilizan el índice de búsqueda"""
+        payload = {
+            "file1_key": self.file1_id,
+            "file2_key": self.file2_id,
+            "key_column_file1": "documento",
+            "key_column_file2": "num_documento",
+            "cross_type": "left"
+        }
+        first = client.post("/api/v1/cross", json=payload)
+        second = client.post("/api/v1/cross", json=payload)
+        self.assertEqual(second.status_code, 200, second.text)
+        self.assertTrue(second.json()["lookup_index"]["from_cache"])
+        self.assertEqual(
+            first.json()["statistics"]["matched_rows"],
+            second.json()["statistics"]["matched_rows"]
+        )
+
+        stats = client.get("/api/v1/cross/lookup-indexes").json()
+        self.assertGreaterEqual(stats["total_indexes"], 1)
+        print(f"CA-04 PASSED: {stats['total_indexes']} índices de búsqueda en cache")
+
+    def test_CA_05(self):
+        """CA-05: Pipeline de cruces encadenados con clave compuesta en una sola consulta"""
+        csv_ips = b"ips,region,nivel\n"
+        csv_ips += b"IPS Norte,Norte,1\n"
+        csv_ips += b"IPS Sur,Sur,2\n"
+        # Tarifa por (region, nivel): Sur/1 y Sur/2 solo se distinguen con ambas columnas
+        csv_tarifas = b"region,nivel,tarifa,IPS\n"
+        csv_tarifas += b"Norte,1,100,N1\n"
+        csv_tarifas += b"Sur,1,200,S1\n"
+        csv_tarifas += b"Sur,2,300,S2\n"
+        uploads = [
+            client.post("/api/v1/upload", files={'file': (name, BytesIO(content), 'text/csv')})
+            for name, content in (("maestro_ips.csv", csv_ips), ("tarifas_nivel.csv", csv_tarifas))
+        ]
+        if any(upload.status_code != 200 for upload in uploads):
+            self.skipTest("No se pudieron cargar los maestros del pipeline")
+        ips_id, tarifas_id = [upload.json()["file_id"] for upload in uploads]
+
+        payload = {
+            "base_file_key": self.file1_id,
+            "steps": [
+                {
+                    "file_key": self.file2_id,
+                    "base_key_columns": ["documento"],
+                    "lookup_key_columns": ["num_documento"],
+                    "columns_to_include": ["ips", "diagnostico"]
+                },
+                {
+                    "file_key": ips_id,
+                    "base_key_columns": ["ips"],
+                    "lookup_key_columns": ["ips"],
+                    "columns_to_include": ["region", "nivel"],
+                    "prefix": "ips_"
+                },
+                {
+                    "file_key": tarifas_id,
+                    "base_key_columns": ["ips_region", "ips_nivel"],
+                    "lookup_key_columns": ["region", "nivel"],
+                    "columns_to_include": ["tarifa", "IPS"]
+                }
+            ]
+        }
+        response = client.post("/api/v1/cross/pipeline", json=payload)
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+
+        self.assertEqual(data["total_rows"], 3)
+        self.assertIn("ips_region", data["columns"])
+        # "IPS" choca con "ips" sin distinguir mayúsculas: mismo nombre que escribe COPY
+        self.assertEqual(data["columns"][-2:], ["tarifa", "IPS_1"])
+        steps = data["statistics"]["steps"]
+        self.assertEqual(steps[0]["matched_rows"], 2)
+        self.assertEqual(steps[1]["matched_rows"], 2)
+        self.assertEqual(steps[2]["matched_rows"], 2)
+        self.assertEqual(steps[2]["columns_added"], ["tarifa", "IPS_1"])
+
+        rows = client.post("/api/v1/data", json={"file_id": data["result_id"], "page": 1, "page_size": 10}).json()
+        self.assertEqual(list(rows["data"][0].keys()), data["columns"])
+        tarifas = {str(row["documento"]): row["tarifa"] for row in rows["data"]}
+        self.assertEqual(int(tarifas["1234"]), 100)
+        self.assertEqual(int(tarifas["5678"]), 300)
+        self.assertIsNone(tarifas["9012"])
+
+        client.delete(f"/api/v1/file/{data['result_id']}")
+        client.delete(f"/api/v1/file/{ips_id}")
+        client.delete(f"/api/v1/file/{tarifas_id}")
+        print(f"CA-05 PASSED: pipeline de {len(steps)} pasos")
+
+    def test_CA_06(self):
+        """CA-06: Cruce con normalización de claves (espacios, separadores y ceros a la izquierda)"""
+        csv_sucio = b"doc_sucio;grupo\n"
+        csv_sucio += b" 001.234 ;A\n"
+        csv_sucio += b"0005678;B\n"
+        files = {'file': ('documentos_sucios.csv', BytesIO(csv_sucio), 'text/csv')}
+        upload = client.post("/api/v1/upload", files=files)
+        if upload.status_code != 200:
+            self.skipTest("No se pudo cargar el archivo con claves sucias")
+        dirty_id = upload.json()["file_id"]
+
+        payload = {
+            "file1_key": self.file1_id,
+            "file2_key": dirty_id,
+            "key_column_file1": "documento",
+            "key_column_file2": "doc_sucio",
+            "cross_type": "left",
+            "columns_to_include": {"file1_columns": ["documento"], "file2_columns": ["grupo"]}
+        }
+        plain = client.post("/api/v1/cross", json=payload)
+        normalized = client.post("/api/v1/cross", json={**payload, "key_normalization": ["digits", "strip_zeros"]})
+        self.assertEqual(normalized.status_code, 200, normalized.text)
+
+        self.assertEqual(normalized.json()["statistics"]["matched_rows"], 2)
+        self.assertLess(plain.json()["statistics"]["matched_rows"], 2)
+        self.assertEqual(normalized.json()["lookup_index"]["normalization"], "digits+strip_zeros")
+
+        client.delete(f"/api/v1/file/{dirty_id}")
+        print("CA-06 PASSED: normalización de claves aumenta coincidencias")
+
+    def test_CA_07(self):
+        """CA-07: Descarga del cruce en streaming como CSV y Parquet con las columnas de /cross"""
+        payload = {
+            "file1_key": self.file1_id,
+            "file2_key": self.file2_id,
+            "key_column_file1": "documento",
+            "key_column_file2": "num_documento",
+            "cross_type": "left",
+            "columns_to_include": {
+                "file1_columns": ["documento", "nombre"],
+                "file2_columns": ["diagnostico"]
+            }
+        }
+        csv_response = client.post("/api/v1/cross-download", json=payload)
+        self.assertEqual(csv_response.status_code, 200, csv_response.text)
+        self.assertIn(".csv", csv_response.headers["content-disposition"])
+        lines = csv_response.content.decode("utf-8").strip().splitlines()
+        self.assertEqual(lines[0], '"documento","nombre","diagnostico"')
+        self.assertEqual(len(lines), 4)
+
+        parquet_response = client.post("/api/v1/cross-download?format=parquet", json=payload)
+        self.assertEqual(parquet_response.status_code, 200, parquet_response.text)
+        self.assertIn(".parquet", parquet_response.headers["content-disposition"])
+        self.assertEqual(parquet_response.content[:4], b"PAR1")
+
+        invalid = client.post("/api/v1/cross-download?format=xlsx", json=payload)
+        self.assertEqual(invalid.status_code, 422)
+        print("CA-07 PASSED: descarga en streaming CSV y Parquet")
+
+    def test_CA_08(self):
+        """CA-08: Sugerencias de columnas clave por solapamiento de valores (firmas MinHash/HLL)"""
+        response = client.get("/api/v1/cross/suggestions", params={
+            "file1_key": self.file1_id,
+            "file2_key": self.file2_id
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+
+        self.assertTrue(data["success"])
+        self.assertGreater(len(data["suggestions"]), 0)
+        best = data["suggestions"][0]
+        self.assertEqual((best["left_column"], best["right_column"]), ("documento", "num_documento"))
+        self.assertGreater(best["containment_left"], 0.5)
+
+        again = client.get("/api/v1/cross/suggestions", params={
+            "file1_key": self.file1_id,
+            "file2_key": self.file2_id
+        })
+        self.assertTrue(again.json()["sketches_from_cache"])
+        print(f"CA-08 PASSED: {best['left_column']} ↔ {best['right_column']} (score {best['combined_score']})")
+
+    def test_CA_09(self):
+        """CA-09: Columnas con el mismo nombre en ambos archivos salen únicas en /cross y en la descarga"""
+        csv_edades = b"num_documento,edad\n"
+        csv_edades += b"1234,31\n"
+        csv_edades += b"9012,36\n"
+        files = {'file': ('edades.csv', BytesIO(csv_edades), 'text/csv')}
+        upload = client.post("/api/v1/upload", files=files)
+        if upload.status_code != 200:
+            self.skipTest("No se pudo cargar el archivo con columnas repetidas")
+        edades_id = upload.json()["file_id"]
+
+        payload = {
+            "file1_key": self.file1_id,
+            "file2_key": edades_id,
+            "key_column_file1": "documento",
+            "key_column_file2": "num_documento",
+            "cross_type": "left"
+        }
+        cross = client.post("/api/v1/cross", json=payload)
+        self.assertEqual(cross.status_code, 200, cross.text)
+        columns = cross.json()["columns"]
+        self.assertEqual(columns, ["documento", "nombre", "edad", "num_documento", "edad_1"])
+
+        parquet_response = client.post("/api/v1/cross-download?format=parquet", json=payload)
+        self.assertEqual(parquet_response.status_code, 200, parquet_response.text)
+        table = pq.read_table(BytesIO(parquet_response.content))
+        self.assertEqual(table.column_names, columns)
+
+        csv_response = client.post("/api/v1/cross-download", json=payload)
+        header = csv_response.content.decode("utf-8").splitlines()[0]
+        self.assertEqual(header, ",".join(f'"{col}"' for col in columns))
+
+        client.delete(f"/api/v1/file/{edades_id}")
+        print("CA-09 PASSED: nombres de columnas únicos en /cross y /cross-download")
+
+    def test_CA_10(self):
+        """CA-10: Una columna de categoría contenida por completo no supera a la clave real"""
+        csv_base = "documento,edad\n" + "".join(f"{i},{i % 5}\n" for i in range(200))
+        csv_lookup = "num_documento,edad_paciente\n" + "".join(f"{50 + i},{i % 5}\n" for i in range(200))
+        uploads = [
+            client.post("/api/v1/upload", files={'file': (name, BytesIO(content.encode()), 'text/csv')})
+            for name, content in (("base_claves.csv", csv_base), ("busqueda_claves.csv", csv_lookup))
+        ]
+        if any(upload.status_code != 200 for upload in uploads):
+            self.skipTest("No se pudieron cargar los archivos de sugerencias")
+        base_id, lookup_id = [upload.json()["file_id"] for upload in uploads]
+
+        try:
+            response = client.get("/api/v1/cross/suggestions", params={
+                "file1_key": base_id,
+                "file2_key": lookup_id
+            })
+            self.assertEqual(response.status_code, 200, response.text)
+            suggestions = response.json()["suggestions"]
+            best = suggestions[0]
+            self.assertEqual((best["left_column"], best["right_column"]), ("documento", "num_documento"))
+
+            for category in (s for s in suggestions if s["right_column"] == "edad_paciente"):
+                self.assertLess(category["combined_score"], best["combined_score"])
+                self.assertIn("No recomendado", category["recommendation"])
+        finally:
+            client.delete(f"/api/v1/file/{base_id}")
+            client.delete(f"/api/v1/file/{lookup_id}")
+        print(f"CA-10 PASSED: clave real primero (score {best['combined_score']})")
+
+    def test_CA_11(self):
+        """CA-11: Con solo columnas del archivo base se cuentan las coincidencias de todas las de búsqueda"""
+        payload = {
+            "file1_key": self.file1_id,
+            "file2_key": self.file2_id,
+            "key_column_file1": "documento",
+            "key_column_file2": "num_documento",
+            "cross_type": "left",
+            "columns_to_include": {"file1_columns": ["documento", "nombre"]}
+        }
+        response = client.post("/api/v1/cross", json=payload)
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        self.assertEqual(
+            data["columns"],
+            ["documento", "nombre", "num_documento", "fecha_atencion", "diagnostico", "ips"]
+        )
+        # 1234 y 5678 están en atenciones; 9012 no
+        self.assertEqual(data["statistics"]["matched_rows"], 2)
+        self.assertEqual(data["statistics"]["no_match_rows"], 1)
+        print("CA-11 PASSED: coincidencias contadas sobre las columnas de búsqueda emitidas")
+
+    def test_CA_12(self):
+        """CA-12: Con claves repetidas en el archivo de búsqueda gana la primera fila (como BUSCARX)"""
+        csv_lookup = "num_documento,orden\n1234,primera\n5678,primera\n"
+        csv_lookup += "".join(f"{1234 if i % 2 else 5678},repetida_{i}\n" for i in range(20000))
+        upload = client.post(
+            "/api/v1/upload", files={'file': ('repetidos.csv', BytesIO(csv_lookup.encode()), 'text/csv')}
+        )
+        if upload.status_code != 200:
+            self.skipTest("No se pudo cargar el archivo con claves repetidas")
+        lookup_id = upload.json()["file_id"]
+
+        try:
+            response = client.post("/api/v1/cross", json={
+                "file1_key": self.file1_id,
+                "file2_key": lookup_id,
+                "key_column_file1": "documento",
+                "key_column_file2": "num_documento",
+                "cross_type": "left"
+            })
+            self.assertEqual(response.status_code, 200, response.text)
+            orden = {str(row["documento"]): row["orden"] for row in response.json()["data"]}
+            self.assertEqual(orden["1234"], "primera")
+            self.assertEqual(orden["5678"], "primera")
+            self.assertIsNone(orden["9012"])
+        finally:
+            client.delete(f"/api/v1/file/{lookup_id}")
+        print("CA-12 PASSED: primera coincidencia en orden del archivo")
+
     @classmethod
     def tearDownClass(cls):
         """Limpieza - eliminar archivos de prueba"""
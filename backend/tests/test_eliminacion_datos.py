@@ -10,6 +10,9 @@ from io import BytesIO
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from main import app
+from services.duckdb_service.duckdb_service import duckdb_service
+from services.technical_note_services.data_source_service import DataSourceService
+from utils.technical_note_utils.file_utils import generate_file_key
 
 client = TestClient(app)
 
@@ -114,7 +117,122 @@ class TestEliminacionDatos(unittest.TestCase):
             print(f"ED-04 PASSED")
             return
         self.assertTrue(True)
-    
+
+    def test_ED_05(self):
+        """ED-05: Las consultas posteriores ven las filas vivas tras eliminar por filtro e índice"""
+        payload = {
+            "file_id": self.file_id,
+            "sheet_name": None,
+            "filters": [
+                {
+                    "column": "edad",
+                    "operator": "lt",
+                    "value": 40
+                }
+            ]
+        }
+        response = client.request("DELETE", "/api/v1/rows/filter", json=payload)
+        if response.status_code == 200:
+            self.assertEqual(response.json()["remaining_rows"], 90)
+
+            # Los índices se aplican sobre la vista ya filtrada
+            payload = {"file_id": self.file_id, "sheet_name": None, "row_indices": [0]}
+            response = client.request("DELETE", "/api/v1/rows", json=payload)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["remaining_rows"], 89)
+
+            response = client.post("/api/v1/data", json={"file_id": self.file_id, "page": 1, "page_size": 5})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual(data["total"], 89)
+            self.assertEqual([int(row["documento"]) for row in data["data"]], [11, 12, 13, 14, 15])
+            print(f"ED-05 PASSED")
+            return
+        self.assertTrue(True)
+
+    def test_ED_06(self):
+        """ED-06: Deshacer y rehacer una eliminación sin reescribir el archivo"""
+        payload = {
+            "file_id": self.file_id,
+            "sheet_name": None,
+            "row_indices": [0, 1, 2]
+        }
+        response = client.request("DELETE", "/api/v1/rows", json=payload)
+        if response.status_code == 200:
+            response = client.post(f"/api/v1/versions/{self.file_id}/undo")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["live_rows"], 100)
+
+            response = client.post(f"/api/v1/versions/{self.file_id}/redo")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["live_rows"], 97)
+
+            # No hay más cambios por rehacer
+            response = client.post(f"/api/v1/versions/{self.file_id}/redo")
+            self.assertEqual(response.status_code, 400)
+
+            response = client.get(f"/api/v1/versions/{self.file_id}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["versions"]), 2)
+            print(f"ED-06 PASSED")
+            return
+        self.assertTrue(True)
+
+    def test_ED_07(self):
+        """ED-07: Previsualizar y eliminar duplicados por columna conservando la última fila"""
+        response = client.get(f"/api/v1/duplicates/{self.file_id}", params={"columns": ["departamento"]})
+        if response.status_code == 200:
+            summary = response.json()
+            self.assertEqual(summary["duplicate_groups"], 1)
+            self.assertEqual(summary["duplicated_rows"], 100)
+            self.assertEqual(summary["rows_to_delete"]["last"], 99)
+            self.assertEqual(summary["sample_groups"][0]["values"]["departamento"], "CALDAS")
+
+            response = client.delete(
+                f"/api/v1/duplicates/{self.file_id}", params={"columns": ["departamento"], "keep": "last"}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["rows_deleted"], 99)
+            self.assertEqual(response.json()["remaining_rows"], 1)
+
+            response = client.post("/api/v1/data", json={"file_id": self.file_id, "page": 1, "page_size": 5})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(int(response.json()["data"][0]["documento"]), 99)
+            print(f"ED-07 PASSED")
+            return
+        self.assertTrue(True)
+
+    def test_ED_08(self):
+        """ED-08: Un reporte con la versión fijada sigue leyéndola aunque se edite el archivo y corra el GC"""
+        response = client.request("DELETE", "/api/v1/rows", json={"file_id": self.file_id, "row_indices": [0, 1, 2]})
+        self.assertEqual(response.status_code, 200, response.text)
+
+        # Misma resolución que usan los reportes de nota técnica sobre el archivo subido
+        service = DataSourceService()
+        source = service.ensure_data_source_available(self.file_id, generate_file_key(self.file_id))
+        layers = duckdb_service.dataset_layers
+        layers.MAX_VERSIONS = 1
+        try:
+            with service.pinned(self.file_id, source) as pinned:
+                self.assertEqual(pinned, source)
+                for index in (0, 1):
+                    response = client.request("DELETE", "/api/v1/rows", json={"file_id": self.file_id, "row_indices": [index]})
+                    self.assertEqual(response.status_code, 200, response.text)
+
+                # El GC descartó las versiones intermedias, no la fijada
+                versions = client.get(f"/api/v1/versions/{self.file_id}").json()["versions"]
+                self.assertEqual([v["live_rows"] for v in versions], [97, 95])
+                self.assertTrue(versions[0]["pinned"])
+                self.assertEqual(duckdb_service.conn.execute(f"SELECT COUNT(*) FROM {pinned}").fetchone()[0], 97)
+
+            # Sin lectores, la versión fijada también se recolecta
+            with self.assertRaises(Exception):
+                duckdb_service.conn.execute(f"SELECT COUNT(*) FROM {pinned}").fetchone()
+            self.assertEqual(client.get(f"/api/v1/file/{self.file_id}").json()["total_rows"], 95)
+        finally:
+            del layers.MAX_VERSIONS
+        print(f"ED-08 PASSED")
+
     def tearDown(self):
         """Limpieza después de cada prueba"""
         try:
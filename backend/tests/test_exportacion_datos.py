@@ -65,7 +65,51 @@ class TestExportacionDatos(unittest.TestCase):
         print(f"ED-01 PASSED")
         print("-"*60)
         self.assertTrue(True)
-    
+
+    def test_ED_02(self):
+        """ED-02: Descargar reporte exportado completo y por rango de bytes"""
+        payload = {
+            "report_data": {
+                "corte_fecha": "2025-07-31",
+                "items": [{"column": "consulta medicina", "keyword": "medicina", "age_range": "1 months", "count": 3}],
+                "temporal_data": {
+                    "consulta medicina|medicina|1 months": {
+                        "column": "consulta medicina",
+                        "keyword": "medicina",
+                        "age_range": "1 months",
+                        "years": {
+                            "2025": {
+                                "year": 2025,
+                                "total": 3,
+                                "months": {
+                                    "Julio": {"month": 7, "month_name": "Julio", "count": 3}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            "filename": "reporte_rango",
+            "export_options": {"export_csv": True, "export_pdf": False}
+        }
+        response = client.post("/api/v1/technical-note/reports/export-current", json=payload)
+        if response.status_code != 200 or not response.json().get("files"):
+            self.skipTest("Exportación no disponible")
+
+        file_id = next(iter(response.json()["files"].values()))
+        url = f"/api/v1/technical-note/reports/download/{file_id}"
+
+        full = client.get(url)
+        self.assertEqual(full.status_code, 200)
+
+        partial = client.get(url, headers={"Range": "bytes=0-9"})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.content, full.content[:10])
+
+        stats = client.get("/api/v1/technical-note/reports/storage-stats").json()["stats"]
+        self.assertGreaterEqual(stats["entries"], 1)
+        print(f"ED-02 PASSED: {len(full.content)} bytes, rango parcial OK")
+
     @classmethod
     def tearDownClass(cls):
         """Limpieza"""
@@ -175,7 +175,45 @@ class TestObtenerData(unittest.TestCase):
         
         print(f"\nOD-03 PASSED: {data['total']} registros retornados")
         print("-"*60)
-    
+
+    def test_OD_04(self):
+        """OD-04: Las transformaciones se reflejan en la consulta sin reprocesar el archivo"""
+        print("\n" + "-"*60)
+
+        payload = {
+            "file_id": self.file_id,
+            "operation": "concatenate",
+            "params": {
+                "columns": ["departamento", "municipio"],
+                "new_column": "ubicacion",
+                "separator": " - "
+            }
+        }
+        response = client.post("/api/v1/transform", json=payload)
+        self.assertEqual(response.status_code, 200, f"Error: {response.text if response.status_code != 200 else ''}")
+        self.assertIn("ubicacion", response.json()["new_columns"])
+
+        payload = {
+            "file_id": self.file_id,
+            "filters": [
+                {
+                    "column": "ubicacion",
+                    "operator": "equals",
+                    "value": "CALDAS - MANIZALES"
+                }
+            ],
+            "page": 1,
+            "page_size": 10
+        }
+        response = client.post("/api/v1/data", json=payload)
+        self.assertEqual(response.status_code, 200, f"Error: {response.text if response.status_code != 200 else ''}")
+        data = response.json()
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["data"][0]["nombre"], "CARLOS LOPEZ")
+
+        print(f"\nOD-04 PASSED: columna calculada disponible en la consulta")
+        print("-"*60)
+
     @classmethod
     def tearDownClass(cls):
         """Limpieza - eliminar archivo de prueba"""
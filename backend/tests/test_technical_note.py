@@ -4,14 +4,52 @@ Tests para Technical Note Endpoints - VERSIÓN FINAL CORREGIDA
 import unittest
 import sys
 import os
+import json
+import shutil
+import tempfile
+import time
 from fastapi.testclient import TestClient
+from io import BytesIO
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from main import app
+from api.technical_note_routes import report_exporter
+from services.technical_note_services.report_service_aux.pdf_render_pool import PdfRenderPool
+from services.technical_note_services.batch_report_service import run_file_job
 
 client = TestClient(app)
 
+# Archivo pequeño con valores conocidos (edades al corte 2025-07-31: nacidos 15/06 → 1 mes, 15/05 → 2 meses)
+FIXTURE_FILENAME = "nota_tecnica_fixture.csv"
+FIXTURE_ROWS = [
+    ("CALDAS", "MANIZALES", "IPS CENTRO", 1001, "15/06/2025", "15/07/2025", ""),
+    ("CALDAS", "MANIZALES", "IPS CENTRO", 1002, "15/06/2025", "", ""),
+    ("CALDAS", "MANIZALES", "IPS CENTRO", 1003, "15/05/2025", "", "20/07/2025"),
+    ("CALDAS", "VILLAMARIA", "IPS NORTE", 1004, "15/06/2025", "10/07/2025", ""),
+    ("RISARALDA", "PEREIRA", "IPS PEREIRA", 1005, "15/06/2025", "", ""),
+    ("RISARALDA", "PEREIRA", "IPS PEREIRA", 1006, "15/05/2025", "", ""),
+]
+
+
+def technical_fixture_csv() -> str:
+    """Contenido CSV del archivo de valores conocidos"""
+    csv_content = "Departamento,Municipio,Nombre IPS,Nro Identificación,Primer Apellido,Primer Nombre,Fecha Nacimiento,edad,"
+    csv_content += "Consulta de medicina general 1 mes,Consulta de medicina general 2 meses\n"
+    for departamento, municipio, ips, documento, nacimiento, consulta_1, consulta_2 in FIXTURE_ROWS:
+        csv_content += f"{departamento},{municipio},{ips},{documento},PEREZ,ANA,{nacimiento},0,{consulta_1},{consulta_2}\n"
+    return csv_content
+
+
+def upload_technical_fixture() -> str:
+    """Sube el archivo de valores conocidos y retorna su file_id"""
+    files = {'file': (FIXTURE_FILENAME, BytesIO(technical_fixture_csv().encode()), 'text/csv')}
+    response = client.post("/api/v1/upload", files=files)
+    if response.status_code != 200:
+        raise Exception(f"No se pudo cargar el archivo de nota técnica: {response.text}")
+    return response.json()["file_id"]
+
+
 class TestTechnicalNote(unittest.TestCase):
     """Tests para endpoints de Technical Note"""
     
@@ -70,6 +108,11 @@ class TestFiltrosGeograficos(unittest.TestCase):
                     break
         else:
             cls.filename = "InfanciaNueva.csv"
+        cls.fixture_id = upload_technical_fixture()
+    
+    @classmethod
+    def tearDownClass(cls):
+        client.delete(f"/api/v1/file/{cls.fixture_id}")
     
     def test_FG_01(self):
         """FG-01: Obtener lista única de departamentos ordenada alfabéticamente"""
@@ -223,6 +266,37 @@ class TestFiltrosGeograficos(unittest.TestCase):
         ips_list = data["values"]
         
         print(f"FG-07 PASSED: {len(ips_list)} IPS de CALDAS-MANIZALES")
+    
+    def test_FG_08(self):
+        """FG-08: Árbol geográfico completo coherente con los endpoints por nivel"""
+        response = client.get(f"/api/v1/technical-note/geographic/{FIXTURE_FILENAME}/tree")
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        self.assertTrue(data.get("success", True), data.get("error"))
+        
+        tree = data["tree"]
+        self.assertEqual(
+            [(node["value"], node["count"]) for node in tree], [("CALDAS", 4), ("RISARALDA", 2)]
+        )
+        self.assertEqual(
+            [(mun["value"], mun["count"]) for mun in tree[0]["municipios"]], [("MANIZALES", 3), ("VILLAMARIA", 1)]
+        )
+        self.assertEqual(
+            [(mun["value"], mun["count"]) for mun in tree[1]["municipios"]], [("PEREIRA", 2)]
+        )
+        
+        # Los endpoints por nivel sirven los mismos valores desde el índice
+        response = client.get(f"/api/v1/technical-note/geographic/{FIXTURE_FILENAME}/departamentos")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json().get("values"), ["CALDAS", "RISARALDA"])
+        
+        response = client.get(
+            f"/api/v1/technical-note/geographic/{FIXTURE_FILENAME}/municipios", params={"departamento": "CALDAS"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json().get("values"), ["MANIZALES", "VILLAMARIA"])
+        
+        print(f"FG-08 PASSED: árbol con {len(tree)} departamentos")
 
 
 class TestReporteTecnico(unittest.TestCase):
@@ -244,6 +318,11 @@ class TestReporteTecnico(unittest.TestCase):
             cls.filename = "InfanciaNueva.csv"
         
         cls.corte_fecha = "2025-07-31"
+        cls.fixture_id = upload_technical_fixture()
+    
+    @classmethod
+    def tearDownClass(cls):
+        client.delete(f"/api/v1/file/{cls.fixture_id}")
     
     def test_RT_01(self):
         """RT-01: Generar reporte con keywords específicas"""
@@ -347,7 +426,250 @@ class TestReporteTecnico(unittest.TestCase):
         
         self.assertEqual(response.status_code, 400, f"Error: {response.text}")
         print(f"RT-07 PASSED: Error de formato de fecha manejado")
+    
+    def test_RT_07(self):
+        """RT-07: Reporte agrupado por IPS retorna tabla de posiciones con semaforización"""
+        response = client.get(
+            f"/api/v1/technical-note/report/{FIXTURE_FILENAME}/grouped",
+            params={
+                "group_by": "ips",
+                "keywords": "Medicina",
+                "corte_fecha": self.corte_fecha
+            }
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        
+        self.assertEqual(data.get("group_by"), "ips")
+        groups = data["groups"]
+        # IPS NORTE 1/1, IPS CENTRO 2/3 (1 mes: 1/2, 2 meses: 1/1), IPS PEREIRA 0/2
+        self.assertEqual(
+            [(g["ips"], g["totales"]["numerador"], g["totales"]["denominador"], g["totales"]["cobertura_porcentaje"])
+             for g in groups],
+            [("IPS NORTE", 1, 1, 100.0), ("IPS CENTRO", 2, 3, 66.67), ("IPS PEREIRA", 0, 2, 0.0)]
+        )
+        for group in groups:
+            self.assertIn("semaforizacion", group["totales"])
+        print(f"RT-07 PASSED: {len(groups)} IPS en la tabla de posiciones")
+    
+    def test_RT_08(self):
+        """RT-08: Validar error cuando group_by no es un nivel geográfico"""
+        response = client.get(
+            f"/api/v1/technical-note/report/{FIXTURE_FILENAME}/grouped",
+            params={"group_by": "region", "corte_fecha": self.corte_fecha}
+        )
+        self.assertEqual(response.status_code, 422)
+        print(f"RT-08 PASSED: group_by inválido rechazado")
+    
+    def test_RT_09(self):
+        """RT-09: Tendencia multi-corte retorna un punto por fecha de corte"""
+        cortes = ["2025-06-30", "2025-07-31"]
+        response = client.get(
+            f"/api/v1/technical-note/trend/{FIXTURE_FILENAME}",
+            params={"cortes": ",".join(cortes), "keywords": "Medicina"}
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        
+        self.assertEqual(data.get("cortes"), cortes)
+        points = {
+            serie["column"]: [(p["corte_fecha"], p["numerador"], p["denominador"]) for p in serie["points"]]
+            for serie in data["series"]
+        }
+        # Al 30/06 los nacidos el 15/05 tienen 1 mes y aún no hay nadie de 2 meses
+        self.assertEqual(points, {
+            "Consulta de medicina general 1 mes": [("2025-06-30", 0, 2), ("2025-07-31", 2, 4)],
+            "Consulta de medicina general 2 meses": [("2025-06-30", 0, 0), ("2025-07-31", 1, 2)]
+        })
+        print(f"RT-09 PASSED: {len(data['series'])} series de tendencia")
+    def test_RT_10(self):
+        """RT-10: Validar error cuando una fecha de la tendencia es inválida"""
+        response = client.get(
+            f"/api/v1/technical-note/trend/{FIXTURE_FILENAME}",
+            params={"cortes": "2025-07-31,31/08/2025"}
+        )
+        self.assertEqual(response.status_code, 400, f"Error: {response.text}")
+        print(f"RT-10 PASSED: Fecha inválida en tendencia rechazada")
+
+    def test_RT_11(self):
+        """RT-11: Rangos de edad de otra fecha de corte salen del histograma en cache"""
+        first = client.get(
+            f"/api/v1/technical-note/age-ranges/{FIXTURE_FILENAME}",
+            params={"corte_fecha": self.corte_fecha}
+        )
+        self.assertEqual(first.status_code, 200, f"Error: {first.text}")
+        # date_diff('month'): 15/06 → 1 y 15/05 → 2 al 31/07
+        self.assertEqual(first.json()["age_ranges"]["months"], [1, 2])
+
+        second = client.get(
+            f"/api/v1/technical-note/age-ranges/{FIXTURE_FILENAME}",
+            params={"corte_fecha": "2025-06-30"}
+        )
+        self.assertEqual(second.status_code, 200, f"Error: {second.text}")
+        data = second.json()
+
+        self.assertTrue(data.get("from_cache"))
+        self.assertEqual(data["age_ranges"]["months"], [0, 1])
+        self.assertEqual(
+            [item["age"] for item in data["histograms"]["months"]],
+            data["age_ranges"]["months"]
+        )
+        self.assertEqual(data["statistics"]["total_registros"], len(FIXTURE_ROWS))
+        print(f"RT-11 PASSED: {len(data['age_ranges']['months'])} edades en meses desde cache")
+
+    def test_RT_12(self):
+        """RT-12: El reporte informa el perfil de consultas y cuántos SQL ejecutó"""
+        # Archivo propio con columnas de keyword y edad: el primero de /available puede no tenerlas
+        csv_content = "Departamento,Municipio,Nombre IPS,Nro Identificación,Primer Apellido,Primer Nombre,Fecha Nacimiento,edad,"
+        csv_content += "Consulta de medicina general 1 mes,Consulta de medicina general 2 meses\n"
+        for i in range(6):
+            atencion = "15/07/2025" if i % 2 else ""
+            csv_content += f"CALDAS,MANIZALES,IPS CENTRO,{1000 + i},PEREZ,ANA,15/0{6 - i % 2}/2025,0,{atencion},\n"
+        files = {'file': ('nota_tecnica_perfil.csv', BytesIO(csv_content.encode()), 'text/csv')}
+        upload = client.post("/api/v1/upload", files=files)
+        if upload.status_code != 200:
+            self.skipTest("No se pudo cargar el archivo de nota técnica")
+        file_id = upload.json()["file_id"]
+
+        try:
+            response = client.get(
+                "/api/v1/technical-note/report/nota_tecnica_perfil.csv",
+                params={"corte_fecha": self.corte_fecha, "profile": "production", "include_temporal": False}
+            )
+            self.assertEqual(response.status_code, 200, f"Error: {response.text}")
+            data = response.json()
+            self.assertGreater(len(data.get("items", [])), 0)
+
+            query_profile = data.get("query_profile", {})
+            self.assertEqual(query_profile.get("mode"), "production")
+            self.assertGreater(query_profile.get("sql_statements", 0), 0)
+
+            invalid = client.get(
+                "/api/v1/technical-note/report/nota_tecnica_perfil.csv",
+                params={"corte_fecha": self.corte_fecha, "profile": "verbose"}
+            )
+            self.assertEqual(invalid.status_code, 422)
+        finally:
+            client.delete(f"/api/v1/file/{file_id}")
+        print(f"RT-12 PASSED: {query_profile['sql_statements']} sentencias SQL en producción")
+
+    def test_RT_13(self):
+        """RT-13: PDF encolado en el pool (1 proceso): estado done/error, descarga por job_id y métricas"""
+        report = client.get(
+            f"/api/v1/technical-note/report/{FIXTURE_FILENAME}",
+            params={"corte_fecha": self.corte_fecha, "include_temporal": False}
+        )
+        self.assertEqual(report.status_code, 200, f"Error: {report.text}")
+
+        original_pool = report_exporter.pdf_pool
+        report_exporter.pdf_pool = PdfRenderPool(report_exporter.pdf_config, max_workers=1)
+        try:
+            done_job = report_exporter.submit_pdf_job(report.json(), "reporte_pool", include_temporal=False)
+            failed_job = report_exporter.submit_pdf_job({"items": None}, "reporte_invalido")
+
+            statuses = {}
+            for job in (done_job, failed_job):
+                deadline = time.time() + 120
+                status = "pending"
+                while status == "pending" and time.time() < deadline:
+                    response = client.get(f"/api/v1/technical-note/reports/pdf-jobs/{job['job_id']}")
+                    self.assertEqual(response.status_code, 200, f"Error: {response.text}")
+                    status = response.json()["job"]["status"]
+                    if status == "pending":
+                        time.sleep(0.1)
+                statuses[job['job_id']] = response.json()["job"]
+
+            done = statuses[done_job['job_id']]
+            self.assertEqual(done["status"], "done")
+            self.assertGreaterEqual(done["pages"], 1)
+            self.assertEqual(statuses[failed_job['job_id']]["status"], "error")
+            self.assertTrue(statuses[failed_job['job_id']]["error"])
+
+            download = client.get(f"/api/v1/technical-note/reports/download/{done_job['job_id']}")
+            self.assertEqual(download.status_code, 200)
+            self.assertTrue(download.content.startswith(b"%PDF"))
+            self.assertIn("reporte_pool.pdf", download.headers.get("content-disposition", ""))
+
+            metrics = client.get("/api/v1/technical-note/reports/pdf-metrics").json()["metrics"]
+            self.assertEqual(metrics["max_workers"], 1)
+            self.assertEqual(metrics["jobs_submitted"], 2)
+            self.assertEqual(metrics["jobs_completed"], 1)
+            self.assertEqual(metrics["jobs_failed"], 1)
+            self.assertEqual(metrics["jobs_pending"], 0)
+            self.assertEqual(metrics["pages_rendered"], done["pages"])
+        finally:
+            report_exporter.pdf_pool.shutdown()
+            report_exporter.pdf_pool = original_pool
+        print(f"RT-13 PASSED: PDF de {done['pages']} páginas desde el pool")
+
+
+class TestReportesLote(unittest.TestCase):
+    """Tests para la generación de reportes por lotes (sin pool de procesos)"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="reportes_lote_")
+        self.file_path = os.path.join(self.work_dir, FIXTURE_FILENAME)
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.write(technical_fixture_csv())
+        self.output_dir = os.path.join(self.work_dir, "salida")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _job(self, departamentos):
+        return {
+            "file_path": self.file_path,
+            "output_dir": self.output_dir,
+            "cortes": ["2025-07-31"],
+            "departamentos": departamentos,
+            "include_total": True,
+            "keywords": None,
+            "min_count": 0,
+            "formats": ["csv", "json"],
+            "resume": True
+        }
+
+    def test_RL_01(self):
+        """RL-01: run_file_job escribe reportes y manifiestos; al repetir, reanuda sin regenerar"""
+        summary = run_file_job(self._job(["CALDAS"]))
+        self.assertEqual(summary["errors"], [])
+        self.assertEqual((summary["completed"], summary["skipped"], summary["failed"]), (2, 0, 0))
+
+        corte_dir = os.path.join(self.output_dir, "nota_tecnica_fixture", "2025-07-31")
+        for geo_label in ("TODOS", "CALDAS"):
+            base_name = f"nota_tecnica_fixture_2025-07-31_{geo_label}"
+            with open(os.path.join(corte_dir, f"{base_name}.done.json"), encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.assertEqual(manifest["corte_fecha"], "2025-07-31")
+            self.assertEqual(manifest["departamento"], None if geo_label == "TODOS" else "CALDAS")
+            self.assertGreater(manifest["items"], 0)
+            self.assertIn(f"{base_name}.json", manifest["outputs"])
+            self.assertTrue(any(name.endswith(".csv") for name in manifest["outputs"]))
+            for output in manifest["outputs"]:
+                self.assertTrue(os.path.exists(os.path.join(corte_dir, output)), output)
+
+        with open(os.path.join(corte_dir, "nota_tecnica_fixture_2025-07-31_CALDAS.json"), encoding='utf-8') as f:
+            report = json.load(f)
+        self.assertEqual(report["corte_fecha"], "2025-07-31")
+
+        again = run_file_job(self._job(["CALDAS"]))
+        self.assertEqual((again["completed"], again["skipped"], again["failed"]), (0, 2, 0))
+        print(f"RL-01 PASSED: {summary['completed']} reportes generados y reanudados")
+
+    def test_RL_02(self):
+        """RL-02: departamentos '*' genera un reporte por departamento del archivo más el total"""
+        summary = run_file_job(self._job(["*"]))
+        self.assertEqual(summary["errors"], [])
+        self.assertEqual(summary["completed"], 3)
 
+        corte_dir = os.path.join(self.output_dir, "nota_tecnica_fixture", "2025-07-31")
+        manifests = sorted(name for name in os.listdir(corte_dir) if name.endswith(".done.json"))
+        self.assertEqual(manifests, [
+            "nota_tecnica_fixture_2025-07-31_CALDAS.done.json",
+            "nota_tecnica_fixture_2025-07-31_RISARALDA.done.json",
+            "nota_tecnica_fixture_2025-07-31_TODOS.done.json",
+        ])
+        print(f"RL-02 PASSED: {len(manifests)} geografías")
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)